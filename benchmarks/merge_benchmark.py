@@ -0,0 +1,103 @@
+"""Compare the chunk merge paths: native frame concatenation, ffmpeg concat and pydub.
+
+Builds a fake conversion out of copies of a sample MP3 and merges it with each
+method in a fresh process, reporting wall time, peak memory and output size.
+
+    python benchmarks/merge_benchmark.py sample.mp3 --chunks 60 --repeat 20
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from functions.mp3_frames import concat_mp3, mp3_duration
+
+
+def build_chunks(sample: str, work_dir: str, chunks: int, repeat: int) -> list:
+    """Write `chunks` files, each `repeat` copies of the sample glued together."""
+    base = os.path.join(work_dir, "base.mp3")
+    concat_mp3([sample] * repeat, base)
+    files = []
+    for idx in range(chunks):
+        path = os.path.join(work_dir, f"chunk_{idx}.mp3")
+        shutil.copyfile(base, path)
+        files.append(path)
+    os.remove(base)
+    return files
+
+
+def _run(method: str, files: list, output: str, results):
+    from functions.pdf2mp3 import PDFToMP3Converter
+
+    converter = PDFToMP3Converter.__new__(PDFToMP3Converter)
+    converter.output_dir = os.path.dirname(output)
+    converter.progress_callback = None
+
+    started = time.perf_counter()
+    getattr(converter, f"_merge_audio_files_{method}")(files, output)
+    elapsed = time.perf_counter() - started
+
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    results.put({"seconds": elapsed, "peak_rss_mb": max(self_rss, child_rss) / 1024})
+
+
+def benchmark(method: str, files: list, work_dir: str) -> dict:
+    output = os.path.join(work_dir, f"merged_{method}.mp3")
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run, args=(method, files, output, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        return {"method": method, "error": f"exit code {process.exitcode}"}
+
+    result = results.get()
+    result.update({
+        "method": method,
+        "output_mb": os.path.getsize(output) / (1024 * 1024),
+        "duration_s": mp3_duration(output),
+    })
+    os.remove(output)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sample", help="MP3 file used as the content of every chunk")
+    parser.add_argument("--chunks", type=int, default=20, help="number of chunk files to merge")
+    parser.add_argument("--repeat", type=int, default=10, help="copies of the sample per chunk")
+    parser.add_argument("--methods", default="native,ffmpeg,pydub")
+    args = parser.parse_args()
+
+    # pydub decodes through ffmpeg and probes through ffprobe
+    required = {"native": [], "ffmpeg": ["ffmpeg"], "pydub": ["ffmpeg", "ffprobe"]}
+    methods = []
+    for method in args.methods.split(","):
+        missing = [tool for tool in required[method] if shutil.which(tool) is None]
+        if missing:
+            print(f"⚠️ Skipping {method}: {', '.join(missing)} not found")
+        else:
+            methods.append(method)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        files = build_chunks(args.sample, work_dir, args.chunks, args.repeat)
+        total_mb = sum(os.path.getsize(path) for path in files) / (1024 * 1024)
+        print(f"Merging {len(files)} chunks, {total_mb:.1f} MB, {mp3_duration(files[0]) * len(files) / 60:.1f} min")
+        print(f"{'method':<8} {'seconds':>9} {'peak MB':>9} {'out MB':>8} {'audio s':>9}")
+        for method in methods:
+            result = benchmark(method, files, work_dir)
+            if "error" in result:
+                print(f"{method:<8} ❌ {result['error']}")
+                continue
+            print(f"{method:<8} {result['seconds']:>9.2f} {result['peak_rss_mb']:>9.1f} "
+                  f"{result['output_mb']:>8.1f} {result['duration_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Benchmark the whole PDF→MP3 pipeline offline, with synthetic PDFs and a fake TTS engine.
+
+For every page count and layout, a generated PDF is converted by
+PDFToMP3Converter in a fresh process whose edge_tts is replaced by the local
+stand-in from benchmarks/synthetic.py. Reports extraction pages/sec, synthesis
+chars/sec, merge MB/sec, peak RSS and end-to-end time, and writes everything
+to JSON. With --compare, the run is checked against an earlier results file
+and the script exits with status 1 if any case got slower than --threshold.
+
+    python benchmarks/pipeline_benchmark.py --pages 10 100 1000 --layouts text mixed
+    python benchmarks/pipeline_benchmark.py --compare benchmarks/results/<commit>.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import write_pdf, install_fake_edge_tts
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Metrics compared between runs, and whether a higher value is better
+COMPARED_METRICS = {
+    "extract_pages_per_second": True,
+    "synthesis_chars_per_second": True,
+    "merge_mb_per_second": True,
+    "end_to_end_seconds": False,
+    "peak_rss_mb": False,
+}
+
+
+def _run_case(pdf: str, work_dir: str, options: dict, results):
+    """Runs in a child process: extraction pass, then a full conversion against the fake engine."""
+    os.environ["TTS_CHUNK_RETRY_BACKOFF"] = str(options["retry_backoff"])
+    fake = install_fake_edge_tts(options["latency"], options["seconds_per_char"], options["failure_rate"],
+                                 options["chars_per_frame"], options["seed"])
+
+    from functions.pdf2mp3 import PDFToMP3Converter
+
+    merge_timing = {}
+
+    class BenchmarkConverter(PDFToMP3Converter):
+        def _merge_audio_files(self, temp_files: list, output_file: str):
+            started = time.perf_counter()
+            super()._merge_audio_files(temp_files, output_file)
+            merge_timing["seconds"] = time.perf_counter() - started
+            merge_timing["mb"] = sum(os.path.getsize(path) for path in temp_files) / (1024 * 1024)
+
+    converter = BenchmarkConverter(
+        max_concurrency=options["concurrency"], chunk_size=options["chunk_size"],
+        extract_workers=options["extract_workers"], extractor=options["extractor"],
+        use_text_store=False, use_audio_cache=False, use_tts_stats=False,
+    )
+    converter.output_dir = work_dir
+    converter.checkpoint_dir = os.path.join(work_dir, ".checkpoints")
+
+    log = io.StringIO()
+    with redirect_stdout(sys.stdout if options["verbose"] else log):
+        started = time.perf_counter()
+        pages = converter.iter_pages(pdf)
+        page_count = sum(1 for _ in pages)
+        extract_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            asyncio.run(converter.convert_async_chunked(pdf, "male"))
+        except Exception as e:
+            # e.g. a chunk that kept failing under --failure-rate
+            results.put({"error": f"{type(e).__name__}: {e}"})
+            return
+        end_to_end = time.perf_counter() - started
+
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    results.put({
+        "pages_extracted": page_count,
+        "extract_seconds": round(extract_seconds, 4),
+        "extract_pages_per_second": round(page_count / extract_seconds, 1),
+        "normalization_chars_saved": converter.normalizer.chars_saved if converter.normalizer else 0,
+        "synthesis_requests": fake.requests,
+        "synthesis_failures": fake.failures,
+        "synthesis_chars": fake.chars,
+        "synthesis_seconds": round(fake.seconds, 4),
+        "synthesis_chars_per_second": round(fake.chars / fake.seconds, 1) if fake.seconds else None,
+        "merge_mb": round(merge_timing["mb"], 3),
+        "merge_seconds": round(merge_timing["seconds"], 4),
+        "merge_mb_per_second": round(merge_timing["mb"] / merge_timing["seconds"], 1),
+        "end_to_end_seconds": round(end_to_end, 4),
+        "peak_rss_mb": round(max(self_rss, child_rss) / 1024, 1),
+    })
+
+
+def run_case(pdf: str, options: dict) -> dict:
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_run_case, args=(pdf, work_dir, options, results))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            return {"error": f"exit code {process.exitcode}"}
+        return results.get()
+
+
+def git_commit() -> str:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return result.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def compare(current: list, baseline: list, threshold: float) -> list:
+    """Print the change of every metric against the baseline; returns the regressions."""
+    previous = {(case["pages"], case["layout"]): case for case in baseline}
+    regressions = []
+    for case in current:
+        before = previous.get((case["pages"], case["layout"]))
+        if not before or "error" in case or "error" in before:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not before.get(metric) or case.get(metric) is None:
+                continue
+            change = (case[metric] - before[metric]) / before[metric]
+            worse = -change if higher_is_better else change
+            marker = "❌" if worse > threshold else "  "
+            print(f"{marker} {case['pages']:>5} {case['layout']:<6} {metric:<28} "
+                  f"{before[metric]:>12} → {case[metric]:>12} ({change:+.1%})")
+            if worse > threshold:
+                regressions.append((case["pages"], case["layout"], metric, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--layouts", nargs="+", default=["text", "mixed"], choices=["text", "mixed"])
+    parser.add_argument("--latency", type=float, default=0.05, help="fake TTS seconds per request")
+    parser.add_argument("--seconds-per-char", type=float, default=0.00001, help="fake TTS seconds per character")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of fake TTS attempts that fail")
+    parser.add_argument("--chars-per-frame", type=int, default=40, help="characters per 24 ms of fake audio")
+    parser.add_argument("--retry-backoff", type=float, default=0.0, help="base delay between chunk retries")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=None, help="fixed chunk size (default: TTS_CHUNK_SIZE)")
+    parser.add_argument("--extract-workers", type=int, default=None)
+    parser.add_argument("--extractor", default=None, help="fast, layout or auto (default: PDF_EXTRACTOR)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown counted as a regression")
+    parser.add_argument("--verbose", action="store_true", help="show the converter's own output")
+    args = parser.parse_args()
+
+    options = {
+        "latency": args.latency, "seconds_per_char": args.seconds_per_char, "failure_rate": args.failure_rate,
+        "chars_per_frame": args.chars_per_frame, "retry_backoff": args.retry_backoff,
+        "concurrency": args.concurrency, "chunk_size": args.chunk_size, "extract_workers": args.extract_workers,
+        "extractor": args.extractor, "seed": args.seed, "verbose": args.verbose,
+    }
+
+    cases = []
+    print(f"{'pages':>5} {'layout':<6} {'extract p/s':>11} {'synth c/s':>11} {'merge MB/s':>10} "
+          f"{'peak MB':>8} {'total s':>8}")
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        for pages in args.pages:
+            for layout in args.layouts:
+                pdf = os.path.join(pdf_dir, f"synthetic_{pages}_{layout}.pdf")
+                write_pdf(pdf, pages, layout, args.seed)
+                case = {"pages": pages, "layout": layout, "pdf_mb": round(os.path.getsize(pdf) / (1024 * 1024), 3)}
+                result = run_case(pdf, options)
+                case.update(result)
+                cases.append(case)
+                if "error" in case:
+                    print(f"{pages:>5} {layout:<6} ❌ {case['error']}")
+                    continue
+                print(f"{pages:>5} {layout:<6} {case['extract_pages_per_second']:>11.1f} "
+                      f"{case['synthesis_chars_per_second']:>11.0f} {case['merge_mb_per_second']:>10.1f} "
+                      f"{case['peak_rss_mb']:>8.1f} {case['end_to_end_seconds']:>8.2f}")
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "options": {key: value for key, value in options.items() if key != "verbose"},
+        "cases": cases,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline.get('commit', args.compare)}:")
+        regressions = compare(cases, baseline["cases"], args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Check that importing the API stays within a time budget and loads no heavy dependencies.
+
+Imports main.py in fresh interpreters, reports the median import time and the
+slowest modules (from python -X importtime), and exits with status 1 if the
+median is over budget or if any of the heavy packages got imported eagerly.
+
+    python benchmarks/startup_budget.py --budget 1.0 --runs 5
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Packages that must only be imported when a request needs them
+HEAVY_MODULES = [
+    "selenium", "webdriver_manager", "pdfplumber", "PyPDF2", "pydub", "edge_tts", "twilio", "supabase",
+]
+
+DEFAULT_BUDGET = float(os.getenv("STARTUP_BUDGET_SECONDS", "1.0"))
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure_once() -> dict:
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing main failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int) -> list:
+    """(cumulative seconds, module) for the slowest modules imported directly by main, from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=ROOT, capture_output=True, text=True)
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting shows as two extra spaces of indent per level; main's own imports are one level down
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            timings.append((int(cumulative_us) / 1e6, name.strip()))
+    return sorted(timings, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="max median import time in seconds")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    median = statistics.median(run["seconds"] for run in runs)
+    loaded_heavy = sorted({
+        module for run in runs for module in run["modules"] if module.split(".")[0] in HEAVY_MODULES
+    })
+    heavy_roots = sorted({module.split(".")[0] for module in loaded_heavy})
+
+    print(f"import main: median {median:.3f}s over {args.runs} runs (budget {args.budget:.3f}s)")
+    print("Slowest imports of main.py:")
+    for seconds, name in slowest_imports(args.top):
+        print(f"  {seconds:8.3f}s  {name}")
+
+    failed = False
+    if heavy_roots:
+        print(f"❌ Heavy dependencies imported at startup: {', '.join(heavy_roots)}")
+        failed = True
+    if median > args.budget:
+        print(f"❌ Startup is over budget by {median - args.budget:.3f}s")
+        failed = True
+    if not failed:
+        print("✅ Startup within budget")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Synthetic inputs for the offline benchmarks: generated PDFs and a fake edge-tts.
+
+The PDFs are written by hand (no PDF library needed) with deterministic
+pseudo-prose, a running header, page numbers and a "Chapter N" heading every
+ten pages. The "mixed" layout adds two-column pages, tables and figures with
+captions. The fake edge-tts replaces the real module in sys.modules and
+answers every request locally with silent MP3 frames after a configurable
+delay, failing a configurable, deterministic share of attempts.
+"""
+import sys
+import math
+import time
+import types
+import random
+import asyncio
+import hashlib
+import textwrap
+
+WORDS = (
+    "the a of and to in was he she it that his her with as for had you not on at but by "
+    "river house morning letter window silence garden evening voice road answer question "
+    "remembered walked looked said thought turned waited smiled opened closed carried "
+    "quietly slowly suddenly again never always perhaps almost together across beyond"
+).split()
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+MARGIN = 72
+FONT_SIZE = 11
+LEADING = 15
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+    return " ".join(words).capitalize() + rng.choice([".", ".", ".", "?", "!"])
+
+
+def _paragraphs(rng: random.Random, count: int) -> list:
+    return [" ".join(_sentence(rng) for _ in range(rng.randint(3, 7))) for _ in range(count)]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text(x: float, y: float, text: str, font: str = "F1", size: int = FONT_SIZE) -> str:
+    return f"BT /{font} {size} Tf {x:.1f} {y:.1f} Td ({_escape(text)}) Tj ET\n"
+
+
+def _column(lines: list, x: float, y: float, bottom: float) -> tuple:
+    """Draw lines downwards from y; returns (content, lines that did not fit)."""
+    content = ""
+    for idx, line in enumerate(lines):
+        if y < bottom:
+            return content, lines[idx:]
+        content += _text(x, y, line)
+        y -= LEADING
+    return content, []
+
+
+def _page_content(page: int, layout: str, rng: random.Random) -> str:
+    content = _text(MARGIN, PAGE_HEIGHT - 40, "A Synthetic Book - Benchmark Edition", size=9)
+    footer = _text(PAGE_WIDTH / 2, 30, str(page + 1), size=9)
+    y = PAGE_HEIGHT - MARGIN
+    if page % 10 == 0:
+        content += _text(MARGIN, y, f"Chapter {page // 10 + 1}", font="F2", size=18)
+        y -= 2 * LEADING
+
+    kind = "text"
+    if layout == "mixed":
+        kind = ("text", "columns", "table", "figure")[page % 4]
+
+    if kind == "columns":
+        width = (PAGE_WIDTH - 2 * MARGIN - 24) / 2
+        lines = [line for paragraph in _paragraphs(rng, 8) for line in textwrap.wrap(paragraph, int(width / 5.2))]
+        left, rest = _column(lines, MARGIN, y, MARGIN)
+        right, _ = _column(rest, MARGIN + width + 24, y, MARGIN)
+        return content + left + right + footer
+
+    if kind == "table":
+        rows, cols = 8, 4
+        cell_w, cell_h = (PAGE_WIDTH - 2 * MARGIN) / cols, 20
+        for row in range(rows):
+            for col in range(cols):
+                x, cell_y = MARGIN + col * cell_w, y - (row + 1) * cell_h
+                content += f"{x:.1f} {cell_y:.1f} {cell_w:.1f} {cell_h:.1f} re S\n"
+                label = f"Item {row}" if col == 0 else f"{rng.randint(0, 9999):,}"
+                content += _text(x + 4, cell_y + 6, label, size=9)
+        y -= (rows + 1) * cell_h + LEADING
+    elif kind == "figure":
+        content += "0.85 g\n"
+        content += f"{MARGIN} {y - 220} {PAGE_WIDTH - 2 * MARGIN} 220 re f\n"
+        for bar in range(12):
+            height = rng.randint(20, 200)
+            content += f"0.3 g {MARGIN + 20 + bar * 38} {y - 210} 24 {height} re f\n"
+        content += "0 g\n"
+        y -= 236
+        content += _text(MARGIN, y, f"Figure {page + 1}. {_sentence(rng)}", size=9)
+        y -= 2 * LEADING
+
+    lines = []
+    for paragraph in _paragraphs(rng, 12):
+        lines.extend(textwrap.wrap(paragraph, 84))
+        lines.append("")
+    body, _ = _column(lines, MARGIN, y, MARGIN)
+    return content + body + footer
+
+
+def write_pdf(path: str, pages: int, layout: str = "text", seed: int = 0):
+    """Write a PDF of `pages` pages; layout is "text" or "mixed"."""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        rng = random.Random(f"{seed}:{page}")
+        stream = _page_content(page, layout, rng).encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>"
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            body = body if isinstance(body, bytes) else body.encode("latin-1")
+            f.write(f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1"))
+
+
+# One MPEG-2 Layer III frame, 48 kbps, 24 kHz mono (edge-tts' format), all-zero side info: 24 ms of silence
+SILENT_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC0]) + bytes(140)
+
+
+class FakeTTSStats:
+    """What the fake engine was asked to do, for computing throughput."""
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.chars = 0
+        self.bytes = 0
+        self.first_start = None
+        self.last_end = None
+
+    @property
+    def seconds(self) -> float:
+        if self.first_start is None:
+            return 0.0
+        return self.last_end - self.first_start
+
+
+def install_fake_edge_tts(latency: float = 0.05, seconds_per_char: float = 0.0, failure_rate: float = 0.0,
+                          chars_per_frame: int = 40, seed: int = 0) -> FakeTTSStats:
+    """Replace edge_tts in sys.modules with a local stand-in; returns its live stats.
+
+    Each request sleeps latency + seconds_per_char * len(text), then writes one
+    silent frame per chars_per_frame characters. Whether an attempt fails
+    depends only on the seed, the text and how often that text was tried, so
+    runs are reproducible regardless of scheduling.
+    """
+    stats = FakeTTSStats()
+    attempts = {}
+
+    class Communicate:
+        def __init__(self, text: str, voice: str, rate: str = "+0%", **kwargs):
+            self.text = text
+            self.voice = voice
+
+        async def save(self, path: str):
+            text_hash = hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+            attempt = attempts.get(text_hash, 0)
+            attempts[text_hash] = attempt + 1
+
+            started = time.perf_counter()
+            if stats.first_start is None:
+                stats.first_start = started
+            stats.requests += 1
+            await asyncio.sleep(latency + seconds_per_char * len(self.text))
+            stats.last_end = time.perf_counter()
+
+            roll = int(hashlib.sha256(f"{seed}:{attempt}:{text_hash}".encode()).hexdigest()[:8], 16) / 2 ** 32
+            if roll < failure_rate:
+                stats.failures += 1
+                raise ConnectionError("injected failure")
+
+            data = SILENT_FRAME * max(1, math.ceil(len(self.text) / chars_per_frame))
+            with open(path, "wb") as f:
+                f.write(data)
+            stats.chars += len(self.text)
+            stats.bytes += len(data)
+
+    async def list_voices():
+        return []
+
+    module = types.ModuleType("edge_tts")
+    module.Communicate = Communicate
+    module.list_voices = list_voices
+    sys.modules["edge_tts"] = module
+    return stats
@@ -1,46 +1,300 @@
 import os
 import time
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
 
+load_dotenv()
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 DOWNLOAD_DIR = os.path.join(BASE_DIR, "pdf")
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
+# Site books are downloaded from; point it at a local stand-in to exercise the pool offline
+FLIPHTML5_URL = os.getenv("FLIPHTML5_URL", "https://fliphtml5.com").rstrip("/")
+FLIPHTML5_EMAIL = os.getenv("FLIPHTML5_EMAIL")
+FLIPHTML5_PASSWORD = os.getenv("FLIPHTML5_PASSWORD")
 
+LOGIN_EMAIL_XPATH = "/html/body/div[1]/div/main/div[3]/div/div[4]/input"
+LOGIN_PASSWORD_XPATH = "/html/body/div[1]/div/main/div[3]/div/div[5]/input"
+LOGIN_BUTTON_XPATH = "/html/body/div[1]/div/main/div[3]/div/div[6]/div[2]"
+DOWNLOAD_BUTTON_SELECTOR = "i.icon-download-btn"
+DOWNLOAD_LINK_XPATH = "/html/body/div[8]/div/div[3]/div[1]/div[2]/a"
+
+# Seconds to wait for the login form, and for the site to accept the login
+LOGIN_TIMEOUT = float(os.getenv("FLIPHTML5_LOGIN_TIMEOUT", "15"))
+
+# Chrome sessions kept open and logged in; downloads beyond this wait for a free one
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+
+# Sessions opened at startup, so the first download does not pay for Chrome and the login
+BROWSER_POOL_WARM = int(os.getenv("BROWSER_POOL_WARM", "1"))
+
+# A session is replaced after this many downloads or seconds, to bound Chrome's memory growth
+BROWSER_SESSION_MAX_USES = int(os.getenv("BROWSER_SESSION_MAX_USES", "20"))
+BROWSER_SESSION_MAX_AGE = float(os.getenv("BROWSER_SESSION_MAX_AGE", "3600"))
+
+# Longest a download waits for a free session
+BROWSER_POOL_ACQUIRE_TIMEOUT = float(os.getenv("BROWSER_POOL_ACQUIRE_TIMEOUT", "300"))
+
+# A fixed chromedriver binary; otherwise webdriver-manager resolves one (once per process)
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def resolve_driver_path() -> str:
+    """Path of the chromedriver binary, resolved on first use and reused afterwards."""
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            if CHROMEDRIVER_PATH:
+                _driver_path = CHROMEDRIVER_PATH
+            else:
+                # Selenium is only loaded by the processes that actually download books
+                from webdriver_manager.chrome import ChromeDriverManager
+                _driver_path = ChromeDriverManager().install()
+            print(f"[Browser] Using chromedriver: {_driver_path}")
+    return _driver_path
+
+
+def setup_driver(download_dir: str = DOWNLOAD_DIR):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
 
-def setup_driver():
     options = Options()
     options.add_argument("--headless=new")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-gpu")
     options.add_argument("--disable-setuid-sandbox")
-    options.add_argument("--remote-debugging-port=9222")
 
     prefs = {
-        "download.default_directory": os.path.abspath(DOWNLOAD_DIR),
+        "download.default_directory": os.path.abspath(download_dir),
         "plugins.always_open_pdf_externally": True,
         "download.prompt_for_download": False,
     }
     options.add_experimental_option("prefs", prefs)
 
-    # Automatically download and use the correct chromedriver
-    service = Service(ChromeDriverManager().install())
+    service = Service(resolve_driver_path())
 
     return webdriver.Chrome(service=service, options=options)
 
+
+def set_download_dir(driver, download_dir: str):
+    """Send a running session's next downloads to download_dir (the pref only applies at startup)."""
+    driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+        "behavior": "allow",
+        "downloadPath": os.path.abspath(download_dir),
+    })
+
+
+def is_login_page(driver) -> bool:
+    """True if the site sent the session to its login form, i.e. the login expired."""
+    from selenium.webdriver.common.by import By
+
+    return "login" in driver.current_url or bool(driver.find_elements(By.XPATH, LOGIN_EMAIL_XPATH))
+
+
+def login(driver):
+    """Log a session into fliphtml5; raises if the credentials are not configured or the site does not accept them in time."""
+    if not FLIPHTML5_EMAIL or not FLIPHTML5_PASSWORD:
+        raise RuntimeError("FLIPHTML5_EMAIL and FLIPHTML5_PASSWORD must be set to log into fliphtml5")
+
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    print("Navigating to login...")
+    driver.get(f"{FLIPHTML5_URL}/login.php")
+
+    WebDriverWait(driver, LOGIN_TIMEOUT).until(EC.presence_of_element_located((By.XPATH, LOGIN_EMAIL_XPATH)))
+    driver.find_element(By.XPATH, LOGIN_EMAIL_XPATH).send_keys(FLIPHTML5_EMAIL)
+    driver.find_element(By.XPATH, LOGIN_PASSWORD_XPATH).send_keys(FLIPHTML5_PASSWORD)
+    WebDriverWait(driver, LOGIN_TIMEOUT).until(EC.element_to_be_clickable((By.XPATH, LOGIN_BUTTON_XPATH))).click()
+
+    # Logged in once the site navigates away from the login form
+    WebDriverWait(driver, LOGIN_TIMEOUT).until(lambda d: "login" not in d.current_url)
+    print("Logged in")
+
+
+class BrowserSession:
+    """One long-lived, logged-in Chrome session."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+    def worn_out(self, max_uses: int, max_age: float) -> bool:
+        return self.uses >= max_uses or time.monotonic() - self.created_at >= max_age
+
+    def healthy(self) -> bool:
+        """True if Chrome still answers; a crashed browser or driver raises here."""
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"[Browser] ⚠️ Could not close session: {e}")
+
+
+class BrowserPool:
+    """Bounded pool of logged-in Chrome sessions that book downloads borrow.
+
+    Sessions are opened (and logged in) on demand up to `size`, or ahead of
+    time by start(). A borrowed session is health-checked first and replaced
+    if Chrome stopped answering; sessions are recycled after max_uses
+    downloads or max_age seconds, and dropped if they broke during a
+    download. driver_factory and login_fn can be swapped, e.g. for a local
+    stand-in of the site.
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, max_uses: int = BROWSER_SESSION_MAX_USES,
+                 max_age: float = BROWSER_SESSION_MAX_AGE, driver_factory=setup_driver, login_fn=login):
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.max_age = max_age
+        self.driver_factory = driver_factory
+        self.login_fn = login_fn
+        self._idle = []
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {"opened": 0, "recycled": 0, "unhealthy": 0, "relogins": 0, "failed_opens": 0}
+
+    def _new_session(self) -> BrowserSession:
+        print("[Browser] Starting a Chrome session")
+        driver = self.driver_factory()
+        try:
+            self.login_fn(driver)
+        except BaseException:
+            driver.quit()
+            raise
+        self.stats["opened"] += 1
+        return BrowserSession(driver)
+
+    def start(self, warm: int = BROWSER_POOL_WARM):
+        """Resolve chromedriver and open `warm` sessions now; meant to run once at startup."""
+        try:
+            if self.driver_factory is setup_driver:
+                resolve_driver_path()
+            sessions = []
+            for _ in range(min(warm, self.size)):
+                session = self.acquire()
+                # Warming up is not a download
+                session.uses -= 1
+                sessions.append(session)
+            for session in sessions:
+                self.release(session)
+            if sessions:
+                print(f"✅ [Browser] {len(sessions)} Chrome sessions ready")
+        except Exception as e:
+            print(f"[Browser] ⚠️ Could not warm up the session pool: {e}")
+
+    def acquire(self, timeout: float = BROWSER_POOL_ACQUIRE_TIMEOUT) -> BrowserSession:
+        """Borrow a healthy, logged-in session, waiting up to timeout seconds for a free one."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Browser pool is closed")
+                if self._idle:
+                    session = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    # Reserve a slot, the session is opened outside the lock
+                    self._open += 1
+                    session = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No browser session free after {timeout:g}s")
+                self._cond.wait(remaining)
+
+        try:
+            if session and session.worn_out(self.max_uses, self.max_age):
+                self.stats["recycled"] += 1
+                session.quit()
+                session = None
+            elif session and not session.healthy():
+                print("[Browser] ⚠️ Session stopped answering, replacing it")
+                self.stats["unhealthy"] += 1
+                session.quit()
+                session = None
+            if session is None:
+                session = self._new_session()
+        except BaseException:
+            self.stats["failed_opens"] += 1
+            self._discard_slot()
+            raise
+
+        session.uses += 1
+        return session
+
+    def _discard_slot(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def release(self, session: BrowserSession, broken: bool = False):
+        """Return a borrowed session; broken or worn-out sessions are closed instead of reused."""
+        if broken or self._closed or session.worn_out(self.max_uses, self.max_age):
+            if not broken:
+                self.stats["recycled"] += 1
+            session.quit()
+            self._discard_slot()
+            return
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    @contextmanager
+    def session(self, timeout: float = BROWSER_POOL_ACQUIRE_TIMEOUT):
+        """Borrow a session for a block; if the block fails, the session is kept only if Chrome still answers."""
+        session = self.acquire(timeout)
+        try:
+            yield session
+        except BaseException:
+            self.release(session, broken=not session.healthy())
+            raise
+        self.release(session)
+
+    def relogin(self, session: BrowserSession):
+        """Log a session in again after the site expired its login."""
+        print("[Browser] Session login expired, logging in again")
+        self.stats["relogins"] += 1
+        self.login_fn(session.driver)
+
+    def close(self):
+        """Quit every idle session; borrowed ones are closed when they are returned."""
+        with self._cond:
+            self._closed = True
+            sessions, self._idle = self._idle, []
+            self._open -= len(sessions)
+            self._cond.notify_all()
+        for session in sessions:
+            session.quit()
+
+
+browser_pool = BrowserPool()
+
+
 def wait_for_file(download_dir, timeout=30):
+    """Wait for a finished PDF in download_dir; Chrome keeps partial downloads as .crdownload files."""
     seconds = 0
     while seconds < timeout:
-        files = [f for f in os.listdir(download_dir) if f.endswith(".pdf")]
-        if files:
+        names = os.listdir(download_dir)
+        files = [f for f in names if f.endswith(".pdf")]
+        if files and not any(f.endswith(".crdownload") for f in names):
             print(f"Found {files[0]} in the download directory. {download_dir}")
             return os.path.join(download_dir, files[0])
         time.sleep(1)
@@ -49,60 +303,68 @@ def wait_for_file(download_dir, timeout=30):
     return None
 
 
-def download_book(book_name: str):
-    print("Driver fetch")
-    driver = setup_driver()
-    print("Driver started")
+def download_book(book_name: str, download_dir: str = DOWNLOAD_DIR, pool: BrowserPool = None):
+    """Download a book's PDF into download_dir and return its path, or None.
 
-    file_path = None
+    Uses a logged-in session borrowed from the pool. The session saves into a
+    fresh staging directory, so the file found is the one this call
+    downloaded even while other downloads run; it is then renamed into
+    download_dir.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
 
-    try:
-        print("Navigating to login...")
-        driver.get("https://fliphtml5.com/login.php")
+    pool = pool or browser_pool
+    os.makedirs(download_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix=".download-", dir=download_dir)
 
-        WebDriverWait(driver, 3).until(EC.presence_of_element_located((By.XPATH, "/html/body/div[1]/div/main/div[3]/div/div[4]/input")))
-        driver.find_element(By.XPATH, "/html/body/div[1]/div/main/div[3]/div/div[4]/input").send_keys("nitaynewman@gmail.com")
-        driver.find_element(By.XPATH, "/html/body/div[1]/div/main/div[3]/div/div[5]/input").send_keys("YX.qTJBf!T6QWJ7")
-        time.sleep(2)
-        driver.find_element(By.XPATH, '/html/body/div[1]/div/main/div[3]/div/div[6]/div[2]').click()
-        print("Logged in")
-        time.sleep(5)
+    file_path = None
 
-        search_url = f"https://fliphtml5.com/exploring/?q={book_name}"
-        print(f"Navigating to: {search_url}")
-        driver.get(search_url)
+    try:
+        with pool.session() as session:
+            driver = session.driver
+            set_download_dir(driver, staging_dir)
+            search_url = f"{FLIPHTML5_URL}/exploring/?q={book_name}"
+            print(f"Navigating to: {search_url}")
+            driver.get(search_url)
+            if is_login_page(driver):
+                pool.relogin(session)
+                driver.get(search_url)
 
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "i.icon-download-btn"))
-        )
-        print("Found download buttons")
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, DOWNLOAD_BUTTON_SELECTOR))
+            )
+            print("Found download buttons")
 
-        download_buttons = driver.find_elements(By.CSS_SELECTOR, "i.icon-download-btn")
-        if not download_buttons:
-            print("No download buttons found")
-            return None
+            download_buttons = driver.find_elements(By.CSS_SELECTOR, DOWNLOAD_BUTTON_SELECTOR)
+            print("Clicking download button")
+            download_buttons[0].click()
 
-        print("Clicking download button")
-        download_buttons[0].click()
+            print("Waiting for popup download link...")
+            WebDriverWait(driver, 5).until(
+                EC.element_to_be_clickable((By.XPATH, DOWNLOAD_LINK_XPATH))
+            ).click()
 
-        print("Waiting for popup download link...")
-        WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.XPATH, '/html/body/div[8]/div/div[3]/div[1]/div[2]/a'))
-        ).click()
+            print("Download triggered")
 
-        print("Download triggered")
+            # The session stays borrowed until its download has finished; if
+            # nothing was triggered the error above returns it to the pool at once
+            file_path = wait_for_file(staging_dir)
 
     except Exception as e:
         print(f"Error during download: {e}")
 
     finally:
-        file_path = wait_for_file(DOWNLOAD_DIR)
-        driver.quit()
-        print("Driver closed")
+        if file_path:
+            final_path = os.path.join(download_dir, os.path.basename(file_path))
+            os.replace(file_path, final_path)
+            file_path = final_path
+        shutil.rmtree(staging_dir, ignore_errors=True)
 
     if file_path:
         print(f"Downloaded file: {file_path}")
     else:
         print("Download failed or file not found.")
 
-    return file_path
\ No newline at end of file
+    return file_path
@@ -0,0 +1,158 @@
+import os
+import re
+import json
+from functions.mp3_frames import concat_mp3
+
+
+MANIFEST_NAME = "chapters.json"
+
+NUMBER_WORDS = (
+    "one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|"
+    "sixteen|seventeen|eighteen|nineteen|twenty|thirty|forty|fifty"
+)
+
+# "Chapter 3", "CHAPTER XII", "Part Two: ...", or a standalone "Prologue"
+CHAPTER_HEADING = re.compile(
+    rf"^(?:(?:chapter|part|book)\s+(?:\d+|[ivxlcdm]+|(?:{NUMBER_WORDS})(?:[-\s](?:{NUMBER_WORDS}))?)\b.*"
+    r"|(?:prologue|epilogue|introduction|preface|foreword|afterword)\s*)$",
+    re.IGNORECASE,
+)
+
+# Lines at the top of a page searched for a heading
+HEADING_LINES = 5
+
+
+def chapter_filename(index: int) -> str:
+    return f"chapter_{index:03d}.mp3"
+
+
+def outline_chapters(file: str) -> list:
+    """(title, start page) of the top-level PDF bookmarks, or [] if the PDF has no usable outline."""
+    import PyPDF2
+
+    try:
+        reader = PyPDF2.PdfReader(file)
+        outline = reader.outline
+    except Exception as e:
+        print(f"⚠️ Could not read PDF outline: {e}")
+        return []
+
+    entries = [entry for entry in outline if not isinstance(entry, list)]
+    # A single top-level bookmark (usually the book title) with children: use the children
+    if len(entries) < 2:
+        nested = next((entry for entry in outline if isinstance(entry, list)), [])
+        entries = [entry for entry in nested if not isinstance(entry, list)]
+
+    starts = []
+    for entry in entries:
+        try:
+            page = reader.get_destination_page_number(entry)
+        except Exception:
+            continue
+        if page is not None and page >= 0:
+            starts.append((str(entry.title).strip() or f"Chapter {len(starts) + 1}", page))
+    return starts
+
+
+def heading_chapters(page_texts) -> list:
+    """(title, start page) for pages that open with a chapter heading.
+
+    Only the first few lines of a page are considered, and pages with several
+    headings (tables of contents) are skipped.
+    """
+    starts = []
+    for page, text in enumerate(page_texts):
+        lines = [line.strip() for line in (text or "").splitlines() if line.strip()]
+        if sum(1 for line in lines if CHAPTER_HEADING.match(line)) > 2:
+            continue
+
+        for position, line in enumerate(lines[:HEADING_LINES]):
+            if not CHAPTER_HEADING.match(line):
+                continue
+            title = line
+            # "Chapter 3" followed by a short subtitle line: "Chapter 3: The Storm"
+            following = lines[position + 1] if position + 1 < len(lines) else ""
+            if len(line.split()) <= 3 and following and len(following) <= 60 and not following.endswith("."):
+                title = f"{line}: {following}"
+            starts.append((title, page))
+            break
+    return starts
+
+
+def chapter_ranges(starts: list, page_count: int) -> list:
+    """Turn (title, start page) pairs into chapters covering every page of the book."""
+    by_page = {}
+    for title, page in sorted(starts, key=lambda start: start[1]):
+        if 0 <= page < page_count:
+            by_page.setdefault(page, title)
+
+    if len(by_page) < 2:
+        return [{"title": "Full book", "start_page": 0, "end_page": page_count}]
+
+    pages = sorted(by_page)
+    if pages[0] > 0:
+        by_page[0] = "Front matter"
+        pages.insert(0, 0)
+
+    return [
+        {
+            "title": by_page[start],
+            "start_page": start,
+            "end_page": pages[idx + 1] if idx + 1 < len(pages) else page_count,
+        }
+        for idx, start in enumerate(pages)
+    ]
+
+
+def write_chapters(chapters_dir: str, chapters: list, chunk_files: list, chunk_chapters: list,
+                   concat=concat_mp3) -> dict:
+    """Join each chapter's chunk files into one MP3 and write chapters.json.
+
+    concat(files, path) joins the files and returns a dict with their
+    "duration"; the default copies MP3 frames and raises ValueError for
+    anything else.
+
+    chunk_chapters[i] is the chapter index of chunk_files[i]. Chapters without
+    any text (and so without audio) are left out. Each manifest entry has the
+    chapter's title, pages, file, byte size, duration and its start time in
+    the combined stream.
+    """
+    os.makedirs(chapters_dir, exist_ok=True)
+    entries = []
+    start = 0.0
+    for chapter_idx, chapter in enumerate(chapters):
+        files = [path for path, owner in zip(chunk_files, chunk_chapters) if owner == chapter_idx]
+        if not files:
+            continue
+
+        index = len(entries)
+        path = os.path.join(chapters_dir, chapter_filename(index))
+        result = concat(files, path)
+        entries.append({
+            "index": index,
+            "title": chapter["title"],
+            "start_page": chapter["start_page"],
+            "end_page": chapter["end_page"],
+            "file": chapter_filename(index),
+            "bytes": os.path.getsize(path),
+            "duration": round(result["duration"], 3),
+            "start": round(start, 3),
+        })
+        start += result["duration"]
+
+    manifest = {"duration": round(start, 3), "chapters": entries}
+    manifest_path = os.path.join(chapters_dir, MANIFEST_NAME)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def read_chapters(chapters_dir: str) -> dict:
+    """Load chapters.json, or None if the directory has no manifest."""
+    try:
+        with open(os.path.join(chapters_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
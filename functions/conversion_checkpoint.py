@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: claims only hold within one process
+    fcntl = None
+
+
+def _sha256_file(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ConversionCheckpoint:
+    """Chunk-level progress of one conversion, persisted next to its chunk files.
+
+    The checkpoint directory is named after a hash of everything that
+    determines the chunk audio (PDF digest, engine, voice, rate, chunk size,
+    extractor), so a retried or restarted job for the same input finds it
+    again. manifest.json records, per chunk index, the hash of the chunk text
+    and the SHA-256 of the finished MP3; a chunk counts as done only if both
+    still match.
+
+    Use claim() to make sure only one running conversion, in any server
+    process, writes to a checkpoint directory at a time.
+    """
+
+    MANIFEST_NAME = "manifest.json"
+    LOCK_NAME = ".lock"
+
+    # Checkpoint directories a running conversion in this process holds (where fcntl is missing)
+    _claimed = set()
+    _claimed_lock = threading.Lock()
+
+    def __init__(self, root_dir: str, identity: dict, private_root: str = None):
+        self.identity = identity
+        self.dir = self._dir_for(root_dir, identity)
+        self.private_root = private_root
+        self._lock_file = None
+        self.manifest_path = os.path.join(self.dir, self.MANIFEST_NAME)
+        self._lock = threading.Lock()
+
+        os.makedirs(self.dir, exist_ok=True)
+        self.chunks = self._load()
+
+    @staticmethod
+    def _dir_for(root_dir: str, identity: dict) -> str:
+        identity_hash = hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+        return os.path.join(root_dir, identity_hash[:24])
+
+    @staticmethod
+    def _read_chunks(manifest_path: str, identity: dict) -> dict:
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        if manifest.get("identity") != identity:
+            return {}
+        return manifest.get("chunks", {})
+
+    @classmethod
+    def claim(cls, root_dir: str, identity: dict, private_root: str) -> "ConversionCheckpoint":
+        """The shared checkpoint for identity, held until release().
+
+        While another conversion holds it (e.g. two jobs for the same book and
+        voice), a private checkpoint under private_root is returned instead; it
+        cannot be resumed and is deleted on release().
+        """
+        path = cls._dir_for(root_dir, identity)
+        held, lock_file = cls._acquire(path)
+        if not held:
+            return cls(private_root, identity, private_root=private_root)
+        try:
+            checkpoint = cls(root_dir, identity)
+        except BaseException:
+            cls._unlock(path, lock_file)
+            raise
+        checkpoint._lock_file = lock_file
+        return checkpoint
+
+    @classmethod
+    def _acquire(cls, path: str):
+        """(True, lock_file) once this conversion holds the directory, (False, None) if another one does."""
+        if fcntl:
+            lock_file = cls._lock_dir(path)
+            return lock_file is not None, lock_file
+        with cls._claimed_lock:
+            if path in cls._claimed:
+                return False, None
+            cls._claimed.add(path)
+        return True, None
+
+    @classmethod
+    def _lock_dir(cls, path: str):
+        """Take an exclusive flock on the directory's lock file; None if another conversion holds it."""
+        while True:
+            os.makedirs(path, exist_ok=True)
+            lock_path = os.path.join(path, cls.LOCK_NAME)
+            lock_file = open(lock_path, "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return None
+            try:
+                # The holder may have discarded the directory between our open and flock
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino:
+                    return lock_file
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+
+    @classmethod
+    def _unlock(cls, path: str, lock_file):
+        if lock_file:
+            lock_file.close()
+            return
+        with cls._claimed_lock:
+            cls._claimed.discard(path)
+
+    def release(self):
+        """Let other conversions use this checkpoint; a private one is deleted."""
+        if self.private_root:
+            shutil.rmtree(self.private_root, ignore_errors=True)
+            return
+        self._unlock(self.dir, self._lock_file)
+        self._lock_file = None
+
+    @classmethod
+    def sweep(cls, root_dir: str, max_age_seconds: float) -> int:
+        """Delete checkpoint directories nobody holds and nothing wrote to for max_age_seconds.
+
+        These are left by conversions that failed for good and were never
+        retried. Returns how many were deleted.
+        """
+        if not os.path.isdir(root_dir):
+            return 0
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for name in os.listdir(root_dir):
+            path = os.path.join(root_dir, name)
+            if not os.path.isdir(path) or cls._last_write(path) >= cutoff:
+                continue
+            held, lock_file = cls._acquire(path)
+            if not held:
+                continue
+            try:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+            finally:
+                cls._unlock(path, lock_file)
+        return removed
+
+    @staticmethod
+    def _last_write(path: str) -> float:
+        """Newest modification time of the directory and the files in it."""
+        latest = os.path.getmtime(path)
+        for entry in os.scandir(path):
+            try:
+                latest = max(latest, entry.stat().st_mtime)
+            except FileNotFoundError:
+                pass
+        return latest
+
+    @classmethod
+    def exists(cls, root_dir: str, identity: dict) -> bool:
+        """True if an earlier attempt with this identity left finished chunks; creates nothing."""
+        manifest_path = os.path.join(cls._dir_for(root_dir, identity), cls.MANIFEST_NAME)
+        return bool(cls._read_chunks(manifest_path, identity))
+
+    def _load(self) -> dict:
+        return self._read_chunks(self.manifest_path, self.identity)
+
+    def _save(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"identity": self.identity, "chunks": self.chunks}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def chunk_path(self, idx: int) -> str:
+        return os.path.join(self.dir, f"chunk_{idx}.mp3")
+
+    @property
+    def completed(self) -> int:
+        return len(self.chunks)
+
+    def is_done(self, idx: int, text: str) -> bool:
+        """True if chunk idx was finished for this exact text and its file is intact."""
+        with self._lock:
+            entry = self.chunks.get(str(idx))
+        if not entry or entry["text_sha256"] != _sha256_text(text):
+            return False
+
+        path = self.chunk_path(idx)
+        if os.path.exists(path) and _sha256_file(path) == entry["sha256"]:
+            return True
+
+        with self._lock:
+            self.chunks.pop(str(idx), None)
+            self._save()
+        return False
+
+    def mark_done(self, idx: int, text: str):
+        path = self.chunk_path(idx)
+        entry = {
+            "text_sha256": _sha256_text(text),
+            "sha256": _sha256_file(path),
+            "bytes": os.path.getsize(path),
+        }
+        with self._lock:
+            self.chunks[str(idx)] = entry
+            self._save()
+
+    def discard_incomplete(self, chunk_count: int):
+        """Remove chunk files that are not recorded as done, e.g. after a failed attempt."""
+        for idx in range(chunk_count):
+            path = self.chunk_path(idx)
+            with self._lock:
+                done = str(idx) in self.chunks
+            if not done and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except Exception as e:
+                    print(f"Warning: Could not delete temp file {path}: {e}")
+
+    def discard(self):
+        """Delete the checkpoint once the final output exists."""
+        shutil.rmtree(self.dir, ignore_errors=True)
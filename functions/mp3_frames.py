@@ -0,0 +1,254 @@
+import os
+import struct
+from functools import lru_cache
+
+
+# Bytes read per scan/copy step; merging keeps at most a couple of these in memory
+READ_BLOCK = 1024 * 1024
+
+# Bitrates in kbps for MPEG Layer III, indexed by the header's bitrate index
+BITRATES = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+SAMPLE_RATES = {
+    "mpeg1": [44100, 48000, 32000],
+    "mpeg2": [22050, 24000, 16000],
+    "mpeg2.5": [11025, 12000, 8000],
+}
+
+VERSIONS = {0b00: "mpeg2.5", 0b10: "mpeg2", 0b11: "mpeg1"}
+
+
+@lru_cache(maxsize=1024)
+def parse_frame_header(header: bytes):
+    """Decode a 4-byte MPEG audio Layer III frame header.
+
+    Returns a dict with version, bitrate, sample_rate, frame_length and
+    samples, or None if the bytes are not a valid Layer III header.
+    """
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+
+    version = VERSIONS.get((header[1] >> 3) & 0b11)
+    layer = (header[1] >> 1) & 0b11
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0b11
+    padding = (header[2] >> 1) & 0b1
+
+    if version is None or layer != 0b01 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrate = BITRATES["mpeg1" if version == "mpeg1" else "mpeg2"][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    samples = 1152 if version == "mpeg1" else 576
+    frame_length = samples // 8 * bitrate // sample_rate + padding
+
+    return {
+        "version": version,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "frame_length": frame_length,
+        "samples": samples,
+        "mono": (header[3] >> 6) == 0b11,
+    }
+
+
+def id3v2_size(head: bytes) -> int:
+    """Size of an ID3v2 tag at the start of head (including its header), or 0."""
+    if len(head) < 10 or head[:3] != b"ID3":
+        return 0
+    size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def is_wav(path: str) -> bool:
+    """True if the file holds RIFF/WAVE data; pyttsx3's espeak driver writes WAV whatever the extension."""
+    with open(path, "rb") as f:
+        return f.read(4) == b"RIFF"
+
+
+def side_info_size(header: dict) -> int:
+    """Length of the Layer III side information that follows the frame header."""
+    if header["version"] == "mpeg1":
+        return 17 if header["mono"] else 32
+    return 9 if header["mono"] else 17
+
+
+def audio_bounds(f, file_size: int):
+    """(start, end) of the audio data in an open MP3, excluding ID3v2 and ID3v1 tags."""
+    f.seek(0)
+    start = id3v2_size(f.read(10))
+    end = file_size
+    if file_size - start >= 128:
+        f.seek(file_size - 128)
+        if f.read(3) == b"TAG":
+            end = file_size - 128
+    return start, end
+
+
+def _scan_frames(f, start: int, end: int):
+    """Yield (offset, header) for the frames between start and end, reading in blocks."""
+    buffer = b""
+    buffer_start = start
+    offset = start
+    while offset + 4 <= end:
+        rel = offset - buffer_start
+        if rel + 4 > len(buffer):
+            f.seek(offset)
+            buffer = f.read(min(READ_BLOCK, end - offset))
+            buffer_start = offset
+            rel = 0
+            if len(buffer) < 4:
+                break
+
+        header = parse_frame_header(buffer[rel:rel + 4])
+        if header is None or header["frame_length"] < 4:
+            offset += 1
+            continue
+
+        yield offset, header
+        offset += header["frame_length"]
+
+
+def vbr_header_tag(f, offset: int, header: dict):
+    """b"Xing", b"Info" or b"VBRI" if the frame at offset is a VBR/Info header frame, else None."""
+    f.seek(offset)
+    frame = f.read(header["frame_length"])
+    xing_offset = 4 + side_info_size(header)
+    tag = frame[xing_offset:xing_offset + 4]
+    if tag in (b"Xing", b"Info"):
+        return tag
+    if frame[36:40] == b"VBRI":
+        return b"VBRI"
+    return None
+
+
+def iter_frames(path: str):
+    """Yield (offset, header) for every audio frame in an MP3 file.
+
+    Leading ID3v2 tags are skipped, and so is any junk between frames; the
+    scan stops at a trailing ID3v1 tag or the end of the file.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        start, end = audio_bounds(f, file_size)
+        yield from _scan_frames(f, start, end)
+
+
+def mp3_duration(path: str) -> float:
+    """Playing time of an MP3 file in seconds, counted frame by frame."""
+    duration = 0.0
+    with open(path, "rb") as f:
+        for idx, (offset, header) in enumerate(iter_frames(path)):
+            if idx == 0 and vbr_header_tag(f, offset, header):
+                continue
+            duration += header["samples"] / header["sample_rate"]
+    return duration
+
+
+def _unpadded(template: bytes) -> bytes:
+    # Same version, bitrate, sample rate and channel mode, without the padding bit
+    return bytes([template[0], template[1], template[2] & 0b11111101, template[3]])
+
+
+def _info_frame(template: bytes, header: dict, tag: bytes, frames: int, size: int) -> bytes:
+    """Build an Xing/Info frame carrying frame and byte counts, shaped like the template header."""
+    frame_header = _unpadded(template)
+    xing_offset = 4 + side_info_size(header)
+    frame = bytearray(parse_frame_header(frame_header)["frame_length"])
+    frame[:4] = frame_header
+    frame[xing_offset:xing_offset + 16] = tag + struct.pack(">III", 0x0003, frames, size)
+    return bytes(frame)
+
+
+def _copy_range(source, out, start: int, end: int):
+    if start is None or end <= start:
+        return
+    source.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        block = source.read(min(READ_BLOCK, remaining))
+        if not block:
+            break
+        out.write(block)
+        remaining -= len(block)
+
+
+def concat_mp3(input_files: list, output_file: str, progress_hook=None) -> dict:
+    """Concatenate MP3 files frame by frame into output_file.
+
+    Tags and per-file Xing/Info/VBRI frames are dropped, the audio frames
+    are copied in blocks, and a fresh Info (or Xing, if bitrates vary) frame
+    with the combined frame and byte counts is written at the start so
+    players report the right duration. Nothing is decoded and memory use does
+    not grow with the number or length of the inputs.
+
+    Raises ValueError if an input is not MP3 (e.g. WAV) or has no frames, or
+    if the inputs differ in MPEG version, sample rate or channel mode, since
+    their frames cannot share one stream.
+    """
+    stream_format = None
+    info_length = 0
+    template = None
+    bitrates = set()
+    frames = 0
+    duration = 0.0
+
+    with open(output_file, "wb") as out:
+        for idx, path in enumerate(input_files):
+            file_size = os.path.getsize(path)
+            if is_wav(path):
+                # WAV samples can look like frame syncs; never copy them as MP3
+                raise ValueError(f"{path} is WAV, not MP3")
+            with open(path, "rb") as scan, open(path, "rb") as source:
+                start, end = audio_bounds(scan, file_size)
+                run_start = run_end = None
+                first = True
+
+                for offset, header in _scan_frames(scan, start, end):
+                    if first:
+                        first = False
+                        if vbr_header_tag(source, offset, header):
+                            continue
+
+                    current_format = (header["version"], header["sample_rate"], header["mono"])
+                    if stream_format is None:
+                        stream_format = current_format
+                        source.seek(offset)
+                        template = source.read(4)
+                        info_length = parse_frame_header(_unpadded(template))["frame_length"]
+                        if info_length >= 4 + side_info_size(header) + 16:
+                            out.write(b"\0" * info_length)
+                        else:
+                            # Too small to carry an Info tag at this bitrate
+                            info_length = 0
+                    elif current_format != stream_format:
+                        raise ValueError(f"{path} is {current_format}, expected {stream_format}")
+
+                    bitrates.add(header["bitrate"])
+                    frames += 1
+                    duration += header["samples"] / header["sample_rate"]
+
+                    if offset != run_end:
+                        _copy_range(source, out, run_start, run_end)
+                        run_start = offset
+                    run_end = offset + header["frame_length"]
+
+                _copy_range(source, out, run_start, run_end)
+                if first:
+                    raise ValueError(f"{path} has no MP3 frames")
+
+            if progress_hook:
+                progress_hook(idx + 1, len(input_files))
+
+        size = out.tell()
+        if info_length:
+            out.seek(0)
+            tag = b"Info" if len(bitrates) == 1 else b"Xing"
+            out.write(_info_frame(template, parse_frame_header(template), tag, frames, size))
+
+    return {"frames": frames, "bytes": size, "duration": duration}
+
@@ -1,20 +1,125 @@
-import PyPDF2
 import os
-import edge_tts
-import pdfplumber
+import time
 import asyncio
 import subprocess
-import sys
 import platform
 import tempfile
-from pydub import AudioSegment
+import threading
+import re
+import uuid
+import multiprocessing
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from functions.text_extractors import get_extractor
+from helper.text_store import text_store, file_digest
+from helper.audio_cache import audio_cache
+from helper.tts_stats import tts_stats, CHUNK_SIZE_BUCKETS
+from functions.conversion_checkpoint import ConversionCheckpoint
+from functions.mp3_frames import concat_mp3, is_wav, mp3_duration
+from functions.text_normalizer import TextNormalizer
+from functions.chapters import outline_chapters, heading_chapters, chapter_ranges, write_chapters
+from functions.tts_workers import pyttsx3_pool, PYTTSX3_RATE
+from functions.tts_engines import engine_registry
+
+
+# Maximum number of edge-tts chunks synthesized at the same time
+DEFAULT_TTS_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+
+# Calculate chunk size for ~1 hour chunks
+# Assuming ~150 words per minute reading speed, ~5 chars per word
+# 1 hour = 60 minutes * 150 words * 5 chars = 45,000 chars
+DEFAULT_CHUNK_SIZE = int(os.getenv("TTS_CHUNK_SIZE", "45000"))
+
+# Unless TTS_CHUNK_SIZE is set, each conversion picks its chunk size from measured throughput
+ADAPTIVE_CHUNK_SIZE = os.getenv("TTS_CHUNK_SIZE") is None
+
+# Rough characters per PDF page, to estimate a book's length before extracting it
+CHARS_PER_PAGE_ESTIMATE = int(os.getenv("TTS_CHARS_PER_PAGE_ESTIMATE", "2000"))
+
+# Speaking rate, part of the audio cache key
+EDGE_TTS_RATE = "+0%"
+
+# Attempts per chunk before the conversion fails, and the base delay between them
+CHUNK_RETRIES = int(os.getenv("TTS_CHUNK_RETRIES", "3"))
+CHUNK_RETRY_BACKOFF = float(os.getenv("TTS_CHUNK_RETRY_BACKOFF", "2"))
+
+# Worker processes used for PDF text extraction (1 = extract in the calling process)
+DEFAULT_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "1"))
+
+# Text extraction strategy: "fast" (PyPDF2), "layout" (pdfplumber) or "auto" (fast with per-page fallback)
+DEFAULT_EXTRACTOR = os.getenv("PDF_EXTRACTOR", "auto")
+
+# Strip running headers, footers and page numbers and rejoin hyphenated words before chunking
+NORMALIZE_TEXT = os.getenv("TTS_NORMALIZE_TEXT", "1") == "1"
+
+# Pages handed to one extraction worker at a time
+PAGES_PER_RANGE = int(os.getenv("PDF_PAGES_PER_RANGE", "20"))
+
+# Where finished MP3s go (book-app/mp3 next to the project's root directory), and the
+# checkpoints interrupted conversions resume from
+OUTPUT_DIR = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")), "book-app/mp3")
+CHECKPOINT_DIR = os.path.join(OUTPUT_DIR, ".checkpoints")
+
+# Checkpoints nothing wrote to for this long belong to conversions nobody retried, and are deleted
+CHECKPOINT_MAX_AGE_SECONDS = int(os.getenv("TTS_CHECKPOINT_MAX_AGE", str(24 * 60 * 60)))
+
+# End of a sentence: terminal punctuation, optional closing quotes/brackets, then whitespace
+SENTENCE_END = re.compile(r'[.!?…]["\'”’)\]]*\s+')
+
+
+def _extract_page_range(extractor_name: str, file: str, start: int, end: int) -> list:
+    """Extract the text of pages [start, end) in a worker process."""
+    return get_extractor(extractor_name).extract_range(file, start, end)
+
+
+def _find_chunk_boundary(text: str, limit: int) -> int:
+    """Return the index to cut text at so the chunk stays under limit characters.
+
+    Prefers the last sentence end in the second half of the window, then the
+    last whitespace, and only cuts mid-word when there is no whitespace at all.
+    """
+    window = text[:limit]
+    sentence_cut = None
+    for match in SENTENCE_END.finditer(window):
+        sentence_cut = match.end()
+    if sentence_cut and sentence_cut >= limit // 2:
+        return sentence_cut
+
+    space_cut = max(window.rfind(" "), window.rfind("\n"))
+    if space_cut > 0:
+        return space_cut + 1
+    return limit
+
+
+def iter_text_chunks(pages, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Group a stream of page texts into sentence-bounded chunks of at most chunk_size chars.
+
+    Chunks are yielded as soon as enough text has been read, so callers can start
+    synthesizing before the rest of the document has been extracted.
+    """
+    buffer = ""
+    for page_text in pages:
+        if not page_text:
+            continue
+        buffer = f"{buffer}\n{page_text}" if buffer else page_text
+
+        while len(buffer) >= chunk_size:
+            cut = _find_chunk_boundary(buffer, chunk_size)
+            chunk = buffer[:cut].strip()
+            buffer = buffer[cut:].lstrip()
+            if chunk:
+                yield chunk
+
+    if buffer.strip():
+        yield buffer.strip()
 
 
 class PDFToMP3Converter:
-    def __init__(self, progress_callback=None):
-        # Get the absolute path of the project's root directory (be/)
-        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-        self.output_dir = os.path.join(project_root, "book-app/mp3")
+    def __init__(self, progress_callback=None, max_concurrency: int = None, chunk_size: int = None,
+                 extract_workers: int = None, extractor: str = None, use_text_store: bool = True,
+                 use_audio_cache: bool = True, scheduler=None, engines=None, use_tts_stats: bool = True,
+                 normalize_text: bool = None, work_dir: str = None):
+        self.output_dir = OUTPUT_DIR
 
         # Create the mp3 directory if it doesn't exist
         if not os.path.exists(self.output_dir):
@@ -23,26 +128,59 @@ class PDFToMP3Converter:
         # Progress callback for real-time updates
         self.progress_callback = progress_callback
 
+        # Limit on in-flight edge-tts requests per conversion
+        self.max_concurrency = max(1, max_concurrency or DEFAULT_TTS_CONCURRENCY)
+
+        # Throughput and failures per engine, voice and chunk size
+        self.tts_stats = tts_stats if use_tts_stats else None
+
+        # Maximum characters per synthesized chunk; None picks one per conversion from tts_stats
+        if chunk_size or not (ADAPTIVE_CHUNK_SIZE and self.tts_stats):
+            self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        else:
+            self.chunk_size = None
+
+        # Cap on worker processes used to extract page ranges in parallel
+        self.extract_workers = max(1, extract_workers or DEFAULT_EXTRACT_WORKERS)
+
+        # Text extraction strategy, validated up front
+        self.extractor = get_extractor(extractor or DEFAULT_EXTRACTOR)
+
+        # Page text is cleaned of headers, footers and page numbers before chunking
+        self.normalize_text = NORMALIZE_TEXT if normalize_text is None else normalize_text
+        self.normalizer = None
+
+        # Extracted text is reused across jobs for the same PDF
+        self.text_store = text_store if use_text_store else None
+
+        # Synthesized chunks are reused across jobs and retries
+        self.audio_cache = audio_cache if use_audio_cache else None
+
+        # Finished chunks of interrupted conversions, for resuming
+        self.checkpoint_dir = CHECKPOINT_DIR
+
+        # Private scratch space of this conversion (e.g. a job's workspace), for files no other conversion may touch
+        self.work_dir = work_dir or self.output_dir
+
+        # Runs blocking stages on its per-stage pools; None uses the loop's default executor
+        self.scheduler = scheduler
+
+        # Engine capabilities, probed once per process
+        self.engines = engines or engine_registry
+        
         # Voice mappings
-        self.voices = {
-            "male": "en-US-GuyNeural",
-            "female": "en-US-JennyNeural",
-            "British-male": "en-GB-RyanNeural",
-            "British-female": "en-GB-SoniaNeural",
-            "Australian-male": "en-AU-WilliamNeural",
-            "Australian-female": "en-AU-NatashaNeural",
-            "Indian-male": "en-IN-PrabhatNeural",
-            "Indian-female": "en-IN-NeerjaNeural"
-        }
+        self.voices = self.engines.voices
         
         # Voices that should use pyttsx3 (only basic male/female)
         self.pyttsx3_voices = ["male", "female"]
-        
-        # Check if pyttsx3 is available
-        self.pyttsx3_available = self._check_pyttsx3_availability()
-        
-        # Check if ffmpeg is available for merging
-        self.ffmpeg_available = self._check_ffmpeg_availability()
+
+    @property
+    def pyttsx3_available(self) -> bool:
+        return self.engines.pyttsx3_available
+
+    @property
+    def ffmpeg_available(self) -> bool:
+        return self.engines.ffmpeg_available
 
     def _update_progress(self, status: str, progress: int):
         """Update progress via callback if available."""
@@ -50,119 +188,145 @@ class PDFToMP3Converter:
             self.progress_callback(status, progress)
         print(f"[Progress] {status}: {progress}%")
 
-    def _check_ffmpeg_availability(self):
-        """Check if ffmpeg is available for audio merging."""
-        try:
-            result = subprocess.run(
-                ["ffmpeg", "-version"],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                print("✅ ffmpeg is available")
-                return True
-            return False
-        except Exception as e:
-            print(f"⚠️ ffmpeg not available: {e}")
-            print("   Will use pydub for audio merging")
-            return False
+    async def _run_blocking(self, stage: str, fn, *args):
+        """Run a blocking stage (extract, synthesize, merge) off the event loop."""
+        if self.scheduler:
+            return await self.scheduler.run_blocking(stage, fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
 
-    def _check_pyttsx3_availability(self):
-        """Check if pyttsx3 is available and working on this system."""
-        try:
-            import pyttsx3
-            # Try to initialize it
-            engine = pyttsx3.init()
-            engine.stop()
-            print("✅ pyttsx3 is available")
-            return True
-        except Exception as e:
-            print(f"⚠️ pyttsx3 not available: {e}")
-            print("   Will use edge-tts for all voices")
-            return False
-
-    def _install_espeak_if_needed(self):
-        """On Linux, ensure espeak is installed for pyttsx3."""
-        if platform.system() != "Linux":
-            return True
-        
+    @asynccontextmanager
+    async def _stage_slot(self, stage: str):
+        """Hold a scheduler slot for an async stage, if a scheduler is attached."""
+        if self.scheduler:
+            async with self.scheduler.slot(stage):
+                yield
+        else:
+            yield
+
+    def iter_pages(self, file: str, progress_hook=None, workers: int = None,
+                   start_page: int = 0, end_page: int = None, keep_empty: bool = False, digest: str = None):
+        """Yield the text of each PDF page in [start_page, end_page), in order, as soon as it is available.
+
+        progress_hook(pages_done, total_pages) is called after every page; by default
+        extraction progress is reported as 12% -> 25%. Pages already in the text store
+        are served from it; otherwise they are read with the configured extractor
+        (split into page ranges across worker processes when more than one worker is
+        allowed) and written to the store as they arrive. Pages without text are
+        skipped unless keep_empty is set. Pass the PDF's digest if it is known, to
+        save hashing the file again.
+        """
+        print(f"Extracting text from: {file}")
+        if progress_hook is None:
+            progress_hook = self._report_extraction_progress
+            self._update_progress("extracting", 12)
+        workers = max(1, workers or self.extract_workers)
+        extractor_name = self.extractor.name
+
+        digest = (digest or file_digest(file)) if self.text_store else None
+        total_pages = None
+        if digest:
+            total_pages = self.text_store.page_count(digest, extractor_name)
+        if total_pages is None:
+            total_pages = self.extractor.page_count(file)
+        end_page = total_pages if end_page is None else min(end_page, total_pages)
+        range_pages = max(end_page - start_page, 0)
+
+        cached = self.text_store.get_pages(digest, extractor_name, start_page, end_page) if digest else None
+        if cached is not None:
+            print(f"  Using stored text for pages {start_page + 1}-{end_page}")
+            page_stream = iter(cached)
+        elif workers == 1 or range_pages <= PAGES_PER_RANGE:
+            page_stream = self.extractor.iter_range(file, start_page, end_page)
+        else:
+            page_stream = self._iter_pages_parallel(file, start_page, end_page, workers)
+
+        pending = []
+        for offset, page_text in enumerate(page_stream):
+            if cached is None and digest:
+                pending.append(page_text)
+                if len(pending) >= PAGES_PER_RANGE:
+                    first_page = start_page + offset + 1 - len(pending)
+                    self.text_store.put_pages(digest, extractor_name, total_pages, first_page, pending)
+                    pending = []
+
+            progress_hook(offset + 1, range_pages)
+            if page_text or keep_empty:
+                yield page_text
+
+        if pending:
+            first_page = end_page - len(pending)
+            self.text_store.put_pages(digest, extractor_name, total_pages, first_page, pending)
+
+    def _iter_pages_parallel(self, file: str, start_page: int, end_page: int, workers: int):
+        """Extract page ranges in a process pool and yield their pages back in page order."""
+        ranges = [
+            (start, min(start + PAGES_PER_RANGE, end_page))
+            for start in range(start_page, end_page, PAGES_PER_RANGE)
+        ]
+        workers = min(workers, len(ranges))
+        print(f"  Extracting {end_page - start_page} pages in {len(ranges)} ranges with {workers} worker processes...")
+
+        # spawn rather than fork: the server process runs threads and an event loop
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(_extract_page_range, self.extractor.name, file, start, end) for start, end in ranges]
+            try:
+                for future in futures:
+                    yield from future.result()
+            finally:
+                # Stop queued ranges if the consumer gave up early
+                for future in futures:
+                    future.cancel()
+
+    def _report_extraction_progress(self, pages_done: int, total_pages: int):
+        """Update progress during extraction (12% -> 25%)."""
+        if pages_done % 10 == 0 or pages_done == total_pages:
+            progress = 12 + int(pages_done / total_pages * 13)
+            self._update_progress("extracting", progress)
+            print(f"  Processed {pages_done}/{total_pages} pages...")
+
+    def _merge_audio_files(self, temp_files: list, output_file: str):
+        """Merge files by concatenating their MP3 frames; ffmpeg or pydub only if the chunks differ in format.
+
+        The result is written next to output_file and renamed into place, so
+        output_file only ever exists complete.
+        """
+        tmp_file = f"{output_file}.part"
         try:
-            # Check if espeak is installed
-            result = subprocess.run(
-                ["which", "espeak"],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode == 0:
-                print("✅ espeak is installed")
-                return True
-            
-            print("⚠️ espeak not found. Attempting to install...")
-            
-            # Try to install espeak
-            install_result = subprocess.run(
-                ["sudo", "apt-get", "update"],
-                capture_output=True,
-                text=True
-            )
-            
-            install_result = subprocess.run(
-                ["sudo", "apt-get", "install", "-y", "espeak"],
-                capture_output=True,
-                text=True
-            )
-            
-            if install_result.returncode == 0:
-                print("✅ espeak installed successfully")
-                return True
-            else:
-                print(f"❌ Failed to install espeak: {install_result.stderr}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Error checking/installing espeak: {e}")
-            return False
+            try:
+                self._merge_audio_files_native(temp_files, tmp_file)
+            except ValueError as e:
+                print(f"⚠️ Chunks cannot be joined frame by frame ({e}), re-encoding instead")
+                self._reencode_audio_files(temp_files, tmp_file)
+            os.replace(tmp_file, output_file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def _reencode_audio_files(self, temp_files: list, output_file: str):
+        if self.ffmpeg_available:
+            self._merge_audio_files_ffmpeg(temp_files, output_file)
+        else:
+            self._merge_audio_files_pydub(temp_files, output_file)
+
+    def _merge_audio_files_native(self, temp_files: list, output_file: str):
+        """Merge audio files by copying their frames into one stream, without decoding."""
+        def on_file(done: int, total: int):
+            self._update_progress("merging", 88 + int(done / total * 7))
 
-    def extract_text(self, file: str) -> str:
-        """Extract text from a PDF file using pdfplumber with progress updates."""
         try:
-            print(f"Extracting text from: {file}")
-            self._update_progress("extracting", 12)
-            
-            with pdfplumber.open(file) as pdf:
-                text_parts = []
-                total_pages = len(pdf.pages)
-                
-                for i, page in enumerate(pdf.pages):
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
-                    
-                    # Update progress during extraction (12% -> 25%)
-                    if (i + 1) % 10 == 0 or i == total_pages - 1:
-                        progress = 12 + int((i + 1) / total_pages * 13)
-                        self._update_progress("extracting", progress)
-                        print(f"  Processed {i + 1}/{total_pages} pages...")
-                
-                text = "\n".join(text_parts)
-            
-            if not text.strip():
-                print(f"Warning: No text extracted from {file}.")
-            else:
-                print(f"✅ Extracted {len(text)} characters from {total_pages} pages")
-            
-            self._update_progress("extracting", 25)
-            return text.strip()
-        except Exception as e:
-            print(f"Error reading {file}: {e}")
+            result = concat_mp3(temp_files, output_file, progress_hook=on_file)
+            print(f"✅ Files merged successfully ({result['frames']} frames, {result['duration'] / 3600:.2f}h)")
+        except ValueError:
+            if os.path.exists(output_file):
+                os.remove(output_file)
             raise
 
     def _merge_audio_files_ffmpeg(self, temp_files: list, output_file: str):
-        """Merge audio files using ffmpeg (faster and more reliable)."""
+        """Merge audio files using ffmpeg, re-encoding to MP3 (chunks may be WAV or differ in format)."""
         try:
             # Create a temporary file list for ffmpeg
-            list_file = os.path.join(self.output_dir, "_concat_list.txt")
+            list_file = f"{output_file}.concat.txt"
             with open(list_file, 'w') as f:
                 for temp_file in temp_files:
                     # Escape single quotes in file paths
@@ -176,7 +340,9 @@ class PDFToMP3Converter:
                     "-f", "concat",
                     "-safe", "0",
                     "-i", list_file,
-                    "-c", "copy",
+                    "-c:a", "libmp3lame",
+                    "-q:a", "4",
+                    "-f", "mp3",
                     output_file,
                     "-y"  # Overwrite output file
                 ],
@@ -199,6 +365,7 @@ class PDFToMP3Converter:
     def _merge_audio_files_pydub(self, temp_files: list, output_file: str):
         """Merge audio files using pydub (fallback method)."""
         try:
+            from pydub import AudioSegment
             print("Merging audio files with pydub...")
             combined = AudioSegment.empty()
             
@@ -217,205 +384,567 @@ class PDFToMP3Converter:
             print(f"❌ pydub merge failed: {e}")
             raise
 
-    async def convert_async_chunked(self, file: str, voice: str = "male"):
-        """Convert text to MP3 using edge-tts with ~1 hour chunks."""
+    def _stream_progress(self):
+        """Build the page/chunk hooks that drive progress while extraction and synthesis overlap.
+
+        Until the first chunk finishes, extraction is reported as 12% -> 25%. After that
+        progress is 30% -> 85%, based on characters synthesized against an estimate of the
+        book's total length extrapolated from the pages read so far.
+        """
+        state = {"pages_done": 0, "total_pages": 0, "chars_read": 0, "chars_done": 0,
+                 "converting": False, "last": 0}
+        lock = threading.Lock()
+
+        def on_page(pages_done: int, total_pages: int):
+            with lock:
+                state["pages_done"] = pages_done
+                state["total_pages"] = total_pages
+                converting = state["converting"]
+            if not converting:
+                self._report_extraction_progress(pages_done, total_pages)
+
+        def on_chunk_read(chunk: str):
+            with lock:
+                state["chars_read"] += len(chunk)
+
+        def on_chunk_done(chunk: str):
+            with lock:
+                state["converting"] = True
+                state["chars_done"] += len(chunk)
+                pages_fraction = state["pages_done"] / state["total_pages"] if state["total_pages"] else 1
+                estimated_total = state["chars_read"] / max(pages_fraction, 1e-6)
+                progress = 30 + int(min(state["chars_done"] / max(estimated_total, 1), 1) * 55)
+                # Estimates can shrink as more pages are read; never go backwards
+                progress = max(progress, state["last"])
+                state["last"] = progress
+            self._update_progress("converting", progress)
+
+        return on_page, on_chunk_read, on_chunk_done
+
+    def _new_normalizer(self) -> TextNormalizer:
+        """Normalizer for one book; kept as self.normalizer for its counts."""
+        self.normalizer = TextNormalizer()
+        return self.normalizer
+
+    def _report_normalization(self):
+        if self.normalizer:
+            print(f"  Text normalization {self.normalizer.summary()}")
+
+    def iter_chunks(self, file: str, chunk_size: int = None, progress_hook=None, on_chunk=None,
+                    start_page: int = 0, end_page: int = None, normalizer: TextNormalizer = None,
+                    digest: str = None):
+        """Stream sentence-bounded text chunks straight from the PDF pages.
+
+        Pages go through a TextNormalizer first unless normalization is off; pass
+        one normalizer to consecutive calls to share it across page ranges.
+        """
+        chunk_size = chunk_size or self.chunk_size or DEFAULT_CHUNK_SIZE
+        pages = self.iter_pages(file, progress_hook, start_page=start_page, end_page=end_page, digest=digest)
+        if normalizer is None and self.normalize_text:
+            normalizer = self._new_normalizer()
+        if normalizer:
+            pages = normalizer.normalize(pages)
+        for chunk in iter_text_chunks(pages, chunk_size):
+            if on_chunk:
+                on_chunk(chunk)
+            yield chunk
+
+    def default_output_file(self, file: str) -> str:
+        """Where a conversion writes the merged MP3 if no output_file is given: the PDF's name in output_dir."""
+        safe_name = os.path.splitext(os.path.basename(file))[0]
+        return os.path.join(self.output_dir, f"{safe_name}.mp3")
+
+    def detect_chapters(self, file: str, digest: str = None) -> list:
+        """Chapters of the PDF as page ranges: from its bookmarks, else from chapter headings in the text."""
+        page_count = self.extractor.page_count(file)
+        starts = outline_chapters(file)
+        source = "outline"
+        if len(starts) < 2:
+            # Reads every page once; the text store keeps it for the synthesis pass
+            pages = self.iter_pages(file, progress_hook=lambda done, total: None, keep_empty=True, digest=digest)
+            starts = heading_chapters(pages)
+            source = "headings"
+        chapters = chapter_ranges(starts, page_count)
+        print(f"  Found {len(chapters)} chapters ({source if len(chapters) > 1 else 'none detected'})")
+        return chapters
+
+    def iter_chapter_chunks(self, file: str, chapters: list, chunk_size: int = None, progress_hook=None,
+                            on_chunk=None, chunk_chapters: list = None, digest: str = None):
+        """Chunks of each chapter in turn, never spanning two chapters.
+
+        The chapter index of every chunk yielded is appended to chunk_chapters.
+        """
+        total_pages = chapters[-1]["end_page"]
+        normalizer = self._new_normalizer() if self.normalize_text else None
+        for chapter_idx, chapter in enumerate(chapters):
+            # Report page progress for the whole book, not per chapter
+            def chapter_progress(pages_done: int, _range_pages: int, first_page: int = chapter["start_page"]):
+                if progress_hook:
+                    progress_hook(first_page + pages_done, total_pages)
+            
+            for chunk in self.iter_chunks(file, chunk_size, chapter_progress, on_chunk,
+                                          chapter["start_page"], chapter["end_page"], normalizer, digest):
+                chunk_chapters.append(chapter_idx)
+                yield chunk
+
+    def _concat_chapter(self, files: list, output_file: str) -> dict:
+        """Join one chapter's chunks; re-encodes like the full merge if they cannot be joined frame by frame."""
+        try:
+            return concat_mp3(files, output_file)
+        except ValueError as e:
+            print(f"⚠️ Chapter chunks cannot be joined frame by frame ({e}), re-encoding instead")
+        self._reencode_audio_files(files, output_file)
+        return {"duration": mp3_duration(output_file)}
+
+    def _write_chapters(self, chapters_dir: str, chapters: list, temp_files: list, chunk_chapters: list):
+        manifest = write_chapters(chapters_dir, chapters, temp_files, chunk_chapters, concat=self._concat_chapter)
+        print(f"✅ Wrote {len(manifest['chapters'])} chapter files to {chapters_dir}")
+
+    async def _stream_chunks_async(self, chunks):
+        """Run a blocking chunk generator in a worker thread and yield its chunks on the event loop."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for chunk in chunks:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, ("chunk", chunk))
+                loop.call_soon_threadsafe(queue.put_nowait, ("done", None))
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, ("error", e))
+            finally:
+                chunks.close()
+
+        producer = asyncio.ensure_future(self._run_blocking("extract", produce))
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == "chunk":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    break
+        finally:
+            stop.set()
+            await asyncio.wait([producer])
+
+    def _checkpoint_identity(self, digest: str, engine: str, voice: str, rate, chunk_size: int,
+                             chapters: list = None) -> dict:
+        identity = {
+            "pdf": digest,
+            "engine": engine,
+            "voice": voice,
+            "rate": rate,
+            "chunk_size": chunk_size,
+            "extractor": self.extractor.name,
+        }
+        if chapters:
+            # Chunks never span chapters, so the chapter layout changes the chunking
+            identity["chapters"] = [chapter["start_page"] for chapter in chapters]
+        if self.normalize_text:
+            # Normalized text splits into different chunks
+            identity["normalized"] = True
+        return identity
+
+    def _checkpoint(self, file: str, engine: str, voice: str, rate, chunk_size: int,
+                    chapters: list = None, digest: str = None) -> ConversionCheckpoint:
+        """Checkpoint for converting file with these settings; finds chunks left by an earlier attempt.
+
+        Call release() on it when the conversion ends. If a concurrent conversion
+        already holds the shared checkpoint, this one gets a private one in work_dir.
+        """
+        identity = self._checkpoint_identity(digest or file_digest(file), engine, voice, rate, chunk_size, chapters)
+        private_root = os.path.join(self.work_dir, f".checkpoint-{uuid.uuid4().hex[:12]}")
+        checkpoint = ConversionCheckpoint.claim(self.checkpoint_dir, identity, private_root)
+        if checkpoint.private_root:
+            print(f"  Another conversion is using the checkpoint for this input, using {checkpoint.dir}")
+        elif checkpoint.completed:
+            print(f"  Resuming: {checkpoint.completed} chunks already done in {checkpoint.dir}")
+        return checkpoint
+
+    def _pick_chunk_size(self, file: str, engine: str, voice: str, rate, concurrency: int,
+                         chapters: list = None, digest: str = None) -> int:
+        """Chunk size for this conversion: the fixed one, the one an interrupted attempt used, or the best measured."""
+        if self.chunk_size:
+            return self.chunk_size
+
+        # Resuming only works with the chunking the earlier attempt used
+        digest = digest or file_digest(file)
+        for size in (*CHUNK_SIZE_BUCKETS, DEFAULT_CHUNK_SIZE):
+            identity = self._checkpoint_identity(digest, engine, voice, rate, size, chapters)
+            if ConversionCheckpoint.exists(self.checkpoint_dir, identity):
+                print(f"  Chunk size: {size} chars (as in the interrupted attempt)")
+                return size
+
+        try:
+            expected_chars = self.extractor.page_count(file) * CHARS_PER_PAGE_ESTIMATE
+        except Exception:
+            expected_chars = None
+        size, reason = self.tts_stats.choose_chunk_size(engine, voice, concurrency, expected_chars)
+        print(f"  Chunk size: {size} chars ({reason})")
+        return size
+
+    def _record_attempt(self, engine: str, voice: str, chunk: str, started: float, ok: bool):
+        if not self.tts_stats:
+            return
+        try:
+            self.tts_stats.record(engine, voice, len(chunk), time.perf_counter() - started, ok)
+        except Exception as e:
+            print(f"⚠️ Could not record TTS stats: {e}")
+
+    async def _synthesize_edge_chunk(self, chunk: str, selected_voice: str, chunk_file: str):
+        """Synthesize one chunk with edge-tts, going through the audio cache."""
+        cache_key = None
+        if self.audio_cache:
+            cache_key = self.audio_cache.key(chunk, selected_voice, "edge-tts", EDGE_TTS_RATE)
+        if cache_key and self.audio_cache.get(cache_key, chunk_file):
+            return
+        import edge_tts
+        started = time.perf_counter()
+        try:
+            communicate = edge_tts.Communicate(chunk, selected_voice, rate=EDGE_TTS_RATE)
+            await communicate.save(chunk_file)
+        except Exception:
+            self._record_attempt("edge-tts", selected_voice, chunk, started, ok=False)
+            raise
+        self._record_attempt("edge-tts", selected_voice, chunk, started, ok=True)
+        if cache_key:
+            self.audio_cache.put(cache_key, chunk_file)
+
+    def _synthesize_pyttsx3_chunk(self, chunk: str, chunk_file: str):
+        """Synthesize one chunk with pyttsx3, going through the audio cache."""
+        cache_key = None
+        if self.audio_cache:
+            cache_key = self.audio_cache.key(chunk, "default", "pyttsx3", PYTTSX3_RATE)
+        if cache_key and self.audio_cache.get(cache_key, chunk_file):
+            self._wav_chunk_to_mp3(chunk_file)
+            return
+        started = time.perf_counter()
+        try:
+            pyttsx3_pool.synthesize(chunk, chunk_file)
+            if not os.path.exists(chunk_file):
+                raise Exception("pyttsx3 did not produce the chunk file")
+        except Exception:
+            self._record_attempt("pyttsx3", "default", chunk, started, ok=False)
+            raise
+        self._record_attempt("pyttsx3", "default", chunk, started, ok=True)
+        self._wav_chunk_to_mp3(chunk_file)
+        if cache_key:
+            self.audio_cache.put(cache_key, chunk_file)
+
+    def _wav_chunk_to_mp3(self, chunk_file: str):
+        """Re-encode a WAV chunk (what espeak writes) to MP3 in place, so merging, chapters and segments get MP3.
+
+        Without ffmpeg the chunk stays WAV; only the merge's pydub fallback can then use it.
+        """
+        if not self.ffmpeg_available or not is_wav(chunk_file):
+            return
+        tmp_file = f"{chunk_file}.part"
+        try:
+            result = subprocess.run(
+                ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-i", chunk_file,
+                 "-c:a", "libmp3lame", "-q:a", "4", "-f", "mp3", tmp_file],
+                capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                raise Exception(f"ffmpeg could not encode {chunk_file}: {result.stderr.strip()}")
+            os.replace(tmp_file, chunk_file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    async def _synthesize_chunks_edge(self, chunk_stream, selected_voice: str, checkpoint: ConversionCheckpoint,
+                                      max_concurrency: int, on_chunk_done=None, segment_publisher=None):
+        """Synthesize chunks with edge-tts as they arrive, keeping output order stable.
+
+        At most max_concurrency chunks are in flight; reading the next chunk waits for a
+        free slot. Chunks already recorded in the checkpoint are skipped, each remaining
+        chunk is retried on its own, and only if a chunk keeps failing are the rest
+        cancelled. Finished chunks stay on disk so a later attempt can resume, and are
+        handed to segment_publisher as soon as they are done.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        temp_files = []
+        tasks = []
+
+        async def synthesize(idx: int, chunk: str, chunk_file: str):
+            try:
+                if checkpoint.is_done(idx, chunk):
+                    print(f"  Chunk {idx + 1} restored from checkpoint")
+                else:
+                    for attempt in range(1, CHUNK_RETRIES + 1):
+                        try:
+                            await self._synthesize_edge_chunk(chunk, selected_voice, chunk_file)
+                            break
+                        except Exception as e:
+                            if attempt == CHUNK_RETRIES:
+                                raise
+                            delay = CHUNK_RETRY_BACKOFF * 2 ** (attempt - 1)
+                            print(f"⚠️ Chunk {idx + 1} failed (attempt {attempt}/{CHUNK_RETRIES}): {e}. "
+                                  f"Retrying in {delay:.0f}s")
+                            await asyncio.sleep(delay)
+                    checkpoint.mark_done(idx, chunk)
+            finally:
+                semaphore.release()
+
+            if segment_publisher:
+                segment_publisher.publish(idx, chunk_file)
+            if on_chunk_done:
+                on_chunk_done(chunk)
+            print(f"  Processed chunk {idx + 1} ({len(chunk)} chars)")
+
+        def raise_if_failed():
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception():
+                    raise task.exception()
+
+        try:
+            async for chunk in chunk_stream:
+                await semaphore.acquire()
+                try:
+                    raise_if_failed()
+                except BaseException:
+                    semaphore.release()
+                    raise
+
+                idx = len(temp_files)
+                chunk_file = checkpoint.chunk_path(idx)
+                temp_files.append(chunk_file)
+                tasks.append(asyncio.create_task(synthesize(idx, chunk, chunk_file)))
+
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # A chunk ran out of retries (or we were cancelled): stop the rest
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if hasattr(chunk_stream, "aclose"):
+                await chunk_stream.aclose()
+            checkpoint.discard_incomplete(len(temp_files))
+            raise
+
+        return temp_files
+
+    async def convert_async_chunked(self, file: str, voice: str = "male", max_concurrency: int = None,
+                                    chunk_size: int = None, segment_publisher=None, merge: bool = True,
+                                    chapters_dir: str = None, output_file: str = None):
+        """Convert a PDF to MP3 using edge-tts, synthesizing chunks while pages are still being extracted.
+
+        With a segment_publisher every finished chunk is published as a playable segment;
+        with a chapters_dir one MP3 per chapter and chapters.json are written there.
+        merge=False then skips building the single MP3, which is written to
+        output_file (default: the PDF's name in output_dir).
+        """
         if not os.path.isfile(file):
             print(f"Error: File {file} not found.")
             raise FileNotFoundError(f"File {file} not found")
 
-        text = self.extract_text(file)
-        if not text:
-            print(f"Error: No text found in {file}.")
-            raise ValueError(f"No text found in {file}")
-
         selected_voice = self.voices.get(voice, "en-US-GuyNeural")
-        safe_name = os.path.splitext(os.path.basename(file))[0]
-        mp3_filename = os.path.join(self.output_dir, f"{safe_name}.mp3")
+        mp3_filename = output_file or self.default_output_file(file)
+        max_concurrency = max(1, max_concurrency or self.max_concurrency)
+        checkpoint = None
 
         try:
-            self._update_progress("converting", 30)
-            print(f"Converting to MP3 using edge-tts with voice: {selected_voice}")
+            self._update_progress("extracting", 12)
+            print(f"Converting to MP3 using edge-tts with voice: {selected_voice} "
+                  f"(up to {max_concurrency} chunks at a time)")
             
-            # Calculate chunk size for ~1 hour chunks
-            # Assuming ~150 words per minute reading speed, ~5 chars per word
-            # 1 hour = 60 minutes * 150 words * 5 chars = 45,000 chars
-            chunk_size = 45000
-            text_chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-            total_chunks = len(text_chunks)
+            # Hashed once; the text store, chunk size and checkpoint lookups all key on it
+            digest = await self._run_blocking("extract", file_digest, file)
+            chapters = await self._run_blocking("extract", self.detect_chapters, file, digest) if chapters_dir else None
+            chunk_chapters = []
             
-            print(f"Processing {total_chunks} chunks (~1 hour each)...")
+            chunk_size = chunk_size or await self._run_blocking(
+                "extract", self._pick_chunk_size, file, "edge-tts", selected_voice, EDGE_TTS_RATE,
+                max_concurrency, chapters, digest
+            )
+            checkpoint = self._checkpoint(file, "edge-tts", selected_voice, EDGE_TTS_RATE, chunk_size, chapters, digest)
+            on_page, on_chunk_read, on_chunk_done = self._stream_progress()
+            if chapters:
+                chunks = self.iter_chapter_chunks(file, chapters, chunk_size, on_page, on_chunk_read, chunk_chapters,
+                                                  digest)
+            else:
+                chunks = self.iter_chunks(file, chunk_size, progress_hook=on_page, on_chunk=on_chunk_read,
+                                          digest=digest)
             
-            # Process chunks and save to temporary files
-            temp_files = []
-            for idx, chunk in enumerate(text_chunks):
-                chunk_file = os.path.join(self.output_dir, f"{safe_name}_chunk_{idx}.mp3")
-                
-                communicate = edge_tts.Communicate(chunk, selected_voice)
-                await communicate.save(chunk_file)
-                temp_files.append(chunk_file)
-                
-                # Update progress (30% -> 85%)
-                progress = 30 + int((idx + 1) / total_chunks * 55)
-                self._update_progress("converting", progress)
-                print(f"  Processed chunk {idx + 1}/{total_chunks}")
+            # Synthesize chunks as soon as the segmenter produces them
+            async with self._stage_slot("synthesize"):
+                temp_files = await self._synthesize_chunks_edge(
+                    self._stream_chunks_async(chunks), selected_voice, checkpoint,
+                    max_concurrency, on_chunk_done, segment_publisher
+                )
             
-            self._update_progress("merging", 88)
-            print("Merging audio chunks into single file...")
+            if not temp_files:
+                checkpoint.discard()
+                print(f"Error: No text found in {file}.")
+                raise ValueError(f"No text found in {file}")
             
-            # Merge files using ffmpeg or pydub
-            if self.ffmpeg_available:
-                self._merge_audio_files_ffmpeg(temp_files, mp3_filename)
-            else:
-                self._merge_audio_files_pydub(temp_files, mp3_filename)
+            self._report_normalization()
+            if self.audio_cache:
+                print(f"  Audio cache: {self.audio_cache.stats()}")
+            if segment_publisher:
+                segment_publisher.finish()
             
-            # Clean up temp files
-            for temp_file in temp_files:
-                try:
-                    os.remove(temp_file)
-                except Exception as e:
-                    print(f"Warning: Could not delete temp file {temp_file}: {e}")
+            if chapters:
+                self._update_progress("merging", 88)
+                await self._run_blocking(
+                    "merge", self._write_chapters, chapters_dir, chapters, temp_files, chunk_chapters
+                )
+            
+            if merge:
+                self._update_progress("merging", 88)
+                print(f"Merging {len(temp_files)} audio chunks into single file...")
+                
+                await self._run_blocking("merge", self._merge_audio_files, temp_files, mp3_filename)
+                print(f"✅ MP3 file created: {mp3_filename}")
             
+            # The output exists, chunks are no longer needed
+            checkpoint.discard()
             self._update_progress("merging", 95)
-            print(f"✅ MP3 file created: {mp3_filename}")
             
         except Exception as e:
             print(f"❌ Error generating MP3: {e}")
             raise
+        finally:
+            if checkpoint:
+                checkpoint.release()
 
-    def convert_sync_pyttsx3_chunked(self, file: str):
+    def convert_sync_pyttsx3_chunked(self, file: str, chunk_size: int = None, segment_publisher=None,
+                                     merge: bool = True, chapters_dir: str = None, output_file: str = None):
         """Convert PDF to MP3 using pyttsx3 with ~1 hour chunks for Ubuntu."""
         if not os.path.isfile(file):
             print(f"File {file} not found.")
             raise FileNotFoundError(f"File {file} not found")
         
-        # Ensure espeak is installed on Linux
-        if not self._install_espeak_if_needed():
-            raise Exception("Cannot use pyttsx3 without espeak on Linux")
+        if not self.pyttsx3_available:
+            raise Exception("pyttsx3 is not available on this system")
         
-        text = self.extract_text(file)
-        if not text:
-            raise ValueError(f"No text found in {file}")
-        
-        safe_name = os.path.splitext(os.path.basename(file))[0]
-        mp3_filename = os.path.join(self.output_dir, f"{safe_name}.mp3")
+        mp3_filename = output_file or self.default_output_file(file)
         
-        self._update_progress("converting", 30)
+        self._update_progress("extracting", 12)
         print(f"Converting to MP3 using pyttsx3 on Ubuntu...")
         
-        # Calculate chunk size for ~1 hour chunks
-        # Assuming ~150 words per minute, ~5 chars per word
-        # 1 hour = 60 * 150 * 5 = 45,000 chars
-        chunk_size = 45000
-        text_chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-        total_chunks = len(text_chunks)
+        # Each chunk is synthesized as soon as the segmenter produces it
+        digest = file_digest(file)
+        chapters = self.detect_chapters(file, digest) if chapters_dir else None
         
-        print(f"Processing {total_chunks} chunks (~1 hour each)...")
+        chunk_size = chunk_size or self._pick_chunk_size(
+            file, "pyttsx3", "default", PYTTSX3_RATE, pyttsx3_pool.size, chapters, digest
+        )
+        checkpoint = self._checkpoint(file, "pyttsx3", "default", PYTTSX3_RATE, chunk_size, chapters, digest)
+        try:
+            self._convert_pyttsx3_chunks(file, checkpoint, chunk_size, chapters, segment_publisher, merge,
+                                         chapters_dir, mp3_filename, digest)
+        finally:
+            checkpoint.release()
+    
+    def _convert_pyttsx3_chunks(self, file: str, checkpoint: ConversionCheckpoint, chunk_size: int, chapters: list,
+                                segment_publisher, merge: bool, chapters_dir: str, mp3_filename: str, digest: str):
+        chunk_chapters = []
+        on_page, on_chunk_read, on_chunk_done = self._stream_progress()
+        if chapters:
+            chunks = self.iter_chapter_chunks(file, chapters, chunk_size, on_page, on_chunk_read, chunk_chapters,
+                                              digest)
+        else:
+            chunks = self.iter_chunks(file, chunk_size, progress_hook=on_page, on_chunk=on_chunk_read,
+                                      digest=digest)
+        
+        def synthesize(idx: int, chunk: str, chunk_file: str):
+            for attempt in range(1, CHUNK_RETRIES + 1):
+                try:
+                    self._synthesize_pyttsx3_chunk(chunk, chunk_file)
+                    break
+                except Exception as e:
+                    if attempt == CHUNK_RETRIES:
+                        raise Exception(f"Failed to create chunk {idx + 1}: {e}")
+                    delay = CHUNK_RETRY_BACKOFF * 2 ** (attempt - 1)
+                    print(f"⚠️ Chunk {idx + 1} failed (attempt {attempt}/{CHUNK_RETRIES}): {e}. "
+                          f"Retrying in {delay:.0f}s")
+                    time.sleep(delay)
+            checkpoint.mark_done(idx, chunk)
+        
+        def finish(idx: int, chunk: str, chunk_file: str):
+            if segment_publisher:
+                segment_publisher.publish(idx, chunk_file)
+            on_chunk_done(chunk)
+            print(f"  Processed chunk {idx + 1} ({len(chunk)} chars)")
         
-        # Process each chunk
         temp_files = []
-        for idx, chunk in enumerate(text_chunks):
-            chunk_file = os.path.join(self.output_dir, f"{safe_name}_chunk_{idx}.mp3")
-            
-            success = self._run_pyttsx3_subprocess(chunk, chunk_file)
-            
-            if success and os.path.exists(chunk_file):
-                temp_files.append(chunk_file)
-                # Update progress (30% -> 85%)
-                progress = 30 + int((idx + 1) / total_chunks * 55)
-                self._update_progress("converting", progress)
-                print(f"  Processed chunk {idx + 1}/{total_chunks}")
-            else:
-                raise Exception(f"Failed to create chunk {idx + 1}")
+        pending = {}
+        
+        def collect(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                idx, chunk, chunk_file = pending.pop(future)
+                future.result()
+                finish(idx, chunk, chunk_file)
+        
+        try:
+            # One chunk in flight per pool worker; reading the next chunk waits for a free one
+            with ThreadPoolExecutor(max_workers=pyttsx3_pool.size, thread_name_prefix="pyttsx3") as executor:
+                for idx, chunk in enumerate(chunks):
+                    chunk_file = checkpoint.chunk_path(idx)
+                    temp_files.append(chunk_file)
+                    
+                    if checkpoint.is_done(idx, chunk):
+                        print(f"  Chunk {idx + 1} restored from checkpoint")
+                        finish(idx, chunk, chunk_file)
+                        continue
+                    
+                    while len(pending) >= pyttsx3_pool.size:
+                        collect(FIRST_COMPLETED)
+                    pending[executor.submit(synthesize, idx, chunk, chunk_file)] = (idx, chunk, chunk_file)
+                
+                while pending:
+                    collect(ALL_COMPLETED)
+        except Exception:
+            checkpoint.discard_incomplete(len(temp_files))
+            raise
+        
+        if not temp_files:
+            checkpoint.discard()
+            raise ValueError(f"No text found in {file}")
+        
+        self._report_normalization()
+        if self.audio_cache:
+            print(f"  Audio cache: {self.audio_cache.stats()}")
+        if segment_publisher:
+            segment_publisher.finish()
+        
+        if chapters:
+            self._update_progress("merging", 88)
+            self._write_chapters(chapters_dir, chapters, temp_files, chunk_chapters)
+        
+        if not merge:
+            checkpoint.discard()
+            self._update_progress("merging", 95)
+            return
         
         self._update_progress("merging", 88)
         print("Merging audio chunks into single file...")
         
-        # Merge files using ffmpeg or pydub
-        if self.ffmpeg_available:
-            self._merge_audio_files_ffmpeg(temp_files, mp3_filename)
-        else:
-            self._merge_audio_files_pydub(temp_files, mp3_filename)
-        
-        # Clean up temp files
-        for temp_file in temp_files:
-            try:
-                os.remove(temp_file)
-            except Exception as e:
-                print(f"Warning: Could not delete temp file {temp_file}: {e}")
+        self._merge_audio_files(temp_files, mp3_filename)
         
         if os.path.exists(mp3_filename):
+            # The merged file exists, chunks are no longer needed
+            checkpoint.discard()
             self._update_progress("merging", 95)
             print(f"✅ MP3 file has been created successfully: {mp3_filename}")
         else:
             raise Exception("Failed to create final MP3 file")
 
-    def _run_pyttsx3_subprocess(self, text: str, output_path: str):
-        """Run pyttsx3 in a separate process to prevent main process crashes."""
-        
-        # Create a temporary Python script to run pyttsx3
-        script_content = f'''
-import pyttsx3
-import sys
-
-text = """
-{text}
-"""
-
-output_path = r"{output_path}"
-
-try:
-    speaker = pyttsx3.init()
-    speaker.setProperty('rate', 150)
-    speaker.setProperty('volume', 0.9)
-    speaker.save_to_file(text, output_path)
-    speaker.runAndWait()
-    speaker.stop()
-    print("SUCCESS")
-    sys.exit(0)
-except Exception as e:
-    print(f"ERROR: {{e}}")
-    sys.exit(1)
-'''
-        
-        # Write script to temp file
-        temp_script = os.path.join(self.output_dir, f"_temp_tts_script_{os.getpid()}.py")
-        with open(temp_script, 'w', encoding='utf-8') as f:
-            f.write(script_content)
-        
-        try:
-            # Run the script in a subprocess with longer timeout for large chunks
-            result = subprocess.run(
-                [sys.executable, temp_script],
-                capture_output=True,
-                text=True,
-                timeout=3600  # 1 hour timeout per chunk
-            )
-            
-            if result.returncode == 0 and "SUCCESS" in result.stdout:
-                return True
-            else:
-                print(f"❌ Subprocess failed:")
-                print(f"  stdout: {result.stdout}")
-                print(f"  stderr: {result.stderr}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            print("❌ Subprocess timed out after 1 hour")
-            return False
-        except Exception as e:
-            print(f"❌ Subprocess error: {e}")
-            return False
-        finally:
-            # Clean up temp script
-            try:
-                os.remove(temp_script)
-            except:
-                pass
-
-    async def convert_with_voice(self, file: str, voice: str = "male"):
+    async def convert_with_voice(self, file: str, voice: str = "male", segment_publisher=None, merge: bool = True,
+                                 chapters_dir: str = None, output_file: str = None):
         """
         Convert PDF to MP3 with specified voice using ~1 hour chunks.
-        Returns a single merged file.
+        Returns a single merged file at output_file (default: the PDF's name
+        in output_dir) unless merge=False, publishes each
+        finished chunk through segment_publisher if one is given, and writes
+        one file per chapter plus chapters.json to chapters_dir if one is given.
         Uses pyttsx3 for basic male/female voices on Ubuntu.
         Uses edge-tts for all accent voices and as fallback.
         """
@@ -428,7 +957,10 @@ except Exception as e:
         if voice in self.pyttsx3_voices and self.pyttsx3_available and platform.system() == "Linux":
             try:
                 print(f"Attempting conversion with pyttsx3 for '{voice}' voice on Ubuntu...")
-                self.convert_sync_pyttsx3_chunked(file)
+                await self._run_blocking(
+                    "synthesize", self.convert_sync_pyttsx3_chunked, file, None, segment_publisher, merge,
+                    chapters_dir, output_file
+                )
                 return
             except Exception as e:
                 print(f"⚠️ pyttsx3 failed: {e}")
@@ -436,5 +968,6 @@ except Exception as e:
         
         # Use edge-tts for accent voices or as fallback
         print(f"Using edge-tts for '{voice}' voice...")
-        await self.convert_async_chunked(file, voice)
+        await self.convert_async_chunked(file, voice, segment_publisher=segment_publisher, merge=merge,
+                                         chapters_dir=chapters_dir, output_file=output_file)
         
\ No newline at end of file
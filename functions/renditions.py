@@ -0,0 +1,100 @@
+import os
+import shutil
+import subprocess
+from types import MappingProxyType
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# The merged MP3 itself, always available when the job produced one
+ORIGINAL = "mp3"
+
+# Low-bitrate encodings of the merged MP3; speech needs far less than edge-tts' MP3 bitrate.
+# Opus uses constrained VBR so the file size stays close to the nominal bitrate.
+RENDITIONS = MappingProxyType({
+    "opus-32k": {
+        "encoder": "libopus", "bitrate": "32k", "format": "ogg", "extension": ".opus",
+        "media_type": "audio/ogg", "args": ["-vbr", "constrained", "-application", "voip"],
+    },
+    "opus-24k": {
+        "encoder": "libopus", "bitrate": "24k", "format": "ogg", "extension": ".opus",
+        "media_type": "audio/ogg", "args": ["-vbr", "constrained", "-application", "voip"],
+    },
+    "aac-48k": {
+        "encoder": "aac", "bitrate": "48k", "format": "ipod", "extension": ".m4a",
+        "media_type": "audio/mp4", "args": ["-movflags", "+faststart"],
+    },
+})
+
+# Renditions encoded for jobs that do not ask for any, e.g. "opus-32k"
+DEFAULT_RENDITIONS = os.getenv("AUDIO_DEFAULT_RENDITIONS", "")
+
+# Longest an encode may take before it is abandoned
+ENCODE_TIMEOUT = int(os.getenv("AUDIO_ENCODE_TIMEOUT", "3600"))
+
+
+def parse_renditions(value: str = None) -> list:
+    """Rendition names from a comma-separated list; raises ValueError for unknown ones.
+
+    None gives DEFAULT_RENDITIONS, whose unknown names are skipped with a warning instead.
+    """
+    explicit = value is not None
+    if not explicit:
+        value = DEFAULT_RENDITIONS
+    names = []
+    for name in (part.strip().lower() for part in value.split(",")):
+        if not name or name == ORIGINAL or name in names:
+            continue
+        if name not in RENDITIONS and not explicit:
+            print(f"[Renditions] ⚠️ Ignoring unknown rendition '{name}' in AUDIO_DEFAULT_RENDITIONS")
+            continue
+        if name not in RENDITIONS:
+            raise ValueError(f"Unknown rendition '{name}'. Available: {', '.join([ORIGINAL, *RENDITIONS])}")
+        names.append(name)
+    return sorted(names)
+
+
+def rendition_path(mp3_path: str, name: str) -> str:
+    """Where the rendition of an MP3 is stored: next to it, e.g. book.opus-32k.opus."""
+    if name == ORIGINAL:
+        return mp3_path
+    return f"{os.path.splitext(mp3_path)[0]}.{name}{RENDITIONS[name]['extension']}"
+
+
+def rendition_filename(filename: str, name: str) -> str:
+    """Download name of a rendition, e.g. book.mp3 -> book.opus."""
+    if name == ORIGINAL:
+        return filename
+    return f"{os.path.splitext(filename)[0]}{RENDITIONS[name]['extension']}"
+
+
+def media_type(name: str) -> str:
+    return "audio/mpeg" if name == ORIGINAL else RENDITIONS[name]["media_type"]
+
+
+def encode_rendition(mp3_path: str, name: str, ffmpeg: str = None) -> str:
+    """Encode an MP3 into the named rendition with ffmpeg and return its path.
+
+    The output is written to a temporary file and renamed into place, so a
+    rendition path that exists is always complete.
+    """
+    spec = RENDITIONS[name]
+    ffmpeg = ffmpeg or shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg is required to encode renditions")
+
+    output_path = rendition_path(mp3_path, name)
+    tmp_path = f"{output_path}.part"
+    cmd = [
+        ffmpeg, "-y", "-hide_banner", "-loglevel", "error", "-i", mp3_path, "-vn", "-ac", "1",
+        "-c:a", spec["encoder"], "-b:a", spec["bitrate"], *spec["args"], "-f", spec["format"], tmp_path,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=ENCODE_TIMEOUT)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to encode {name}: {result.stderr.strip()}")
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
@@ -0,0 +1,115 @@
+import os
+import json
+import math
+import shutil
+import threading
+from functions.mp3_frames import mp3_duration, is_wav
+
+
+MANIFEST_NAME = "segments.json"
+
+
+def segment_filename(index: int) -> str:
+    return f"segment_{index:05d}.mp3"
+
+
+class SegmentPublisher:
+    """Publishes finished chunks of a running conversion as playable segments.
+
+    Chunks can finish out of order, so a segment only becomes visible once
+    every segment before it is there; segments.json therefore always
+    describes a gap-free prefix of the book that a player can start on.
+
+    Segments are MP3 only. If a chunk is not (pyttsx3 WAV that could not be
+    re-encoded), publishing stops and the manifest carries an error instead.
+    """
+
+    def __init__(self, segments_dir: str):
+        self.segments_dir = segments_dir
+        self._lock = threading.Lock()
+        self._ready = {}
+        self._segments = []
+        self._complete = False
+        self.error = None
+
+        os.makedirs(self.segments_dir, exist_ok=True)
+        self._write_manifest()
+
+    def publish(self, index: int, chunk_file: str):
+        """Expose a finished chunk as segment `index`."""
+        if self.error:
+            return
+        if is_wav(chunk_file):
+            with self._lock:
+                self.error = "Segments are not available: the speech engine produced WAV audio"
+                self._write_manifest()
+            print(f"⚠️ {self.error}")
+            return
+
+        path = os.path.join(self.segments_dir, segment_filename(index))
+        if os.path.exists(path):
+            os.remove(path)
+        try:
+            os.link(chunk_file, path)
+        except OSError:
+            shutil.copyfile(chunk_file, path)
+
+        entry = {
+            "index": index,
+            "file": segment_filename(index),
+            "bytes": os.path.getsize(path),
+            "duration": round(mp3_duration(path), 3),
+        }
+        with self._lock:
+            if index < len(self._segments):
+                # Re-synthesized (e.g. after an engine fallback): replace in place
+                self._segments[index] = entry
+            else:
+                self._ready[index] = entry
+            while len(self._segments) in self._ready:
+                self._segments.append(self._ready.pop(len(self._segments)))
+            self._write_manifest()
+
+    def finish(self):
+        """Mark the segment list as final."""
+        with self._lock:
+            self._complete = True
+            self._write_manifest()
+
+    def _write_manifest(self):
+        manifest_path = os.path.join(self.segments_dir, MANIFEST_NAME)
+        tmp_path = f"{manifest_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            manifest = {"complete": self._complete, "segments": self._segments}
+            if self.error:
+                manifest["error"] = self.error
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+
+def read_manifest(segments_dir: str) -> dict:
+    """Load segments.json, or None if the directory has no manifest."""
+    try:
+        with open(os.path.join(segments_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def hls_playlist(manifest: dict, segment_url) -> str:
+    """Render a manifest as an HLS media playlist; segment_url(index) gives each URI."""
+    segments = manifest["segments"]
+    target_duration = max((math.ceil(segment["duration"]) for segment in segments), default=1)
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        "#EXT-X-PLAYLIST-TYPE:EVENT",
+        f"#EXT-X-TARGETDURATION:{target_duration}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+    ]
+    for segment in segments:
+        lines.append(f"#EXTINF:{segment['duration']:.3f},")
+        lines.append(segment_url(segment["index"]))
+    if manifest["complete"]:
+        lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
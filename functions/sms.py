@@ -1,4 +1,3 @@
-from twilio.rest import Client
 from dotenv import load_dotenv
 import os
 
@@ -18,6 +17,8 @@ TWILIO_AUTH3 = os.getenv('TWILIO_AUTH3')
 
 
 def send_sms(msg, dest):
+    from twilio.rest import Client
+    
     credentials = [
         (TWILIO_SID1, TWILIO_AUTH1, TWILIO_PHONE1, "primary"),
         (TWILIO_SID2, TWILIO_AUTH2, TWILIO_PHONE2, "secondary"),
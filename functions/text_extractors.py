@@ -0,0 +1,149 @@
+import re
+from abc import ABC, abstractmethod
+
+# PyPDF2 and pdfplumber are imported where they are used, so importing this
+# module (and the API routes that depend on it) stays cheap
+
+
+# pdfminer/pdfplumber placeholder for glyphs without a unicode mapping, e.g. "(cid:72)"
+CID_PATTERN = re.compile(r"\(cid:\d+\)")
+
+
+def looks_garbled(text: str) -> bool:
+    """Heuristic check for page text that a fast extractor got wrong.
+
+    Flags empty pages, unmapped glyphs, mostly non-printable output and
+    words run together without spaces (a common PyPDF2 failure).
+    """
+    if not text or not text.strip():
+        return True
+
+    stripped = text.strip()
+    if "\ufffd" in stripped or CID_PATTERN.search(stripped):
+        return True
+
+    printable = sum(1 for ch in stripped if ch.isprintable() or ch in "\n\t")
+    if printable / len(stripped) < 0.9:
+        return True
+
+    letters = sum(1 for ch in stripped if ch.isalpha())
+    if len(stripped) >= 50 and letters / len(stripped) < 0.3:
+        return True
+
+    spaces = stripped.count(" ") + stripped.count("\n")
+    if len(stripped) >= 200 and spaces / len(stripped) < 0.05:
+        return True
+
+    return False
+
+
+class TextExtractor(ABC):
+    """Base class for PDF text extraction strategies.
+
+    Implementations yield one string per page ("" for pages without text),
+    so callers can stream pages and split documents into page ranges.
+    """
+    name = None
+
+    @abstractmethod
+    def page_count(self, file: str) -> int:
+        pass
+
+    @abstractmethod
+    def iter_range(self, file: str, start: int = 0, end: int = None):
+        pass
+
+    def extract_range(self, file: str, start: int = 0, end: int = None) -> list:
+        return list(self.iter_range(file, start, end))
+
+
+class LayoutTextExtractor(TextExtractor):
+    """pdfplumber layout analysis: slow, but handles columns and odd encodings well."""
+    name = "layout"
+
+    def page_count(self, file: str) -> int:
+        import pdfplumber
+        with pdfplumber.open(file) as pdf:
+            return len(pdf.pages)
+
+    def iter_range(self, file: str, start: int = 0, end: int = None):
+        import pdfplumber
+        with pdfplumber.open(file) as pdf:
+            for page in pdf.pages[start:end]:
+                page_text = page.extract_text() or ""
+                # Release the cached layout objects, we only need the text
+                page.flush_cache()
+                yield page_text
+
+
+class FastTextExtractor(TextExtractor):
+    """PyPDF2 content-stream extraction: much faster, no layout analysis."""
+    name = "fast"
+
+    def page_count(self, file: str) -> int:
+        import PyPDF2
+        return len(PyPDF2.PdfReader(file).pages)
+
+    def iter_range(self, file: str, start: int = 0, end: int = None):
+        import PyPDF2
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages[start:end]:
+            try:
+                yield page.extract_text() or ""
+            except Exception as e:
+                print(f"⚠️ PyPDF2 could not read page: {e}")
+                yield ""
+
+
+class AutoTextExtractor(TextExtractor):
+    """Fast path with pdfplumber fallback for pages that come back empty or garbled."""
+    name = "auto"
+
+    def page_count(self, file: str) -> int:
+        return FastTextExtractor().page_count(file)
+
+    def iter_range(self, file: str, start: int = 0, end: int = None):
+        import PyPDF2
+        import pdfplumber
+        reader = PyPDF2.PdfReader(file)
+        end = len(reader.pages) if end is None else min(end, len(reader.pages))
+        pdf = None
+        fallbacks = 0
+
+        try:
+            for index in range(start, end):
+                try:
+                    page_text = reader.pages[index].extract_text() or ""
+                except Exception:
+                    page_text = ""
+
+                if looks_garbled(page_text):
+                    # Only open pdfplumber once a page actually needs it
+                    if pdf is None:
+                        pdf = pdfplumber.open(file)
+                    page = pdf.pages[index]
+                    layout_text = page.extract_text() or ""
+                    page.flush_cache()
+                    if layout_text.strip():
+                        page_text = layout_text
+                        fallbacks += 1
+
+                yield page_text
+        finally:
+            if pdf is not None:
+                pdf.close()
+            if fallbacks:
+                print(f"  pdfplumber fallback used for {fallbacks} of {end - start} pages")
+
+
+EXTRACTORS = {
+    extractor.name: extractor
+    for extractor in (LayoutTextExtractor, FastTextExtractor, AutoTextExtractor)
+}
+
+
+def get_extractor(name: str) -> TextExtractor:
+    """Return an extractor instance by strategy name ("fast", "layout" or "auto")."""
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown text extractor '{name}'. Choose from: {', '.join(EXTRACTORS)}")
+    return EXTRACTORS[name]()
@@ -0,0 +1,167 @@
+import os
+import re
+from collections import Counter, deque
+from functions.chapters import CHAPTER_HEADING
+
+# Lines at the top and bottom of a page that can be running headers, footers or page numbers
+EDGE_LINES = 3
+
+# Pages before and after a page whose edges it is compared with
+WINDOW_PAGES = 12
+
+# An edge line is a running header/footer if it recurs at the same edge of at least
+# MIN_REPEATS pages in the window, and of at least MIN_REPEAT_SHARE of them
+MIN_REPEATS = 3
+MIN_REPEAT_SHARE = 0.3
+
+# Longer lines are taken for body text even if they repeat (running headers are short)
+MAX_HEADER_CHARS = int(os.getenv("TTS_MAX_HEADER_CHARS", "70"))
+
+# A well-formed roman numeral below 400, as used for front matter ("xiv"). Words made of
+# numeral letters ("did", "mix", "civil") are not well-formed or need d/m, so they never match.
+ROMAN_NUMERAL = r"(?=[ivxlc])c{0,3}(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})"
+
+# "12", "- 12 -", "[xiv]", "Page 12", "12 of 300", "12/300"; roman numerals all lower or all upper case
+PAGE_NUMBER = re.compile(
+    r"^(?:page\s+)?[-–—(\[]?\s*"
+    rf"(?:\d{{1,4}}|(?-i:{ROMAN_NUMERAL}|{ROMAN_NUMERAL.upper()}))"
+    r"\s*[-–—)\]]?(?:\s*(?:of|/)\s*\d{1,4})?$",
+    re.IGNORECASE,
+)
+
+# A word split over two lines: "exam-\nple"
+HYPHENATED_BREAK = re.compile(r"(\w)-\n[ \t]*([a-z])")
+
+# Word fragment left hanging at the end of a page
+TRAILING_FRAGMENT = re.compile(r"(\w+)-$")
+
+SPACES = re.compile(r"[ \t\u00a0]+")
+BLANK_LINES = re.compile(r"\n{3,}")
+DIGITS = re.compile(r"\d+")
+
+
+def line_key(line: str) -> str:
+    """Compare lines ignoring case, spacing and numbers, so "The Storm · 47" matches "The Storm · 48".
+
+    Chapter headings keep their numbers: "Chapter 1" and "Chapter 2" are
+    different lines, not a running header.
+    """
+    key = SPACES.sub(" ", line.strip().lower())
+    if CHAPTER_HEADING.match(key):
+        return key
+    return DIGITS.sub("#", key)
+
+
+class TextNormalizer:
+    """Cleans extracted page text before it is chunked for TTS.
+
+    Running headers and footers are found with a frequency index of the lines
+    at the top and bottom of each page: a line (numbers ignored) that recurs
+    at the same edge of many pages around the current one is removed, as are
+    page numbers. Words hyphenated across a line or page break are rejoined
+    and whitespace is collapsed. Pages stream through with a lookahead of
+    `window` pages; one normalizer can be fed several page ranges of the same
+    book in order (e.g. chapter by chapter) and keeps its index and counts.
+    """
+
+    def __init__(self, window: int = WINDOW_PAGES):
+        self.window = window
+        self._edges = Counter()
+        self._history = deque()
+        self.stats = {
+            "chars_in": 0,
+            "chars_out": 0,
+            "header_footer_lines": 0,
+            "page_numbers": 0,
+            "hyphenations": 0,
+        }
+
+    @property
+    def chars_saved(self) -> int:
+        return self.stats["chars_in"] - self.stats["chars_out"]
+
+    def summary(self) -> str:
+        chars_in = self.stats["chars_in"]
+        share = self.chars_saved / chars_in * 100 if chars_in else 0.0
+        return (f"saved {self.chars_saved:,} of {chars_in:,} chars ({share:.1f}%): "
+                f"{self.stats['header_footer_lines']} header/footer lines, "
+                f"{self.stats['page_numbers']} page numbers, {self.stats['hyphenations']} hyphenations")
+
+    @staticmethod
+    def _edge_keys(lines: list) -> set:
+        content = [line for line in lines if line.strip()]
+        return (
+            {("top", line_key(line)) for line in content[:EDGE_LINES]}
+            | {("bottom", line_key(line)) for line in content[-EDGE_LINES:]}
+        )
+
+    def normalize(self, pages):
+        """Yield the normalized text of each page, reading up to `window` pages ahead."""
+        ahead = deque()
+        carry = ""
+        for text in pages:
+            self.stats["chars_in"] += len(text or "")
+            lines = (text or "").splitlines()
+            keys = self._edge_keys(lines)
+            self._edges.update(keys)
+            ahead.append((lines, keys))
+            if len(ahead) > self.window:
+                page, carry = self._emit(ahead, carry)
+                yield page
+
+        while ahead:
+            page, carry = self._emit(ahead, carry)
+            yield page
+        if carry:
+            # The book (or range) ended on a hyphen
+            self.stats["chars_out"] += len(carry) + 1
+            yield f"{carry}-"
+
+    def _emit(self, ahead: deque, carry: str):
+        """Clean the oldest page in `ahead`; returns (text, word fragment carried to the next page)."""
+        lines, keys = ahead.popleft()
+        pages_in_window = len(self._history) + 1 + len(ahead)
+        threshold = max(MIN_REPEATS, MIN_REPEAT_SHARE * pages_in_window)
+
+        content = [idx for idx, line in enumerate(lines) if line.strip()]
+        removed = set()
+        for edge, candidates in (("top", content[:EDGE_LINES]), ("bottom", reversed(content[-EDGE_LINES:]))):
+            # Peel from the page edge inwards, stopping at the first line that is body text
+            for idx in candidates:
+                if idx in removed:
+                    break
+                line = lines[idx].strip()
+                if PAGE_NUMBER.match(line):
+                    self.stats["page_numbers"] += 1
+                elif len(line) <= MAX_HEADER_CHARS and self._edges[(edge, line_key(line))] >= threshold:
+                    self.stats["header_footer_lines"] += 1
+                else:
+                    break
+                removed.add(idx)
+
+        self._history.append(keys)
+        if len(self._history) > self.window:
+            for key in self._history.popleft():
+                self._edges[key] -= 1
+                if self._edges[key] <= 0:
+                    del self._edges[key]
+
+        text = "\n".join(SPACES.sub(" ", line).strip() for idx, line in enumerate(lines) if idx not in removed)
+        text, joined = HYPHENATED_BREAK.subn(r"\1\2", text)
+        self.stats["hyphenations"] += joined
+        text = BLANK_LINES.sub("\n\n", text).strip()
+
+        if carry:
+            if text[:1].islower():
+                self.stats["hyphenations"] += 1
+                text = carry + text
+            else:
+                text = f"{carry}-{text}"
+        carry = ""
+        match = TRAILING_FRAGMENT.search(text)
+        if match:
+            carry = match.group(1)
+            text = text[:match.start()].rstrip()
+
+        self.stats["chars_out"] += len(text)
+        return text, carry
@@ -0,0 +1,146 @@
+import os
+import copy
+import shutil
+import asyncio
+import platform
+import threading
+import subprocess
+from types import MappingProxyType
+from datetime import datetime
+from dotenv import load_dotenv
+from functions.tts_workers import pyttsx3_pool, TTSWorkerError
+
+load_dotenv()
+
+# Seconds to wait for the edge-tts voice list at startup
+EDGE_VOICES_TIMEOUT = float(os.getenv("EDGE_VOICES_TIMEOUT", "10"))
+
+# Voice names accepted by the API, mapped to edge-tts voices
+VOICES = MappingProxyType({
+    "male": "en-US-GuyNeural",
+    "female": "en-US-JennyNeural",
+    "British-male": "en-GB-RyanNeural",
+    "British-female": "en-GB-SoniaNeural",
+    "Australian-male": "en-AU-WilliamNeural",
+    "Australian-female": "en-AU-NatashaNeural",
+    "Indian-male": "en-IN-PrabhatNeural",
+    "Indian-female": "en-IN-NeerjaNeural"
+})
+
+
+class EngineRegistry:
+    """What this machine can do for audio jobs, probed once and then shared.
+
+    probe() checks ffmpeg, espeak, pyttsx3 (by starting the first pooled
+    worker, which then stays warm) and the edge-tts voice list. It runs once
+    at startup; converters only read the cached results, so building one is
+    cheap and no probe ever runs inside a request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._capabilities = None
+        self.voices = VOICES
+
+    def probe(self, refresh: bool = False) -> dict:
+        """Probe every engine and tool (once, unless refresh) and return the capabilities."""
+        with self._lock:
+            if self._capabilities is None or refresh:
+                self._capabilities = {
+                    "ffmpeg": self._probe_ffmpeg(),
+                    "espeak": self._probe_espeak(),
+                    "pyttsx3": self._probe_pyttsx3(),
+                    "edge_tts": self._probe_edge_tts(),
+                    "probed_at": datetime.now().isoformat(),
+                }
+                print(f"[Engines] ffmpeg: {self._capabilities['ffmpeg']['available']}, "
+                      f"pyttsx3: {self._capabilities['pyttsx3']['available']}, "
+                      f"edge-tts voices: {len(self._capabilities['edge_tts']['voices'])}")
+            return self._capabilities
+
+    async def probe_async(self) -> dict:
+        """probe() on a worker thread, for use from the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.probe)
+
+    @property
+    def capabilities(self) -> dict:
+        """A copy of the probe results; probes first if that has not happened yet."""
+        return copy.deepcopy(self.probe())
+
+    @property
+    def ffmpeg_available(self) -> bool:
+        return self.probe()["ffmpeg"]["available"]
+
+    def can_encode(self, encoder: str) -> bool:
+        """True if the probed ffmpeg has this audio encoder (e.g. libopus, aac)."""
+        return encoder in self.probe()["ffmpeg"]["encoders"]
+
+    @property
+    def pyttsx3_available(self) -> bool:
+        return self.probe()["pyttsx3"]["available"]
+
+    def _probe_ffmpeg(self) -> dict:
+        path = shutil.which("ffmpeg")
+        if not path:
+            print("⚠️ ffmpeg not available, will use pydub for audio merging")
+            return {"available": False, "path": None, "version": None, "encoders": []}
+        try:
+            result = subprocess.run([path, "-version"], capture_output=True, text=True, timeout=10)
+            version = result.stdout.splitlines()[0] if result.returncode == 0 and result.stdout else None
+        except Exception as e:
+            print(f"⚠️ ffmpeg not available: {e}")
+            version = None
+        encoders = []
+        if version:
+            print("✅ ffmpeg is available")
+            encoders = self._ffmpeg_audio_encoders(path)
+        return {"available": version is not None, "path": path, "version": version, "encoders": encoders}
+
+    def _ffmpeg_audio_encoders(self, path: str) -> list:
+        try:
+            result = subprocess.run([path, "-hide_banner", "-encoders"], capture_output=True, text=True, timeout=10)
+        except Exception as e:
+            print(f"⚠️ Could not list ffmpeg encoders: {e}")
+            return []
+        # Lines look like " A....D libopus   libopus Opus (codec opus)"; A marks audio encoders
+        return sorted(
+            parts[1] for parts in (line.split() for line in result.stdout.splitlines())
+            if len(parts) >= 2 and len(parts[0]) == 6 and parts[0].startswith("A")
+        )
+
+    def _probe_espeak(self) -> dict:
+        path = shutil.which("espeak") or shutil.which("espeak-ng")
+        if not path and platform.system() == "Linux":
+            print("⚠️ espeak not found; install it (apt-get install espeak) to use pyttsx3")
+        return {"available": path is not None, "path": path}
+
+    def _probe_pyttsx3(self) -> dict:
+        try:
+            pyttsx3_pool.warm()
+            print("✅ pyttsx3 is available")
+            return {"available": True, "workers": pyttsx3_pool.size, "error": None}
+        except (TTSWorkerError, OSError) as e:
+            print(f"⚠️ pyttsx3 not available: {e}")
+            print("   Will use edge-tts for all voices")
+            return {"available": False, "workers": 0, "error": str(e)}
+
+    def _probe_edge_tts(self) -> dict:
+        try:
+            import edge_tts
+
+            async def list_voices():
+                return await asyncio.wait_for(edge_tts.list_voices(), EDGE_VOICES_TIMEOUT)
+
+            voices = sorted(voice["ShortName"] for voice in asyncio.run(list_voices()))
+        except Exception as e:
+            # The service may just be unreachable right now; synthesis will still be attempted
+            print(f"⚠️ Could not list edge-tts voices: {e}")
+            return {"available": True, "voices": [], "missing_voices": [], "error": str(e) or type(e).__name__}
+
+        missing = [name for name in VOICES.values() if name not in voices]
+        if missing:
+            print(f"⚠️ edge-tts no longer offers: {', '.join(missing)}")
+        return {"available": True, "voices": voices, "missing_voices": missing, "error": None}
+
+
+engine_registry = EngineRegistry()
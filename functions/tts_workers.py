@@ -0,0 +1,205 @@
+import os
+import queue
+import atexit
+import threading
+import multiprocessing
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Speaking rate, part of the audio cache key
+PYTTSX3_RATE = 150
+
+# Long-lived pyttsx3 processes; each synthesizes one chunk at a time
+PYTTSX3_WORKERS = int(os.getenv("PYTTSX3_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+
+# Chunks a worker synthesizes before it is replaced, to bound leaks in espeak
+PYTTSX3_MAX_JOBS_PER_WORKER = int(os.getenv("PYTTSX3_MAX_JOBS_PER_WORKER", "25"))
+
+# Seconds to wait for one chunk (they are up to ~1 hour of speech) and for a worker to start
+PYTTSX3_JOB_TIMEOUT = float(os.getenv("PYTTSX3_JOB_TIMEOUT", "3600"))
+PYTTSX3_START_TIMEOUT = float(os.getenv("PYTTSX3_START_TIMEOUT", "60"))
+
+
+class TTSWorkerError(Exception):
+    pass
+
+
+def _worker_main(conn, rate: int, volume: float):
+    """Worker process: initialize pyttsx3 once, then synthesize jobs from the pipe until told to stop."""
+    try:
+        import pyttsx3
+        speaker = pyttsx3.init()
+        speaker.setProperty('rate', rate)
+        speaker.setProperty('volume', volume)
+    except Exception as e:
+        conn.send(("error", f"pyttsx3 init failed: {e}"))
+        return
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        if message == "ping":
+            conn.send(("pong", None))
+            continue
+
+        text, output_path = message
+        try:
+            speaker.save_to_file(text, output_path)
+            speaker.runAndWait()
+            conn.send(("ok", None))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class _Worker:
+    def __init__(self, context, rate: int, volume: float, start_timeout: float):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, rate, volume), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+        try:
+            status, detail = self._receive(start_timeout)
+            if status != "ready":
+                raise TTSWorkerError(detail)
+        except BaseException:
+            # Never leave a half-started worker (e.g. one that hung on engine init) behind
+            self.kill()
+            self.conn.close()
+            raise
+
+    def _receive(self, timeout: float):
+        if not self.conn.poll(timeout):
+            raise TTSWorkerError(f"worker {self.process.pid} did not answer within {timeout:.0f}s")
+        try:
+            return self.conn.recv()
+        except EOFError:
+            self.process.join(1)
+            raise TTSWorkerError(f"worker {self.process.pid} exited (code {self.process.exitcode})")
+
+    def healthy(self) -> bool:
+        if not self.process.is_alive():
+            return False
+        try:
+            self.conn.send("ping")
+            return self._receive(5)[0] == "pong"
+        except (OSError, TTSWorkerError):
+            return False
+
+    def run(self, text: str, output_path: str, timeout: float):
+        self.conn.send((text, output_path))
+        status, detail = self._receive(timeout)
+        self.jobs += 1
+        if status != "ok":
+            raise TTSWorkerError(detail)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+
+
+class Pyttsx3WorkerPool:
+    """A pool of long-lived pyttsx3 processes that synthesize chunks sent over pipes.
+
+    Workers start on first use and keep their engine initialized between
+    chunks, so there is no per-chunk interpreter or espeak startup. A worker
+    is health-checked before it is handed out, killed if it crashes or times
+    out, and retired after max_jobs chunks; replacements start on demand.
+    synthesize() is blocking and thread-safe, so up to `size` chunks can be
+    in progress at once from different threads.
+    """
+
+    def __init__(self, size: int = PYTTSX3_WORKERS, max_jobs: int = PYTTSX3_MAX_JOBS_PER_WORKER,
+                 job_timeout: float = PYTTSX3_JOB_TIMEOUT, rate: int = PYTTSX3_RATE, volume: float = 0.9):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.job_timeout = job_timeout
+        self.rate = rate
+        self.volume = volume
+        # spawn: espeak state and the server's threads must not be inherited through fork
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.LifoQueue()
+        self._slots = threading.Semaphore(size)
+        self._lock = threading.Lock()
+        self._workers = set()
+        self._closed = False
+
+    def _checkout(self) -> _Worker:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker.healthy():
+                return worker
+            print(f"⚠️ [TTSPool] Worker {worker.process.pid} failed its health check, replacing it")
+            self._discard(worker, kill=True)
+
+        worker = _Worker(self._context, self.rate, self.volume, PYTTSX3_START_TIMEOUT)
+        with self._lock:
+            self._workers.add(worker)
+        print(f"[TTSPool] Started pyttsx3 worker {worker.process.pid}")
+        return worker
+
+    def _discard(self, worker: _Worker, kill: bool = False):
+        with self._lock:
+            self._workers.discard(worker)
+        if kill:
+            worker.kill()
+            worker.conn.close()
+        else:
+            worker.stop()
+
+    def warm(self):
+        """Start a worker ahead of the first chunk; raises TTSWorkerError if pyttsx3 cannot start."""
+        with self._slots:
+            self._idle.put(self._checkout())
+
+    def synthesize(self, text: str, output_path: str):
+        """Synthesize text into output_path on a pooled worker, blocking until it is written."""
+        if self._closed:
+            raise TTSWorkerError("worker pool is shut down")
+
+        with self._slots:
+            worker = self._checkout()
+            try:
+                worker.run(text, output_path, self.job_timeout)
+            except Exception:
+                # A failed or hung engine is not trusted with another chunk
+                self._discard(worker, kill=True)
+                raise
+
+            if worker.jobs >= self.max_jobs:
+                print(f"[TTSPool] Recycling worker {worker.process.pid} after {worker.jobs} chunks")
+                self._discard(worker)
+            else:
+                self._idle.put(worker)
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+
+pyttsx3_pool = Pyttsx3WorkerPool()
+atexit.register(pyttsx3_pool.shutdown)
@@ -0,0 +1,187 @@
+import os
+import re
+import time
+import shutil
+import hashlib
+import threading
+from dotenv import load_dotenv
+from helper.sqlite_db import CACHE_DIR, open_database, transaction
+
+load_dotenv()
+
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join(CACHE_DIR, "audio"))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so layout-only differences map to the same cache entry."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class AudioChunkCache:
+    """Disk-backed LRU cache of synthesized audio chunks.
+
+    Entries are keyed by the hash of the normalized chunk text together with
+    the engine, voice and speaking rate. Sizes and last access times live in
+    an SQLite index next to the chunks that every worker shares, so max_bytes
+    bounds the whole cache rather than each process's share of it. The index
+    is opened on first use, not at import; hit and miss counters are per
+    process.
+    """
+
+    INDEX_NAME = "index.sqlite3"
+
+    def __init__(self, cache_dir: str = AUDIO_CACHE_DIR, max_bytes: int = AUDIO_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, self.INDEX_NAME)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._opened = False
+
+    def _open(self):
+        """Create the index on first use; chunks cached before it existed are imported once."""
+        with self._lock:
+            if self._opened:
+                return
+            open_database(self.index_path)
+            with transaction(self.index_path, immediate=True) as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS chunks (
+                        key TEXT PRIMARY KEY,
+                        size_bytes INTEGER NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_last_access ON chunks (last_access)")
+                if conn.execute("SELECT 1 FROM chunks LIMIT 1").fetchone() is None:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO chunks (key, size_bytes, last_access) VALUES (?, ?, ?)",
+                        self._scan_files()
+                    )
+            self._opened = True
+
+    def _scan_files(self) -> list:
+        """(key, size, mtime) of the chunk files on disk."""
+        found = []
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".mp3"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                found.append((name[:-4], stat.st_size, stat.st_mtime))
+        return found
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+
+    def key(self, text: str, voice: str, engine: str, rate=None) -> str:
+        """Cache key for one chunk of text synthesized with the given engine settings."""
+        text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{engine}|{voice}|{rate}|{text_hash}".encode("utf-8")).hexdigest()
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str, dest_path: str) -> bool:
+        """Materialize a cached chunk at dest_path. Returns False on a miss."""
+        self._open()
+        with transaction(self.index_path) as conn:
+            cached = conn.execute(
+                "UPDATE chunks SET last_access = ? WHERE key = ?", (time.time(), key)
+            ).rowcount > 0
+        if not cached:
+            self._count(hit=False)
+            return False
+
+        path = self._path(key)
+        try:
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            try:
+                os.link(path, dest_path)
+            except OSError:
+                shutil.copyfile(path, dest_path)
+        except FileNotFoundError:
+            # Evicted by another worker meanwhile; forget it and count as a miss
+            with transaction(self.index_path) as conn:
+                conn.execute("DELETE FROM chunks WHERE key = ?", (key,))
+            self._count(hit=False)
+            return False
+        self._count(hit=True)
+        return True
+
+    def put(self, key: str, src_path: str):
+        """Add a freshly synthesized chunk to the cache and evict to stay within budget."""
+        size = os.path.getsize(src_path)
+        if size > self.max_bytes:
+            return
+
+        self._open()
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, path)
+
+        with transaction(self.index_path, immediate=True) as conn:
+            conn.execute(
+                "INSERT INTO chunks (key, size_bytes, last_access) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET size_bytes = excluded.size_bytes, last_access = excluded.last_access",
+                (key, size, time.time())
+            )
+            evicted = self._evict(conn, keep=key)
+
+        for evicted_key in evicted:
+            try:
+                os.remove(self._path(evicted_key))
+            except FileNotFoundError:
+                pass
+        if evicted:
+            with self._lock:
+                self.evictions += len(evicted)
+
+    def _evict(self, conn, keep: str = None) -> list:
+        """Drop least recently used entries from the index until the cache fits in max_bytes; returns their keys."""
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM chunks").fetchone()[0]
+        evicted = []
+        if total <= self.max_bytes:
+            return evicted
+
+        for key, size in conn.execute("SELECT key, size_bytes FROM chunks ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            evicted.append(key)
+            total -= size
+        conn.executemany("DELETE FROM chunks WHERE key = ?", [(key,) for key in evicted])
+        return evicted
+
+    def stats(self) -> dict:
+        self._open()
+        with transaction(self.index_path) as conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM chunks").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+audio_cache = AudioChunkCache()
@@ -0,0 +1,226 @@
+import os
+import hashlib
+import secrets
+import anyio
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request
+from starlette.responses import Response
+
+# Ranges beyond this count are not worth a multipart response; the full file is sent instead
+MAX_RANGES = 16
+
+# Bytes per read when the server cannot sendfile
+READ_CHUNK_SIZE = 256 * 1024
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Strong ETag for a file that is only ever replaced, never modified in place."""
+    digest = hashlib.sha1(f"{stat.st_ino}-{stat.st_size}-{stat.st_mtime_ns}".encode()).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def parse_range_header(value: str, size: int):
+    """Parse a Range header against a file of `size` bytes.
+
+    Returns a list of inclusive (start, end) pairs, sorted with overlapping
+    ranges merged; [] if no range is satisfiable; None if the header should
+    be ignored (malformed, not in bytes, or too many ranges).
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition("-")
+        if not dash:
+            return None
+        try:
+            if first == "":
+                # Suffix range: the last N bytes
+                length = int(last)
+                if length <= 0:
+                    continue
+                ranges.append((max(size - length, 0), size - 1))
+                continue
+            start = int(first)
+            end = int(last) if last else None
+        except ValueError:
+            return None
+        if end is None:
+            end = size - 1
+        elif start > end:
+            return None
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    if "*" in candidates:
+        return True
+    if weak:
+        candidates = [candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates]
+    return etag in candidates
+
+
+def _not_modified_since(header: str, mtime: float) -> bool:
+    try:
+        return int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+class RangeFileResponse(Response):
+    """Streams byte ranges of a file, as one body or as multipart/byteranges parts.
+
+    Uses the ASGI zero-copy send extension (sendfile) when the server offers
+    it and falls back to positional reads in a worker thread otherwise.
+    """
+
+    def __init__(self, path: str, status_code: int, headers: dict, parts: list, epilogue: bytes = b"",
+                 send_body: bool = True):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.parts = parts  # (prefix bytes, offset, length)
+        self.epilogue = epilogue
+        self.send_body = send_body
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zero_copy = "http.response.zerocopysend" in (scope.get("extensions") or {})
+        with open(self.path, "rb") as f:
+            for prefix, offset, length in self.parts:
+                if prefix:
+                    await send({"type": "http.response.body", "body": prefix, "more_body": True})
+                if zero_copy:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": f,
+                        "offset": offset,
+                        "count": length,
+                        "more_body": True,
+                    })
+                    continue
+                while length > 0:
+                    block = await anyio.to_thread.run_sync(os.pread, f.fileno(), min(READ_CHUNK_SIZE, length), offset)
+                    if not block:
+                        break
+                    offset += len(block)
+                    length -= len(block)
+                    await send({"type": "http.response.body", "body": block, "more_body": True})
+
+        await send({"type": "http.response.body", "body": self.epilogue, "more_body": False})
+
+
+def serve_file(request: Request, path: str, media_type: str, filename: str = None,
+               headers: dict = None) -> Response:
+    """Serve a file with validators, conditional requests and single/multi-range support.
+
+    - ETag and Last-Modified on every response
+    - If-None-Match / If-Modified-Since answered with 304
+    - Range answered with 206 (multipart/byteranges for several ranges) or 416
+    - If-Range falls back to the full file when the validator no longer matches
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(stat)
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+    base_headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+    }
+    if filename:
+        base_headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    base_headers.update(headers or {})
+    send_body = request.method != "HEAD"
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag, weak=True)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(if_modified_since) and _not_modified_since(if_modified_since, stat.st_mtime)
+    if not_modified:
+        return Response(status_code=304, headers=base_headers)
+
+    ranges = None
+    range_header = request.headers.get("range")
+    if range_header:
+        if_range = request.headers.get("if-range")
+        if if_range:
+            if if_range.startswith('"') or if_range.startswith("W/"):
+                range_valid = if_range == etag
+            else:
+                range_valid = if_range == last_modified
+        else:
+            range_valid = True
+        if range_valid:
+            ranges = parse_range_header(range_header, size)
+
+    if ranges == []:
+        return Response(status_code=416, headers={**base_headers, "Content-Range": f"bytes */{size}"})
+
+    if not ranges:
+        return RangeFileResponse(
+            path, 200, {**base_headers, "Content-Type": media_type, "Content-Length": str(size)},
+            [(b"", 0, size)], send_body=send_body
+        )
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        return RangeFileResponse(
+            path, 206,
+            {
+                **base_headers,
+                "Content-Type": media_type,
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            },
+            [(b"", start, end - start + 1)], send_body=send_body
+        )
+
+    boundary = secrets.token_hex(16)
+    parts = []
+    content_length = 0
+    for index, (start, end) in enumerate(ranges):
+        separator = "\r\n" if index else ""
+        prefix = (
+            f"{separator}--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode("latin-1")
+        parts.append((prefix, start, end - start + 1))
+        content_length += len(prefix) + end - start + 1
+    epilogue = f"\r\n--{boundary}--\r\n".encode("latin-1")
+    content_length += len(epilogue)
+
+    return RangeFileResponse(
+        path, 206,
+        {
+            **base_headers,
+            "Content-Type": f"multipart/byteranges; boundary={boundary}",
+            "Content-Length": str(content_length),
+        },
+        parts, epilogue, send_body=send_body
+    )
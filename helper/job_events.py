@@ -0,0 +1,93 @@
+import os
+import asyncio
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Shortest gap between two pushes to one subscriber; updates in between are merged
+EVENT_MIN_INTERVAL = float(os.getenv("JOB_EVENT_MIN_INTERVAL", "0.5"))
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class JobSubscription:
+    """One client's view of a job: only the latest state is kept, so slow readers never queue up."""
+
+    def __init__(self, hub, job_id: str):
+        self.hub = hub
+        self.job_id = job_id
+        self._latest = None
+        self._changed = asyncio.Event()
+
+    def _push(self, event: dict):
+        # Runs on the event loop; merges into the pending state instead of queueing
+        self._latest = {**(self._latest or {}), **event}
+        self._changed.set()
+
+    async def next(self, timeout: float = None):
+        """The latest state since the previous call, or None if nothing changed within timeout."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._changed.clear()
+        event, self._latest = self._latest, None
+        return event
+
+    def close(self):
+        self.hub._unsubscribe(self)
+
+
+class JobEventHub:
+    """Fans job status and progress updates out to any number of subscribers per job.
+
+    publish() can be called from any thread (conversion stages run on worker
+    pools); delivery happens on the event loop. Updates that arrive faster
+    than a subscriber reads them are coalesced into the latest state.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._loop = None
+
+    def subscribe(self, job_id: str) -> JobSubscription:
+        self._loop = asyncio.get_running_loop()
+        subscription = JobSubscription(self, job_id)
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: JobSubscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.job_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.job_id]
+
+    def publish(self, job_id: str, **event):
+        """Send a state change (status, progress, reason, ...) of job_id to its subscribers."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(job_id, ()))
+        if not subscribers or self._loop is None:
+            return
+
+        event = {"job_id": job_id, **event}
+
+        def deliver():
+            for subscription in subscribers:
+                subscription._push(event)
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            deliver()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(deliver)
+
+
+job_events = JobEventHub()
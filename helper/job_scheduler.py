@@ -0,0 +1,115 @@
+import os
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Audio jobs running at the same time; the rest wait in the queue
+MAX_RUNNING_JOBS = int(os.getenv("AUDIO_MAX_RUNNING_JOBS", "2"))
+
+# Concurrency per pipeline stage, across all running jobs
+STAGE_LIMITS = {
+    "download": int(os.getenv("AUDIO_STAGE_DOWNLOAD", "1")),
+    "extract": int(os.getenv("AUDIO_STAGE_EXTRACT", "2")),
+    "synthesize": int(os.getenv("AUDIO_STAGE_SYNTHESIZE", "2")),
+    "merge": int(os.getenv("AUDIO_STAGE_MERGE", "1")),
+    "encode": int(os.getenv("AUDIO_STAGE_ENCODE", "1")),
+}
+
+# How often queued and running jobs are marked alive in the job store
+HEARTBEAT_SECONDS = float(os.getenv("AUDIO_JOB_HEARTBEAT_SECONDS", "60"))
+
+
+class JobScheduler:
+    """Runs audio jobs with bounded concurrency, off the event loop.
+
+    Jobs wait in a priority queue (higher priority first, FIFO within a
+    priority) until one of max_running slots frees up. Inside a job every
+    blocking stage runs on that stage's own thread pool, and each stage has
+    its own concurrency limit, so a slow download or merge never blocks the
+    API and never starves the other stages. run_heartbeat() keeps every job
+    it holds marked alive, however long it waits or runs.
+    """
+
+    def __init__(self, max_running: int = MAX_RUNNING_JOBS, stage_limits: dict = None):
+        self.max_running = max_running
+        self.stage_limits = dict(stage_limits or STAGE_LIMITS)
+        self._queue = []
+        self._counter = itertools.count()
+        # Running task -> job id
+        self._running = {}
+        self._executors = {
+            stage: ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"audio-{stage}")
+            for stage, limit in self.stage_limits.items()
+        }
+        self._semaphores = {}
+
+    def _semaphore(self, stage: str) -> asyncio.Semaphore:
+        # Created lazily so they bind to the running event loop
+        if stage not in self._semaphores:
+            self._semaphores[stage] = asyncio.Semaphore(self.stage_limits[stage])
+        return self._semaphores[stage]
+
+    def submit(self, job_id: str, job_factory, priority: int = 0):
+        """Queue job_factory() (a coroutine function) to run when a slot is free."""
+        heapq.heappush(self._queue, (-priority, next(self._counter), job_id, job_factory))
+        print(f"[Scheduler] Queued job {job_id} (priority {priority}, {len(self._queue)} waiting)")
+        self._start_ready_jobs()
+
+    def stats(self) -> dict:
+        """Running and queued job counts of this worker, with the configured limits."""
+        return {
+            "running": len(self._running),
+            "queued": len(self._queue),
+            "max_running": self.max_running,
+            "stage_limits": self.stage_limits,
+        }
+
+    def job_ids(self) -> list:
+        """Ids of the jobs waiting in the queue or running."""
+        return [job_id for _priority, _seq, job_id, _factory in self._queue] + list(self._running.values())
+
+    async def run_heartbeat(self, beat, interval: float = HEARTBEAT_SECONDS):
+        """Call beat(job_ids) off the event loop every interval seconds, until cancelled."""
+        while True:
+            job_ids = self.job_ids()
+            if job_ids:
+                try:
+                    await asyncio.to_thread(beat, job_ids)
+                except Exception as e:
+                    print(f"[Scheduler] ⚠️ Heartbeat failed: {e}")
+            await asyncio.sleep(interval)
+
+    def _start_ready_jobs(self):
+        while self._queue and len(self._running) < self.max_running:
+            _priority, _seq, job_id, job_factory = heapq.heappop(self._queue)
+            task = asyncio.create_task(self._run(job_id, job_factory))
+            self._running[task] = job_id
+
+    async def _run(self, job_id: str, job_factory):
+        try:
+            await job_factory()
+        except Exception as e:
+            print(f"[Scheduler] Job {job_id} crashed: {e}")
+        finally:
+            self._running.pop(asyncio.current_task(), None)
+            self._start_ready_jobs()
+
+    @asynccontextmanager
+    async def slot(self, stage: str):
+        """Hold one of a stage's concurrency slots, for work that is already async."""
+        async with self._semaphore(stage):
+            yield
+
+    async def run_blocking(self, stage: str, fn, *args):
+        """Run a blocking call on the stage's thread pool, within the stage's limit."""
+        async with self._semaphore(stage):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executors[stage], fn, *args)
+
+
+job_scheduler = JobScheduler()
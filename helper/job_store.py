@@ -0,0 +1,339 @@
+import os
+import time
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from dotenv import load_dotenv
+from helper.sqlite_db import CACHE_DIR, open_database, transaction
+
+load_dotenv()
+
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+
+# Progress is written at most this often per job, unless the status changes
+PROGRESS_FLUSH_SECONDS = float(os.getenv("JOB_PROGRESS_FLUSH_SECONDS", "2"))
+
+# An unfinished job that has not been updated (or heartbeat) for this long is considered dead
+STALE_JOB_SECONDS = int(os.getenv("STALE_JOB_SECONDS", str(30 * 60)))
+
+JOB_FIELDS = (
+    "job_id", "status", "progress", "reason", "filename", "file_path",
+    "book_name", "voice", "job_key", "leader_id", "priority", "segments_dir", "chapters_dir",
+    "renditions", "created_at", "updated_at",
+)
+
+# Columns added after the first release, created on startup if missing
+MIGRATED_COLUMNS = {
+    "priority": "INTEGER NOT NULL DEFAULT 0",
+    "segments_dir": "TEXT",
+    "chapters_dir": "TEXT",
+    "renditions": "TEXT",
+}
+
+
+class JobStore(ABC):
+    """Interface for audio job persistence.
+
+    Jobs are plain dicts with the keys in JOB_FIELDS; created_at and
+    updated_at are datetimes. Implementations must be safe to use from
+    several threads and several server processes at once.
+    """
+
+    @abstractmethod
+    def create(self, job: dict):
+        pass
+
+    @abstractmethod
+    def get(self, job_id: str):
+        pass
+
+    @abstractmethod
+    def update(self, job_id: str, **fields):
+        pass
+
+    @abstractmethod
+    def delete(self, job_ids: list):
+        pass
+
+    @abstractmethod
+    def list_older_than(self, cutoff: datetime) -> list:
+        pass
+
+    @abstractmethod
+    def create_deduplicated(self, job: dict, finished_since: datetime):
+        """Atomically create job, attaching it to an identical job if one exists.
+
+        Returns ("reused", finished_job), ("attached", leader_job) or ("new", job).
+        """
+
+    @abstractmethod
+    def finish(self, job_id: str, shared_fields: tuple):
+        """Copy shared_fields of a finished leader onto its followers and detach them."""
+
+    @abstractmethod
+    def file_in_use(self, file_path: str, exclude_job_ids: list, since: datetime) -> bool:
+        """Whether a job created since `since` (other than the excluded ones) serves this file or directory."""
+
+    @abstractmethod
+    def queue_position(self, job_id: str):
+        """1-based position among live queued jobs (priority first, then age), or None if not queued."""
+
+    @abstractmethod
+    def heartbeat(self, job_ids: list):
+        """Mark queued or running jobs, and the followers attached to them, as alive."""
+
+    @abstractmethod
+    def fail_stale(self, reason: str) -> int:
+        """Mark unfinished jobs not updated for STALE_JOB_SECONDS (left by a crash or restart) as failed.
+
+        Followers are left alone while the job they are attached to is alive.
+        """
+
+    def progress_writer(self, job_id: str):
+        """Return an update_progress(status, progress) callable that batches writes."""
+        return BatchedProgressWriter(self, job_id)
+
+
+class BatchedProgressWriter:
+    """Coalesces progress updates so a job is written at most every PROGRESS_FLUSH_SECONDS.
+
+    Status changes and terminal progress are always written immediately; an
+    update held back is written by a timer once the interval has passed, even
+    if no further update comes.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, flush_seconds: float = PROGRESS_FLUSH_SECONDS):
+        self.store = store
+        self.job_id = job_id
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._status = None
+        self._progress = None
+        self._written = (None, None)
+        self._last_flush = 0.0
+        self._timer = None
+
+    def __call__(self, status: str, progress: int):
+        with self._lock:
+            self._status, self._progress = status, progress
+            wait = self.flush_seconds - (time.monotonic() - self._last_flush)
+            due = status != self._written[0] or progress >= 100 or wait <= 0
+            if not due and self._timer is None:
+                self._timer = threading.Timer(wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending = (self._status, self._progress)
+            if pending == self._written or pending[0] is None:
+                return
+            self._written = pending
+            self._last_flush = time.monotonic()
+        self.store.update(self.job_id, status=pending[0], progress=pending[1])
+
+
+class SQLiteJobStore(JobStore):
+    """Job store in a local SQLite database in WAL mode.
+
+    Every uvicorn worker on the host opens the same file, so status and
+    downloads work whichever worker receives the request.
+    """
+
+    def __init__(self, path: str = JOB_STORE_PATH):
+        self.path = path
+        open_database(self.path)
+
+        with transaction(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    reason TEXT,
+                    filename TEXT,
+                    file_path TEXT,
+                    book_name TEXT,
+                    voice TEXT,
+                    job_key TEXT,
+                    leader_id TEXT,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    segments_dir TEXT,
+                    chapters_dir TEXT,
+                    renditions TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in MIGRATED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_job_key ON jobs (job_key, status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_leader_id ON jobs (leader_id)")
+
+    @staticmethod
+    def _to_job(row) -> dict:
+        if row is None:
+            return None
+        job = dict(row)
+        job["created_at"] = datetime.fromtimestamp(job["created_at"])
+        job["updated_at"] = datetime.fromtimestamp(job["updated_at"])
+        return job
+
+    @staticmethod
+    def _insert(conn, job: dict):
+        now = time.time()
+        row = {field: job.get(field) for field in JOB_FIELDS}
+        row["progress"] = row["progress"] or 0
+        row["priority"] = row["priority"] or 0
+        row["created_at"] = job["created_at"].timestamp() if job.get("created_at") else now
+        row["updated_at"] = now
+        conn.execute(
+            f"INSERT INTO jobs ({', '.join(JOB_FIELDS)}) VALUES ({', '.join('?' for _ in JOB_FIELDS)})",
+            [row[field] for field in JOB_FIELDS]
+        )
+
+    def create(self, job: dict):
+        with transaction(self.path) as conn:
+            self._insert(conn, job)
+
+    def get(self, job_id: str):
+        with transaction(self.path) as conn:
+            return self._to_job(conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone())
+
+    def update(self, job_id: str, **fields):
+        fields = {name: value for name, value in fields.items() if name in JOB_FIELDS and name != "job_id"}
+        if not fields:
+            return
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with transaction(self.path) as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", [*fields.values(), job_id])
+
+    def delete(self, job_ids: list):
+        if not job_ids:
+            return
+        with transaction(self.path) as conn:
+            conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in job_ids])
+
+    def list_older_than(self, cutoff: datetime) -> list:
+        with transaction(self.path) as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE created_at < ? ORDER BY created_at", (cutoff.timestamp(),)
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def create_deduplicated(self, job: dict, finished_since: datetime):
+        with transaction(self.path, immediate=True) as conn:
+            finished = conn.execute(
+                "SELECT * FROM jobs WHERE job_key = ? AND status = 'completed' AND created_at >= ? "
+                "AND (file_path IS NOT NULL OR segments_dir IS NOT NULL OR chapters_dir IS NOT NULL) "
+                "ORDER BY created_at DESC",
+                (job["job_key"], finished_since.timestamp())
+            ).fetchall()
+            for row in finished:
+                output = row["file_path"] or row["segments_dir"] or row["chapters_dir"]
+                if os.path.exists(output):
+                    self._insert(conn, {
+                        **job,
+                        "status": row["status"],
+                        "progress": row["progress"],
+                        "filename": row["filename"],
+                        "file_path": row["file_path"],
+                        "segments_dir": row["segments_dir"],
+                        "chapters_dir": row["chapters_dir"],
+                        "renditions": row["renditions"],
+                    })
+                    return "reused", self._to_job(row)
+
+            leader = conn.execute(
+                "SELECT * FROM jobs WHERE job_key = ? AND leader_id IS NULL "
+                "AND status NOT IN ('completed', 'failed') AND updated_at >= ? "
+                "ORDER BY created_at LIMIT 1",
+                (job["job_key"], time.time() - STALE_JOB_SECONDS)
+            ).fetchone()
+            if leader:
+                self._insert(conn, {**job, "leader_id": leader["job_id"]})
+                return "attached", self._to_job(leader)
+
+            self._insert(conn, job)
+            return "new", job
+
+    def finish(self, job_id: str, shared_fields: tuple):
+        with transaction(self.path, immediate=True) as conn:
+            leader = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if leader is None:
+                return
+            assignments = ", ".join(f"{name} = ?" for name in shared_fields)
+            conn.execute(
+                f"UPDATE jobs SET {assignments}, leader_id = NULL, updated_at = ? WHERE leader_id = ?",
+                [*(leader[name] for name in shared_fields), time.time(), job_id]
+            )
+
+    def file_in_use(self, file_path: str, exclude_job_ids: list, since: datetime) -> bool:
+        placeholders = ", ".join("?" for _ in exclude_job_ids) or "''"
+        with transaction(self.path) as conn:
+            row = conn.execute(
+                f"SELECT 1 FROM jobs WHERE (file_path = ? OR segments_dir = ? OR chapters_dir = ?) "
+                f"AND created_at >= ? AND job_id NOT IN ({placeholders}) LIMIT 1",
+                [file_path, file_path, file_path, since.timestamp(), *exclude_job_ids]
+            ).fetchone()
+        return row is not None
+
+    def queue_position(self, job_id: str):
+        with transaction(self.path) as conn:
+            job = conn.execute(
+                "SELECT status, priority, created_at FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if not job or job["status"] != "queued":
+                return None
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND leader_id IS NULL AND updated_at >= ? "
+                "AND (priority > ? OR (priority = ? AND created_at < ?))",
+                (time.time() - STALE_JOB_SECONDS, job["priority"], job["priority"], job["created_at"])
+            ).fetchone()[0]
+        return ahead + 1
+
+    def heartbeat(self, job_ids: list):
+        if not job_ids:
+            return
+        placeholders = ", ".join("?" for _ in job_ids)
+        with transaction(self.path) as conn:
+            conn.execute(
+                f"UPDATE jobs SET updated_at = ? WHERE status NOT IN ('completed', 'failed') "
+                f"AND (job_id IN ({placeholders}) OR leader_id IN ({placeholders}))",
+                [time.time(), *job_ids, *job_ids]
+            )
+
+    def fail_stale(self, reason: str) -> int:
+        now = time.time()
+        with transaction(self.path, immediate=True) as conn:
+            live_leaders = {
+                row["job_id"] for row in conn.execute(
+                    "SELECT job_id FROM jobs WHERE status NOT IN ('completed', 'failed') AND updated_at >= ?",
+                    (now - STALE_JOB_SECONDS,)
+                )
+            }
+            stale = [
+                row["job_id"] for row in conn.execute(
+                    "SELECT job_id, leader_id FROM jobs WHERE status NOT IN ('completed', 'failed') AND updated_at < ?",
+                    (now - STALE_JOB_SECONDS,)
+                )
+                if row["leader_id"] not in live_leaders
+            ]
+            conn.executemany(
+                "UPDATE jobs SET status = 'failed', reason = ?, leader_id = NULL, updated_at = ? WHERE job_id = ?",
+                [(reason, now, job_id) for job_id in stale]
+            )
+        return len(stale)
+
+
+job_store = SQLiteJobStore()
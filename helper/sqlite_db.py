@@ -0,0 +1,41 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Default home of the local stores, caches and indexes; each one can be moved with its own env var
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+
+
+def open_database(path: str):
+    """Create the database's directory and switch it to WAL, so readers in other workers proceed while one writes."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # The journal mode cannot be changed inside a transaction
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
+
+
+@contextmanager
+def transaction(path: str, immediate: bool = False):
+    """Open a connection for one transaction; committed on success, rolled back on error, always closed.
+
+    Rows can be read by column name. immediate takes the write lock up front,
+    for read-then-write sequences.
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout = 30000")
+    try:
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
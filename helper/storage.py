@@ -0,0 +1,223 @@
+import os
+import time
+import shutil
+import asyncio
+import threading
+from dotenv import load_dotenv
+from helper.sqlite_db import CACHE_DIR, open_database, transaction
+
+load_dotenv()
+
+STORAGE_INDEX_PATH = os.getenv("STORAGE_INDEX_PATH", os.path.join(CACHE_DIR, "storage.sqlite3"))
+
+# Total size of tracked artifacts; least recently used unpinned ones are evicted above it
+STORAGE_MAX_BYTES = int(os.getenv("STORAGE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+
+# Unpinned artifacts not accessed for this long are deleted
+STORAGE_MAX_IDLE_SECONDS = int(os.getenv("STORAGE_MAX_IDLE_SECONDS", str(2 * 60 * 60)))
+
+# Pins older than this are assumed to be left over from a crashed process
+STORAGE_PIN_TTL_SECONDS = int(os.getenv("STORAGE_PIN_TTL_SECONDS", str(6 * 60 * 60)))
+
+# How often the background janitor runs
+JANITOR_INTERVAL_SECONDS = float(os.getenv("STORAGE_JANITOR_INTERVAL", "300"))
+
+
+def path_size(path: str) -> int:
+    """Size in bytes of a file, or of every file under a directory."""
+    if os.path.isdir(path):
+        total = 0
+        for root, _dirs, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class StorageManager:
+    """Index of the files and directories the API keeps on disk (PDFs, MP3s, renditions, segments, chapters).
+
+    Every artifact is registered with its kind, size, owner job, pin count and
+    last access. Pinned artifacts (e.g. the PDF and outputs of a running job)
+    are never deleted. The janitor, run periodically in the background,
+    deletes unpinned artifacts that have been idle for max_idle_seconds and
+    then evicts least recently used ones until the total is under max_bytes.
+    Extra cleanup (expiring old jobs) is hooked in with add_janitor_task(),
+    and add_keep_check() protects artifacts something else still needs.
+    """
+
+    def __init__(self, path: str = STORAGE_INDEX_PATH, max_bytes: int = STORAGE_MAX_BYTES,
+                 max_idle_seconds: int = STORAGE_MAX_IDLE_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_idle_seconds = max_idle_seconds
+        self._lock = threading.Lock()
+        self._janitor_tasks = []
+        self._keep_checks = []
+        open_database(self.path)
+
+        with transaction(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    path TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    owner_job TEXT,
+                    pins INTEGER NOT NULL DEFAULT 0,
+                    pinned_at REAL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_last_access ON artifacts (last_access)")
+
+    def register(self, path: str, kind: str, owner_job: str = None, pin: bool = False):
+        """Track a file or directory (again), refreshing its size and last access; pin=True also pins it."""
+        path = os.path.abspath(path)
+        now = time.time()
+        with transaction(self.path) as conn:
+            conn.execute(
+                "INSERT INTO artifacts (path, kind, size_bytes, owner_job, pins, pinned_at, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET kind = excluded.kind, size_bytes = excluded.size_bytes, "
+                "owner_job = COALESCE(excluded.owner_job, owner_job), pins = pins + excluded.pins, "
+                "pinned_at = COALESCE(excluded.pinned_at, pinned_at), last_access = excluded.last_access",
+                (path, kind, path_size(path), owner_job, 1 if pin else 0, now if pin else None, now, now)
+            )
+
+    def touch(self, path: str):
+        """Record an access (e.g. a download), moving the artifact to the back of the eviction order."""
+        with transaction(self.path) as conn:
+            conn.execute("UPDATE artifacts SET last_access = ? WHERE path = ?", (time.time(), os.path.abspath(path)))
+
+    def unpin(self, path: str):
+        with transaction(self.path) as conn:
+            conn.execute(
+                "UPDATE artifacts SET pins = MAX(pins - 1, 0), last_access = ?, "
+                "pinned_at = CASE WHEN pins <= 1 THEN NULL ELSE pinned_at END WHERE path = ?",
+                (time.time(), os.path.abspath(path))
+            )
+
+    def get(self, path: str):
+        with transaction(self.path) as conn:
+            row = conn.execute("SELECT * FROM artifacts WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return dict(row) if row else None
+
+    def _delete(self, path: str):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def remove(self, path: str) -> bool:
+        """Delete an artifact and forget it, unless it is pinned; untracked paths are deleted too."""
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self.get(path)
+            if entry and entry["pins"] > 0:
+                return False
+            self._delete(path)
+            with transaction(self.path) as conn:
+                conn.execute("DELETE FROM artifacts WHERE path = ?", (path,))
+        return True
+
+    def usage(self) -> dict:
+        with transaction(self.path) as conn:
+            rows = conn.execute(
+                "SELECT kind, COUNT(*) AS count, SUM(size_bytes) AS size_bytes, SUM(pins > 0) AS pinned "
+                "FROM artifacts GROUP BY kind"
+            ).fetchall()
+        by_kind = {row["kind"]: {"count": row["count"], "bytes": row["size_bytes"] or 0, "pinned": row["pinned"]}
+                   for row in rows}
+        return {
+            "bytes": sum(kind["bytes"] for kind in by_kind.values()),
+            "max_bytes": self.max_bytes,
+            "count": sum(kind["count"] for kind in by_kind.values()),
+            "by_kind": by_kind,
+        }
+
+    def add_janitor_task(self, task):
+        """Run task() at the start of every janitor pass; it may return a dict that is added to the report."""
+        self._janitor_tasks.append(task)
+
+    def add_keep_check(self, check):
+        """Never expire or evict an unpinned artifact while check(path) returns True (e.g. a live job serves it)."""
+        self._keep_checks.append(check)
+
+    def _keep(self, path: str) -> bool:
+        for check in self._keep_checks:
+            try:
+                if check(path):
+                    return True
+            except Exception as e:
+                print(f"[Storage] ⚠️ Keep check {getattr(check, '__name__', check)} failed for {path}: {e}")
+                return True
+        return False
+
+    def collect(self) -> dict:
+        """One janitor pass: hooked tasks, stale pins, vanished files, idle artifacts, then the quota."""
+        report = {}
+        for task in self._janitor_tasks:
+            try:
+                report.update(task() or {})
+            except Exception as e:
+                print(f"[Storage] ⚠️ Janitor task {getattr(task, '__name__', task)} failed: {e}")
+
+        now = time.time()
+        with self._lock:
+            with transaction(self.path) as conn:
+                stale = conn.execute(
+                    "UPDATE artifacts SET pins = 0, pinned_at = NULL WHERE pins > 0 AND pinned_at < ?",
+                    (now - STORAGE_PIN_TTL_SECONDS,)
+                ).rowcount
+                rows = conn.execute("SELECT * FROM artifacts ORDER BY last_access").fetchall()
+
+            missing = [row["path"] for row in rows if not os.path.exists(row["path"])]
+            evictable = [row for row in rows if row["pins"] == 0 and row["path"] not in missing]
+            total = sum(row["size_bytes"] for row in rows if row["path"] not in missing)
+
+            expired, evicted, freed = [], [], 0
+            for row in evictable:
+                idle = row["last_access"] < now - self.max_idle_seconds
+                if not (idle or total > self.max_bytes) or self._keep(row["path"]):
+                    continue
+                (expired if idle else evicted).append(row["path"])
+                self._delete(row["path"])
+                total -= row["size_bytes"]
+                freed += row["size_bytes"]
+
+            with transaction(self.path) as conn:
+                conn.executemany("DELETE FROM artifacts WHERE path = ?",
+                                 [(path,) for path in missing + expired + evicted])
+
+        if stale:
+            print(f"[Storage] ⚠️ Released {stale} pins left over from crashed jobs")
+        if expired or evicted:
+            print(f"[Storage] Deleted {len(expired)} idle and {len(evicted)} least recently used artifacts, "
+                  f"freed {freed / (1024 * 1024):.1f} MB")
+        report.update({
+            "expired": len(expired),
+            "evicted": len(evicted),
+            "missing": len(missing),
+            "freed_bytes": freed,
+            "usage": self.usage(),
+        })
+        return report
+
+    async def run_janitor(self, interval: float = JANITOR_INTERVAL_SECONDS):
+        """Run collect() every interval seconds until cancelled."""
+        while True:
+            try:
+                await asyncio.to_thread(self.collect)
+            except Exception as e:
+                print(f"[Storage] ❌ Janitor pass failed: {e}")
+            await asyncio.sleep(interval)
+
+
+storage_manager = StorageManager()
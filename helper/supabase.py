@@ -1,5 +1,5 @@
 import os
-from supabase import create_client, Client
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,7 +12,8 @@ class SupabaseService:
         if not url or not key:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
         
-        self.client: Client = create_client(url, key)
+        from supabase import create_client
+        self.client = create_client(url, key)
     
     #----------- book_app_users functions -----------------#
     def add_user(self, username: str, email: str):
@@ -229,4 +230,27 @@ class SupabaseService:
             raise Exception(f"Failed to delete blog: {str(e)}")
 
 # Create a singleton instance
-supabase_service = SupabaseService()
\ No newline at end of file
+class LazySupabaseService:
+    """Stands in for SupabaseService until first use.
+
+    The supabase package, the client and the environment check are only
+    touched when a route actually calls the database, so importing the app
+    stays cheap and does not fail for workers that never need Supabase.
+    """
+
+    def __init__(self):
+        self._service = None
+        self._lock = threading.Lock()
+
+    def _get_service(self) -> SupabaseService:
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    self._service = SupabaseService()
+        return self._service
+
+    def __getattr__(self, name):
+        return getattr(self._get_service(), name)
+
+
+supabase_service = LazySupabaseService()
\ No newline at end of file
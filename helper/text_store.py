@@ -0,0 +1,146 @@
+import os
+import time
+import zlib
+import hashlib
+import threading
+from dotenv import load_dotenv
+from helper.sqlite_db import CACHE_DIR, open_database, transaction
+
+load_dotenv()
+
+TEXT_STORE_PATH = os.getenv("TEXT_STORE_PATH", os.path.join(CACHE_DIR, "text_store.sqlite3"))
+TEXT_STORE_MAX_BYTES = int(os.getenv("TEXT_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def file_digest(file: str) -> str:
+    """SHA-256 of a file's contents, read in 1 MB blocks."""
+    sha = hashlib.sha256()
+    with open(file, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class TextStore:
+    """Content-addressed store of extracted PDF text.
+
+    Documents are keyed by the PDF's SHA-256 and the extractor strategy that
+    produced the text. Every page is a separate zlib-compressed row, so any
+    page range can be read back without touching the PDF. Whole documents are
+    evicted least-recently-used first once the store exceeds max_bytes.
+    """
+
+    def __init__(self, path: str = TEXT_STORE_PATH, max_bytes: int = TEXT_STORE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        open_database(self.path)
+
+        with transaction(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    digest TEXT NOT NULL,
+                    extractor TEXT NOT NULL,
+                    page_count INTEGER NOT NULL,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (digest, extractor)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    digest TEXT NOT NULL,
+                    extractor TEXT NOT NULL,
+                    page_no INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (digest, extractor, page_no)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_last_access ON documents (last_access)")
+
+    def page_count(self, digest: str, extractor: str):
+        """Number of pages in a known document, or None if it was never stored."""
+        with transaction(self.path) as conn:
+            row = conn.execute(
+                "SELECT page_count FROM documents WHERE digest = ? AND extractor = ?",
+                (digest, extractor)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_pages(self, digest: str, extractor: str, start: int = 0, end: int = None):
+        """Return the texts of pages [start, end), or None unless every one of them is stored."""
+        # Reads, then records the access; other workers may be storing pages meanwhile
+        with transaction(self.path, immediate=True) as conn:
+            row = conn.execute(
+                "SELECT page_count FROM documents WHERE digest = ? AND extractor = ?",
+                (digest, extractor)
+            ).fetchone()
+            if not row:
+                return None
+
+            end = row[0] if end is None else min(end, row[0])
+            rows = conn.execute(
+                "SELECT page_no, data FROM pages "
+                "WHERE digest = ? AND extractor = ? AND page_no >= ? AND page_no < ? ORDER BY page_no",
+                (digest, extractor, start, end)
+            ).fetchall()
+            if len(rows) != end - start:
+                return None
+
+            conn.execute(
+                "UPDATE documents SET last_access = ? WHERE digest = ? AND extractor = ?",
+                (time.time(), digest, extractor)
+            )
+
+        return [zlib.decompress(data).decode("utf-8") for _, data in rows]
+
+    def put_pages(self, digest: str, extractor: str, page_count: int, start: int, page_texts: list):
+        """Store consecutive pages starting at page number start."""
+        records = [
+            (digest, extractor, start + offset, zlib.compress(text.encode("utf-8")))
+            for offset, text in enumerate(page_texts)
+        ]
+        added = sum(len(record[3]) for record in records)
+
+        with self._lock, transaction(self.path) as conn:
+            conn.execute(
+                "INSERT INTO documents (digest, extractor, page_count, size_bytes, last_access) "
+                "VALUES (?, ?, ?, 0, ?) "
+                "ON CONFLICT (digest, extractor) DO UPDATE SET last_access = excluded.last_access",
+                (digest, extractor, page_count, time.time())
+            )
+            replaced = conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM pages "
+                "WHERE digest = ? AND extractor = ? AND page_no >= ? AND page_no < ?",
+                (digest, extractor, start, start + len(records))
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT OR REPLACE INTO pages (digest, extractor, page_no, data) VALUES (?, ?, ?, ?)",
+                records
+            )
+            conn.execute(
+                "UPDATE documents SET size_bytes = size_bytes + ? WHERE digest = ? AND extractor = ?",
+                (added - replaced, digest, extractor)
+            )
+            self._evict(conn, keep=(digest, extractor))
+
+    def _evict(self, conn, keep=None):
+        """Drop least-recently-used documents until the store fits in max_bytes."""
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for digest, extractor, size_bytes in conn.execute(
+            "SELECT digest, extractor, size_bytes FROM documents ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            if (digest, extractor) == keep:
+                continue
+            conn.execute("DELETE FROM pages WHERE digest = ? AND extractor = ?", (digest, extractor))
+            conn.execute("DELETE FROM documents WHERE digest = ? AND extractor = ?", (digest, extractor))
+            total -= size_bytes
+            print(f"[TextStore] Evicted {digest[:12]} ({extractor}), {size_bytes} bytes")
+
+
+text_store = TextStore()
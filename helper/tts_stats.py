@@ -0,0 +1,154 @@
+import os
+import time
+import random
+import threading
+from dotenv import load_dotenv
+from helper.sqlite_db import CACHE_DIR, open_database, transaction
+
+load_dotenv()
+
+TTS_STATS_PATH = os.getenv("TTS_STATS_PATH", os.path.join(CACHE_DIR, "tts_stats.sqlite3"))
+
+# Chunk sizes (characters) the converter chooses between; attempts are recorded per bucket
+CHUNK_SIZE_BUCKETS = (2000, 4000, 8000, 16000, 32000, 45000)
+
+# Used until a bucket has enough measurements
+START_CHUNK_SIZE = int(os.getenv("TTS_START_CHUNK_SIZE", "8000"))
+
+# Attempts a bucket needs before its numbers are trusted
+MIN_SAMPLES = int(os.getenv("TTS_STATS_MIN_SAMPLES", "5"))
+
+# Share of conversions that try a neighbouring, under-measured size instead of the best one
+EXPLORE_RATE = float(os.getenv("TTS_CHUNK_EXPLORE_RATE", "0.1"))
+
+
+def size_bucket(chars: int) -> int:
+    """The smallest bucket that holds a chunk of this many characters."""
+    for bucket in CHUNK_SIZE_BUCKETS:
+        if chars <= bucket:
+            return bucket
+    return CHUNK_SIZE_BUCKETS[-1]
+
+
+class TTSStatsStore:
+    """Measured speed and reliability of each TTS engine and voice, per chunk size.
+
+    Every synthesis attempt is recorded with its length, time and outcome.
+    choose_chunk_size() turns that into a chunk size: the bucket with the best
+    goodput (characters per second of successful synthesis, discounted by its
+    failure rate), capped so a book still splits into enough chunks to keep
+    every concurrent slot busy. Small chunks pay more per-request overhead,
+    large ones lose more work per failure; the measurements decide.
+    """
+
+    def __init__(self, path: str = TTS_STATS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        open_database(self.path)
+
+        with transaction(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tts_stats (
+                    engine TEXT NOT NULL,
+                    voice TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    chars_ok INTEGER NOT NULL DEFAULT 0,
+                    seconds_ok REAL NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (engine, voice, bucket)
+                )
+            """)
+
+    def record(self, engine: str, voice: str, chars: int, seconds: float, ok: bool):
+        """Record one synthesis attempt of a chunk with `chars` characters."""
+        with self._lock, transaction(self.path) as conn:
+            conn.execute(
+                "INSERT INTO tts_stats (engine, voice, bucket, attempts, failures, chars_ok, seconds_ok, updated_at) "
+                "VALUES (?, ?, ?, 1, ?, ?, ?, ?) "
+                "ON CONFLICT (engine, voice, bucket) DO UPDATE SET "
+                "attempts = attempts + 1, failures = failures + excluded.failures, "
+                "chars_ok = chars_ok + excluded.chars_ok, seconds_ok = seconds_ok + excluded.seconds_ok, "
+                "updated_at = excluded.updated_at",
+                (engine, voice, size_bucket(chars), 0 if ok else 1,
+                 chars if ok else 0, seconds if ok else 0, time.time())
+            )
+
+    def stats(self, engine: str = None, voice: str = None) -> list:
+        """Per engine, voice and bucket: attempts, error rate and characters per second."""
+        query = "SELECT * FROM tts_stats"
+        clauses, params = [], []
+        if engine:
+            clauses.append("engine = ?")
+            params.append(engine)
+        if voice:
+            clauses.append("voice = ?")
+            params.append(voice)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with transaction(self.path) as conn:
+            rows = conn.execute(query + " ORDER BY engine, voice, bucket", params).fetchall()
+
+        return [
+            {
+                "engine": row["engine"],
+                "voice": row["voice"],
+                "chunk_size": row["bucket"],
+                "attempts": row["attempts"],
+                "failures": row["failures"],
+                "error_rate": round(row["failures"] / row["attempts"], 4),
+                "chars_per_second": round(row["chars_ok"] / row["seconds_ok"], 1) if row["seconds_ok"] else None,
+            }
+            for row in rows
+        ]
+
+    def _bucket_stats(self, engine: str, voice: str) -> dict:
+        """bucket -> (attempts, goodput) for a voice, or for the whole engine if the voice has no data."""
+        rows = self.stats(engine, voice)
+        if not any(row["attempts"] >= MIN_SAMPLES for row in rows):
+            rows = self.stats(engine)
+
+        merged = {}
+        for row in rows:
+            attempts, failures, chars_per_second = merged.get(row["chunk_size"], (0, 0, []))
+            merged[row["chunk_size"]] = (
+                attempts + row["attempts"],
+                failures + row["failures"],
+                chars_per_second + ([row["chars_per_second"]] if row["chars_per_second"] else []),
+            )
+        return {
+            bucket: (attempts, (sum(speeds) / len(speeds)) * (1 - failures / attempts) if speeds else 0.0)
+            for bucket, (attempts, failures, speeds) in merged.items()
+        }
+
+    def choose_chunk_size(self, engine: str, voice: str, concurrency: int = 1, expected_chars: int = None,
+                          explore: bool = True):
+        """Pick a chunk size for a conversion; returns (chunk_size, reason)."""
+        candidates = list(CHUNK_SIZE_BUCKETS)
+        if expected_chars:
+            # Enough chunks for every concurrent slot to have work
+            cap = expected_chars / max(concurrency, 1)
+            candidates = [bucket for bucket in candidates if bucket <= cap] or candidates[:1]
+
+        measured = {
+            bucket: goodput for bucket, (attempts, goodput) in self._bucket_stats(engine, voice).items()
+            if attempts >= MIN_SAMPLES and bucket in candidates
+        }
+        if not measured:
+            size = max((bucket for bucket in candidates if bucket <= START_CHUNK_SIZE), default=candidates[0])
+            return size, "no measurements yet"
+
+        best = max(sorted(measured), key=lambda bucket: measured[bucket])
+        if explore and random.random() < EXPLORE_RATE:
+            position = candidates.index(best)
+            neighbours = [
+                candidates[i] for i in (position - 1, position + 1)
+                if 0 <= i < len(candidates) and candidates[i] not in measured
+            ]
+            if neighbours:
+                return random.choice(neighbours), "exploring an unmeasured size"
+        return best, f"best measured goodput {measured[best]:.0f} chars/s"
+
+
+tts_stats = TTSStatsStore()
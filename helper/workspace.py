@@ -0,0 +1,28 @@
+import os
+import shutil
+
+
+class JobWorkspace:
+    """Private directory for one job's intermediate files (downloaded PDF, merged MP3, renditions, chapters).
+
+    Nothing in it is visible to other jobs or to downloads until publish()
+    renames it into its final location. The workspace lives under the output
+    directory, so that rename stays on one filesystem and is atomic.
+    """
+
+    def __init__(self, root_dir: str, job_id: str):
+        self.dir = os.path.join(root_dir, job_id)
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, *names: str) -> str:
+        return os.path.join(self.dir, *names)
+
+    def publish(self, name: str, dest_path: str) -> str:
+        """Move a finished file or directory from the workspace to dest_path, replacing what is there."""
+        src_path = self.path(name)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        if os.path.isdir(src_path) and os.path.isdir(dest_path):
+            # os.replace only swaps directories into an empty or missing target
+            shutil.rmtree(dest_path)
+        os.replace(src_path, dest_path)
+        return dest_path
@@ -3,6 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from routes import book_pdf, Audio, blog, user_book, auth, clean_file, senders
 from fastapi.staticfiles import StaticFiles
+from functions.tts_engines import engine_registry
+from helper.storage import storage_manager
+from helper.job_store import job_store
+from helper.job_scheduler import job_scheduler
+from functions.book_pdf import browser_pool
+from contextlib import asynccontextmanager
 from pathlib import Path
 import uvicorn, sys, asyncio
 
@@ -10,7 +16,26 @@ import uvicorn, sys, asyncio
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-app = FastAPI(title="API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Jobs left unfinished by a previous run will never finish
+    await asyncio.to_thread(Audio.fail_stale_jobs)
+    # Probe TTS engines once, in the background so startup is not held up by slow probes
+    probe = asyncio.create_task(engine_registry.probe_async())
+    # Disk cleanup (expired jobs, idle files, quota) runs here rather than inside requests
+    janitor = asyncio.create_task(storage_manager.run_janitor())
+    # Jobs waiting in or run by this worker's scheduler must not look interrupted
+    heartbeat = asyncio.create_task(job_scheduler.run_heartbeat(job_store.heartbeat))
+    # Resolve chromedriver and log a browser session in before the first book download
+    browsers = asyncio.create_task(asyncio.to_thread(browser_pool.start))
+    yield
+    probe.cancel()
+    janitor.cancel()
+    heartbeat.cancel()
+    browsers.cancel()
+    await asyncio.to_thread(browser_pool.close)
+
+app = FastAPI(title="API", version="1.0.0", lifespan=lifespan)
 
 
 app.include_router(book_pdf.router)
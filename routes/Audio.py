@@ -1,17 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from helper.authentication import APIKeyChecker
 import os
 import re
 import sys
+import json
 import asyncio
 import uuid
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from routes.book_pdf import download_book
-from functions.pdf2mp3 import PDFToMP3Converter
+from functions.pdf2mp3 import PDFToMP3Converter, DEFAULT_TTS_CONCURRENCY, CHECKPOINT_DIR, CHECKPOINT_MAX_AGE_SECONDS
+from functions.conversion_checkpoint import ConversionCheckpoint
+from functions.tts_workers import pyttsx3_pool
+from functions.tts_engines import engine_registry
+from functions.segments import SegmentPublisher, read_manifest, hls_playlist, segment_filename
+from functions.chapters import read_chapters, chapter_filename
+from functions.renditions import (
+    RENDITIONS, ORIGINAL, parse_renditions, encode_rendition, rendition_path, rendition_filename, media_type
+)
+from helper.job_store import job_store, STALE_JOB_SECONDS
+from helper.job_scheduler import job_scheduler
+from helper.job_events import job_events, EVENT_MIN_INTERVAL, TERMINAL_STATUSES
+from helper.file_serving import serve_file
+from helper.tts_stats import tts_stats
+from helper.storage import storage_manager
+from helper.audio_cache import audio_cache
+from helper.workspace import JobWorkspace
 
 router = APIRouter(
     prefix='/audio',
@@ -21,8 +40,19 @@ router = APIRouter(
 # API key checker for audio operations
 audio_auth = APIKeyChecker("audio")
 
-# Store job status in memory (use Redis in production)
-jobs = {}
+# API key checker for admin-only views
+admin_auth = APIKeyChecker("admin")
+
+# Finished jobs and their files are kept this long
+JOB_TTL = timedelta(hours=2)
+
+# Fields a follower job mirrors from the job it is attached to
+SHARED_JOB_FIELDS = (
+    "status", "progress", "reason", "filename", "file_path", "segments_dir", "chapters_dir", "renditions"
+)
+
+# Event streams re-read the job store this often, for jobs running in another worker process
+EVENT_STORE_POLL_SECONDS = float(os.getenv("JOB_EVENT_STORE_POLL_SECONDS", "5"))
 
 class AudioJobRequest(BaseModel):
     book_name: str
@@ -30,53 +60,284 @@ class AudioJobRequest(BaseModel):
 
 class JobStatus(BaseModel):
     job_id: str
-    status: str  # queued, downloading, extracting, converting, merging, completed, failed
+    status: str  # queued, downloading, extracting, converting, merging, encoding, completed, failed
     progress: int = 0
     reason: str = None
     filename: str = None
+    queue_position: int = None
+
+def job_key(book_name: str, voice: str, segmented: bool = False, merge: bool = True,
+            chapters: bool = False, renditions: list = ()) -> str:
+    """Requests with the same key produce the same audio output."""
+    normalized_name = re.sub(r'\s+', ' ', book_name).strip().lower()
+    key = f"{normalized_name}|{voice}"
+    if segmented:
+        key += "|segmented"
+    if chapters:
+        key += "|chapters"
+    if not merge:
+        key += "|no-merge"
+    if renditions:
+        key += "|" + "+".join(sorted(renditions))
+    return key
+
+def job_renditions(job: dict) -> list:
+    """Formats the job's single file can be downloaded in: the MP3 plus every encoded rendition."""
+    if not job.get("file_path"):
+        return []
+    return [ORIGINAL, *(name for name in (job.get("renditions") or "").split(",") if name)]
+
+def effective_job(job: dict) -> dict:
+    """Followers report the state of the job doing the actual work."""
+    if job.get("leader_id"):
+        leader = job_store.get(job["leader_id"])
+        if leader:
+            return leader
+    return job
+
+def remove_job_files(job: dict, exclude_job_ids: list) -> bool:
+    """Delete a job's output (MP3 and renditions, segments, chapters) unless another live job still serves it.
+
+    Pinned artifacts (in use by a running job) are left to a later pass.
+    """
+    removed = False
+    for path in (job.get("file_path"), job.get("segments_dir"), job.get("chapters_dir")):
+        if not path or not os.path.exists(path):
+            continue
+        if job_store.file_in_use(path, exclude_job_ids, datetime.now() - JOB_TTL):
+            continue
+        if path == job.get("file_path"):
+            for name in job_renditions(job):
+                if name != ORIGINAL:
+                    storage_manager.remove(rendition_path(path, name))
+        if storage_manager.remove(path):
+            removed = True
+    return removed
+
+def fail_stale_jobs() -> int:
+    """Fail unfinished jobs nobody has updated for STALE_JOB_SECONDS; their worker died or restarted."""
+    stale = job_store.fail_stale("Job was interrupted (server restarted or crashed)")
+    if stale:
+        print(f"[Cleanup] ⚠️ Marked {stale} interrupted jobs as failed")
+    return stale
+
+def expire_jobs() -> dict:
+    """Janitor task: fail interrupted jobs, then delete finished jobs older than JOB_TTL and their files."""
+    cleaned = 0
+    stale = fail_stale_jobs()
+    
+    stale_before = datetime.now() - timedelta(seconds=STALE_JOB_SECONDS)
+    old_jobs = [
+        job for job in job_store.list_older_than(datetime.now() - JOB_TTL)
+        if job["status"] in ["completed", "failed"] or job["updated_at"] < stale_before
+    ]
+    jobs_to_delete = [job["job_id"] for job in old_jobs]
+    
+    for job in old_jobs:
+        # Clean up files no other job is still serving
+        try:
+            if remove_job_files(job, jobs_to_delete):
+                cleaned += 1
+                print(f"[Cleanup] Removed file for job {job['job_id']}")
+        except Exception as e:
+            print(f"[Cleanup] Error removing file: {e}")
+    
+    job_store.delete(jobs_to_delete)
+    
+    if jobs_to_delete:
+        print(f"[Cleanup] Removed {len(jobs_to_delete)} old jobs, cleaned {cleaned} files")
+    return {"expired_jobs": len(jobs_to_delete), "removed_job_files": cleaned, "interrupted_jobs": stale}
+
+storage_manager.add_janitor_task(expire_jobs)
+
+def sweep_checkpoints() -> dict:
+    """Janitor task: delete checkpoints of conversions that failed and were never retried."""
+    removed = ConversionCheckpoint.sweep(CHECKPOINT_DIR, CHECKPOINT_MAX_AGE_SECONDS)
+    if removed:
+        print(f"[Cleanup] Removed {removed} abandoned conversion checkpoints")
+    return {"removed_checkpoints": removed}
+
+storage_manager.add_janitor_task(sweep_checkpoints)
+
+def output_in_use(path: str) -> bool:
+    """Keep check: whether a job created within JOB_TTL serves this MP3 (or one of its renditions), segments or chapters."""
+    for name, rendition in RENDITIONS.items():
+        suffix = f".{name}{rendition['extension']}"
+        if path.endswith(suffix):
+            path = path[:-len(suffix)] + ".mp3"
+            break
+    return job_store.file_in_use(path, [], datetime.now() - JOB_TTL)
+
+storage_manager.add_keep_check(output_in_use)
+
+def touch_job_files(job: dict):
+    """Restart the idle clock of every output a job serves."""
+    for name in job_renditions(job):
+        storage_manager.touch(rendition_path(job["file_path"], name))
+    for path in (job.get("segments_dir"), job.get("chapters_dir")):
+        if path:
+            storage_manager.touch(path)
+
+def get_segments_dir(job_id: str) -> str:
+    """Segments directory of a job, raising 404s for unknown jobs or non-segmented output."""
+    job = job_store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    state = effective_job(job)
+    if not state.get("segments_dir"):
+        if state["status"] in ["queued", "downloading"]:
+            raise HTTPException(status_code=404, detail="Segments not available yet")
+        raise HTTPException(status_code=404, detail="Job was not started with segmented output")
+    return state["segments_dir"]
 
 # Background task to process audio conversion
-async def process_audio_job(job_id: str, book_name: str, voice: str):
-    """Background task to download PDF and convert to MP3."""
+async def process_audio_job(job_id: str, book_name: str, voice: str, segmented: bool = False, merge: bool = True,
+                            chapters: bool = False, renditions: list = ()):
+    """Background task to download PDF and convert to MP3.
+
+    With segmented output every finished chunk is published for progressive
+    playback, and with chapters one MP3 per chapter is written; merge=False
+    makes those the only deliverable. Each of renditions (e.g. opus-32k) is
+    encoded from the merged MP3 after the merge.
+
+    Intermediate files live in the job's own workspace and are renamed into
+    the output directory only once complete, so concurrent jobs never see or
+    overwrite each other's files.
+    
+    Job store and storage index calls can wait on other workers' SQLite
+    writes, so they run on the job's own store thread, in order, and never
+    on the event loop.
+    """
+    
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if not job or job["status"] != "queued":
+        # Failed as interrupted, or expired, while it waited
+        print(f"[Job {job_id}] Not starting: job is {job['status'] if job else 'gone'}")
+        return
+    
+    loop = asyncio.get_running_loop()
+    store_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"audio-store-{job_id[:8]}")
+    
+    def in_store_thread(fn, *args, **kwargs):
+        return loop.run_in_executor(store_thread, functools.partial(fn, *args, **kwargs))
+    
+    write_progress = job_store.progress_writer(job_id)
+    
+    # Artifacts this job works on; the storage janitor leaves them alone until the job ends
+    pinned = []
+    
+    async def pin(path: str, kind: str):
+        await in_store_thread(storage_manager.register, path, kind, owner_job=job_id, pin=True)
+        pinned.append((path, kind))
     
     def update_progress(status: str, progress: int):
-        """Update job progress in jobs dict."""
-        jobs[job_id]["status"] = status
-        jobs[job_id]["progress"] = progress
+        """Queue the progress write (batched by the writer) and push the update to subscribers.
+
+        Called from the event loop and from stage threads alike, so it never waits for the store.
+        """
+        store_thread.submit(write_progress, status, progress)
+        job_events.publish(job_id, status=status, progress=progress)
         print(f"[Job {job_id}] Status: {status} | Progress: {progress}%")
     
+    def release_files():
+        """Unpin what the job produced (its idle clock starts now) and delete the rest of its workspace."""
+        for path, kind in pinned:
+            storage_manager.unpin(path)
+            if os.path.exists(path):
+                # Final size, and the idle clock starts now
+                storage_manager.register(path, kind, owner_job=job_id)
+        if workspace:
+            # Whatever was not published (the PDF, a failed job's partial output)
+            storage_manager.unpin(workspace.dir)
+            storage_manager.remove(workspace.dir)
+        job_store.finish(job_id, SHARED_JOB_FIELDS)
+        return job_store.get(job_id)
+    
+    workspace = None
+    
     try:
         # Update status: downloading
         update_progress("downloading", 5)
         
+        # Initialize converter with progress callback; it works in this job's workspace
+        converter = PDFToMP3Converter(progress_callback=update_progress, scheduler=job_scheduler)
+        workspace = JobWorkspace(os.path.join(converter.output_dir, ".work"), job_id)
+        await in_store_thread(storage_manager.register, workspace.dir, "workspace", owner_job=job_id, pin=True)
+        converter.work_dir = workspace.dir
+        
         print(f'[Job {job_id}] Downloading PDF for: {book_name}')
-        pdf_path = download_book(book_name)
+        pdf_path = await job_scheduler.run_blocking("download", download_book, book_name, workspace.dir)
         
         if not pdf_path or not os.path.exists(pdf_path):
-            jobs[job_id]["status"] = "failed"
-            jobs[job_id]["reason"] = f"Failed to download PDF for book: {book_name}"
+            await in_store_thread(write_progress.flush)
+            await in_store_thread(job_store.update, job_id, status="failed",
+                                  reason=f"Failed to download PDF for book: {book_name}")
             return
         
         update_progress("downloading", 10)
         print(f"[Job {job_id}] PDF downloaded successfully")
         
-        # Initialize converter with progress callback
+        # Normally done at startup; waits here only if that probe is still running
+        await engine_registry.probe_async()
+        
+        # The final name includes the job id: jobs for the same book with other settings must not collide
         safe_name = re.sub(r'\W+', '_', book_name)
-        converter = PDFToMP3Converter(progress_callback=update_progress)
-        mp3_filename = os.path.join(converter.output_dir, f"{safe_name}.mp3")
+        work_mp3 = workspace.path(f"{safe_name}.mp3")
+        mp3_filename = os.path.join(converter.output_dir, f"{safe_name}_{job_id}.mp3")
+        
+        segment_publisher = None
+        if segmented:
+            segments_dir = os.path.join(converter.output_dir, "segments", job_id)
+            segment_publisher = SegmentPublisher(segments_dir)
+            await pin(segments_dir, "segments")
+            await in_store_thread(job_store.update, job_id, segments_dir=segments_dir)
+        
+        chapters_dir = os.path.join(converter.output_dir, "chapters", job_id) if chapters else None
         
         # Convert based on voice type (with progress updates handled by converter)
-        await converter.convert_with_voice(pdf_path, voice)
+        await converter.convert_with_voice(
+            pdf_path, voice, segment_publisher=segment_publisher, merge=merge,
+            chapters_dir=workspace.path("chapters") if chapters else None, output_file=work_mp3
+        )
+        
+        if chapters_dir:
+            workspace.publish("chapters", chapters_dir)
+            await pin(chapters_dir, "chapters")
+            await in_store_thread(job_store.update, job_id, chapters_dir=chapters_dir)
+        
+        if not merge:
+            update_progress("completed", 100)
+            print(f"[Job {job_id}] ✅ Conversion completed successfully (no single MP3 requested)")
+            return
         
-        if not os.path.exists(mp3_filename):
-            jobs[job_id]["status"] = "failed"
-            jobs[job_id]["reason"] = "MP3 file was not generated"
+        if not os.path.exists(work_mp3):
+            await in_store_thread(write_progress.flush)
+            await in_store_thread(job_store.update, job_id, status="failed", reason="MP3 file was not generated")
             return
         
+        # Encoding stage: smaller renditions of the merged MP3
+        encoded = []
+        for idx, name in enumerate(renditions):
+            update_progress("encoding", 96 + idx * 3 // len(renditions))
+            try:
+                work_rendition = await job_scheduler.run_blocking("encode", encode_rendition, work_mp3, name)
+                encoded.append(name)
+                print(f"[Job {job_id}] Encoded {name}: {os.path.getsize(work_rendition)} bytes")
+            except Exception as e:
+                print(f"[Job {job_id}] ⚠️ Could not encode {name}: {e}")
+        
+        # Publish: renditions first, so every rendition the job lists exists once its MP3 does
+        for name in encoded:
+            workspace.publish(os.path.basename(rendition_path(work_mp3, name)), rendition_path(mp3_filename, name))
+            await pin(rendition_path(mp3_filename, name), name)
+        workspace.publish(os.path.basename(work_mp3), mp3_filename)
+        await pin(mp3_filename, "mp3")
+        await in_store_thread(job_store.update, job_id, filename=f"{safe_name}.mp3", file_path=mp3_filename,
+                              renditions=",".join(encoded) if encoded else None)
+        
         # Update status: completed
         update_progress("completed", 100)
-        jobs[job_id]["filename"] = f"{safe_name}.mp3"
-        jobs[job_id]["file_path"] = mp3_filename
         
         print(f"[Job {job_id}] ✅ Conversion completed successfully")
         print(f"[Job {job_id}] File: {mp3_filename}")
@@ -85,130 +346,371 @@ async def process_audio_job(job_id: str, book_name: str, voice: str):
         print(f"[Job {job_id}] ❌ Error: {str(e)}")
         import traceback
         traceback.print_exc()
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["reason"] = str(e)
+        await in_store_thread(write_progress.flush)
+        await in_store_thread(job_store.update, job_id, status="failed", reason=str(e))
+    finally:
+        # Also waits for the progress writes still queued on the store thread
+        final = await in_store_thread(release_files)
+        store_thread.shutdown(wait=False)
+        if final:
+            job_events.publish(
+                job_id, **{field: final[field] for field in ("status", "progress", "reason", "filename")},
+                renditions=job_renditions(final)
+            )
 
 @router.post("/audio_from_book")
 async def start_audio_conversion(
-    background_tasks: BackgroundTasks,
     book_name: str,
     voice: str = "male",
+    priority: int = 0,
+    segmented: bool = False,
+    merge: bool = True,
+    chapters: bool = False,
+    renditions: str = None,
     api_key: str = Depends(audio_auth)
 ):
-    """Start audio conversion job and return job_id."""
+    """Start audio conversion job and return job_id.
+
+    Jobs are queued and started by the scheduler; higher priority runs first.
+    segmented=true publishes chunks under /audio/segments/{job_id} while the
+    job runs; chapters=true writes one MP3 per chapter, listed under
+    /audio/chapters/{job_id}; merge=false (with either) skips the single MP3.
+    renditions is a comma-separated list of smaller encodings of the single
+    file (e.g. "opus-32k,aac-48k"), downloadable with ?rendition=...
+
+    Identical requests (same book and voice) attach to the job already doing
+    the work, or are answered from a finished MP3 that is still valid.
+    """
     job_id = str(uuid.uuid4())
     
-    # Initialize job
-    jobs[job_id] = {
+    if not merge and not (segmented or chapters):
+        raise HTTPException(status_code=400, detail="merge=false requires segmented=true or chapters=true")
+    
+    # Default renditions only apply to jobs that produce the single MP3, and only if this server can encode them
+    explicit_renditions = renditions is not None
+    try:
+        rendition_names = parse_renditions(renditions) if explicit_renditions or merge else []
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if rendition_names:
+        if not merge:
+            raise HTTPException(status_code=400, detail="renditions require merge=true")
+        await engine_registry.probe_async()
+        unsupported = [name for name in rendition_names if not engine_registry.can_encode(RENDITIONS[name]["encoder"])]
+        if unsupported and explicit_renditions:
+            raise HTTPException(status_code=400, detail=f"This server cannot encode: {', '.join(unsupported)}")
+        if unsupported:
+            print(f"[Job {job_id}] ⚠️ Skipping default renditions this server cannot encode: {', '.join(unsupported)}")
+            rendition_names = [name for name in rendition_names if name not in unsupported]
+    
+    # Initialize job, or attach it to an identical one
+    outcome, other = await asyncio.to_thread(job_store.create_deduplicated, {
         "job_id": job_id,
         "status": "queued",
         "progress": 0,
         "book_name": book_name,
         "voice": voice,
+        "job_key": job_key(book_name, voice, segmented, merge, chapters, rendition_names),
+        "priority": priority,
         "created_at": datetime.now()
-    }
+    }, datetime.now() - JOB_TTL)
+    
+    if outcome == "reused":
+        print(f"[Job {job_id}] Reusing finished output of job {other['job_id']}")
+        await asyncio.to_thread(touch_job_files, other)
+        return {"job_id": job_id, "status": other["status"]}
+    
+    if outcome == "attached":
+        print(f"[Job {job_id}] Attached to in-flight job {other['job_id']}")
+        return {"job_id": job_id, "status": other["status"]}
     
     print(f"[Job {job_id}] Created new conversion job")
     print(f"  Book: {book_name}")
     print(f"  Voice: {voice}")
     
-    # Add background task
-    background_tasks.add_task(process_audio_job, job_id, book_name, voice)
+    # Hand the job to the scheduler
+    job_scheduler.submit(
+        job_id, lambda: process_audio_job(job_id, book_name, voice, segmented, merge, chapters, rendition_names),
+        priority
+    )
     
-    return {"job_id": job_id, "status": "queued"}
+    queue_position = await asyncio.to_thread(job_store.queue_position, job_id)
+    return {"job_id": job_id, "status": "queued", "queue_position": queue_position}
+
+def job_snapshot(job_id: str):
+    """Public state of a job (following the job it is attached to), or None if it does not exist."""
+    job = job_store.get(job_id)
+    if not job:
+        return None
+    state = effective_job(job)
+    return {
+        "job_id": job_id,
+        "status": state["status"],
+        "progress": state.get("progress", 0),
+        "reason": state.get("reason"),
+        "filename": state.get("filename"),
+        "renditions": job_renditions(state),
+        "queue_position": job_store.queue_position(state["job_id"])
+    }
+
+async def iter_job_events(job_id: str):
+    """Yield a job's state now and after every change, until it completes or fails.
+
+    Changes are pushed by the process running the job and coalesced to at most one
+    every EVENT_MIN_INTERVAL seconds. When nothing is pushed for a while (e.g. the job
+    runs in another worker process) the job store is checked instead; None is yielded
+    when that shows no change, so callers can send a keepalive.
+    """
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if not job:
+        return
+    
+    # Followers get the updates of the job they are attached to
+    subscription = job_events.subscribe(effective_job(job)["job_id"])
+    try:
+        state = await asyncio.to_thread(job_snapshot, job_id)
+        while state:
+            yield state
+            if state["status"] in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(EVENT_MIN_INTERVAL)
+            
+            while True:
+                event = await subscription.next(timeout=EVENT_STORE_POLL_SECONDS)
+                if event is not None:
+                    event = {**state, **event, "job_id": job_id}
+                    if event != state:
+                        break
+                    continue
+                event = await asyncio.to_thread(job_snapshot, job_id)
+                if event != state:
+                    break
+                yield None
+            
+            if event and event["status"] != "queued":
+                event["queue_position"] = None
+            state = event
+    finally:
+        subscription.close()
 
 @router.get("/audio_status/{job_id}")
-async def get_audio_status(job_id: str, api_key: str = Depends(audio_auth)):
+def get_audio_status(job_id: str, api_key: str = Depends(audio_auth)):
     """Get status of audio conversion job."""
-    if job_id not in jobs:
+    job = job_store.get(job_id)
+    if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
-    
-    # Clean up old jobs (older than 2 hours)
-    if job["status"] in ["completed", "failed"]:
-        age = datetime.now() - job["created_at"]
-        if age > timedelta(hours=2):
-            # Clean up files
-            if "file_path" in job and os.path.exists(job["file_path"]):
-                try:
-                    os.remove(job["file_path"])
-                    print(f"[Job {job_id}] Cleaned up old file")
-                except Exception as e:
-                    print(f"[Job {job_id}] Cleanup error: {e}")
-            del jobs[job_id]
-            raise HTTPException(status_code=404, detail="Job expired")
+    state = effective_job(job)
+    
+    # Old jobs (older than 2 hours) are deleted with their files by the storage janitor
+    if job["status"] in ["completed", "failed"] and datetime.now() - job["created_at"] > JOB_TTL:
+        raise HTTPException(status_code=404, detail="Job expired")
     
     return {
-        "status": job["status"],
-        "progress": job.get("progress", 0),
-        "reason": job.get("reason"),
-        "filename": job.get("filename")
+        "status": state["status"],
+        "progress": state.get("progress", 0),
+        "reason": state.get("reason"),
+        "filename": state.get("filename"),
+        "renditions": job_renditions(state),
+        "queue_position": job_store.queue_position(state["job_id"])
     }
 
-@router.get("/download_audio/{job_id}")
-async def download_complete_file(
+@router.get("/audio_events/{job_id}")
+async def stream_audio_events(job_id: str, api_key: str = Depends(audio_auth)):
+    """Server-sent events with the job's status and progress; the stream ends when the job finishes."""
+    if not await asyncio.to_thread(job_store.get, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        async for event in iter_job_events(job_id):
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"data: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/audio_ws/{job_id}")
+async def audio_events_websocket(websocket: WebSocket, job_id: str, api_key: str = Depends(audio_auth)):
+    """The same status and progress updates as /audio_events, over a WebSocket."""
+    if not await asyncio.to_thread(job_store.get, job_id):
+        await websocket.close(code=4404, reason="Job not found")
+        return
+    
+    await websocket.accept()
+    try:
+        async for event in iter_job_events(job_id):
+            if event is not None:
+                await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+@router.api_route("/download_audio/{job_id}", methods=["GET", "HEAD"])
+def download_complete_file(
     job_id: str,
+    request: Request,
+    rendition: str = ORIGINAL,
     api_key: str = Depends(audio_auth)
 ):
-    """Download complete audio file."""
-    if job_id not in jobs:
+    """Download complete audio file, as the MP3 or one of the renditions encoded for the job."""
+    job = job_store.get(job_id)
+    if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
+    job = effective_job(job)
     
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail=f"Job not completed yet. Current status: {job['status']}")
     
-    if "file_path" not in job or not os.path.exists(job["file_path"]):
+    if not job.get("file_path") or not os.path.exists(job["file_path"]):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    available = job_renditions(job)
+    if rendition not in available:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Rendition '{rendition}' not available for this job. Available: {', '.join(available)}"
+        )
+    
+    path = rendition_path(job["file_path"], rendition)
+    if not os.path.exists(path):
         raise HTTPException(status_code=404, detail="File not found")
     
-    filename = job.get("filename", "audio.mp3")
+    filename = rendition_filename(job.get("filename") or "audio.mp3", rendition)
     
     print(f"[Job {job_id}] Serving download: {filename}")
+    storage_manager.touch(path)
     
-    return FileResponse(
-        job["file_path"],
-        media_type="audio/mpeg",
-        filename=filename,
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"',
-            "Accept-Ranges": "bytes"
-        }
+    return serve_file(request, path, media_type=media_type(rendition), filename=filename)
+
+@router.get("/segments/{job_id}")
+def get_segments(job_id: str, api_key: str = Depends(audio_auth)):
+    """JSON manifest of the segments published so far; grows while the job runs."""
+    segments_dir = get_segments_dir(job_id)
+    manifest = read_manifest(segments_dir)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Segments not available yet")
+    
+    state = effective_job(job_store.get(job_id))
+    return {
+        "status": state["status"],
+        "complete": manifest["complete"],
+        "error": manifest.get("error"),
+        "playlist": f"/audio/segments/{job_id}/playlist.m3u8",
+        "segments": [
+            {**segment, "url": f"/audio/segments/{job_id}/{segment['index']}.mp3"}
+            for segment in manifest["segments"]
+        ]
+    }
+
+@router.get("/segments/{job_id}/playlist.m3u8")
+def get_segments_playlist(job_id: str, api_key: str = Depends(audio_auth)):
+    """HLS event playlist of the published segments; ends with EXT-X-ENDLIST once complete."""
+    segments_dir = get_segments_dir(job_id)
+    manifest = read_manifest(segments_dir)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Segments not available yet")
+    if manifest.get("error"):
+        raise HTTPException(status_code=409, detail=manifest["error"])
+    
+    return PlainTextResponse(
+        hls_playlist(manifest, lambda index: f"{index}.mp3"),
+        media_type="application/vnd.apple.mpegurl",
+        headers={"Cache-Control": "no-cache"}
     )
 
+@router.api_route("/segments/{job_id}/{index}.mp3", methods=["GET", "HEAD"])
+def get_segment(job_id: str, index: int, request: Request, api_key: str = Depends(audio_auth)):
+    """Download one published segment."""
+    segments_dir = get_segments_dir(job_id)
+    manifest = read_manifest(segments_dir) or {"segments": []}
+    if index < 0 or index >= len(manifest["segments"]):
+        raise HTTPException(status_code=404, detail="Segment not published yet")
+    
+    storage_manager.touch(segments_dir)
+    return serve_file(request, os.path.join(segments_dir, segment_filename(index)), media_type="audio/mpeg")
+
+@router.get("/engines")
+async def get_engines(api_key: str = Depends(audio_auth)):
+    """TTS engines, tools and voices available on this server, as probed at startup."""
+    await engine_registry.probe_async()
+    return {**engine_registry.capabilities, "voices": dict(engine_registry.voices)}
+
+@router.get("/admin/tts_stats")
+def get_tts_stats(api_key: str = Depends(admin_auth)):
+    """Measured characters per second and error rate per engine, voice and chunk size,
+    plus the chunk size each engine and voice would get for a new conversion, the
+    audio cache and this worker's scheduler."""
+    stats = tts_stats.stats()
+    concurrency = {"edge-tts": DEFAULT_TTS_CONCURRENCY, "pyttsx3": pyttsx3_pool.size}
+    chunk_sizes = []
+    for engine, voice in sorted({(row["engine"], row["voice"]) for row in stats}):
+        size, reason = tts_stats.choose_chunk_size(engine, voice, concurrency.get(engine, 1), explore=False)
+        chunk_sizes.append({"engine": engine, "voice": voice, "chunk_size": size, "reason": reason})
+    return {
+        "stats": stats,
+        "chunk_sizes": chunk_sizes,
+        "audio_cache": audio_cache.stats(),
+        "scheduler": job_scheduler.stats(),
+    }
+
+def get_chapters_dir(job_id: str) -> str:
+    """Chapters directory of a finished job, raising 404s for unknown, unfinished or non-chapter jobs."""
+    job = job_store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    state = effective_job(job)
+    if not state.get("chapters_dir"):
+        if state["status"] not in ["completed", "failed"]:
+            raise HTTPException(status_code=404, detail="Chapters not available yet")
+        raise HTTPException(status_code=404, detail="Job was not started with chapters=true")
+    return state["chapters_dir"]
+
+@router.get("/chapters/{job_id}")
+def get_chapters(job_id: str, api_key: str = Depends(audio_auth)):
+    """Chapter list with title, duration, size and start time in the whole book, plus a URL per chapter."""
+    chapters_dir = get_chapters_dir(job_id)
+    manifest = read_chapters(chapters_dir)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Chapters not available yet")
+    
+    return {
+        "duration": manifest["duration"],
+        "chapters": [
+            {**chapter, "url": f"/audio/chapters/{job_id}/{chapter['index']}.mp3"}
+            for chapter in manifest["chapters"]
+        ]
+    }
+
+@router.api_route("/chapters/{job_id}/{index}.mp3", methods=["GET", "HEAD"])
+def get_chapter(job_id: str, index: int, request: Request, api_key: str = Depends(audio_auth)):
+    """Download one chapter."""
+    chapters_dir = get_chapters_dir(job_id)
+    manifest = read_chapters(chapters_dir) or {"chapters": []}
+    if index < 0 or index >= len(manifest["chapters"]):
+        raise HTTPException(status_code=404, detail="Chapter not found")
+    
+    storage_manager.touch(chapters_dir)
+    return serve_file(request, os.path.join(chapters_dir, chapter_filename(index)), media_type="audio/mpeg")
+
 @router.delete("/delete_folders")
 async def cleanup_files(api_key: str = Depends(audio_auth)):
-    """Clean up temporary files and old jobs."""
+    """Run a storage janitor pass now: expire old jobs, then apply the idle limit and quota."""
     try:
-        converter = PDFToMP3Converter()
-        cleaned = 0
-        
-        # Clean up old jobs
-        current_time = datetime.now()
-        jobs_to_delete = []
-        
-        for job_id, job in jobs.items():
-            age = current_time - job["created_at"]
-            # Clean up jobs older than 2 hours
-            if age > timedelta(hours=2):
-                # Clean up files
-                if "file_path" in job and os.path.exists(job["file_path"]):
-                    try:
-                        os.remove(job["file_path"])
-                        cleaned += 1
-                        print(f"[Cleanup] Removed file for job {job_id}")
-                    except Exception as e:
-                        print(f"[Cleanup] Error removing file: {e}")
-                jobs_to_delete.append(job_id)
-        
-        for job_id in jobs_to_delete:
-            del jobs[job_id]
+        report = await asyncio.to_thread(storage_manager.collect)
         
-        print(f"[Cleanup] Removed {len(jobs_to_delete)} old jobs, cleaned {cleaned} files")
-        
-        return {"status": "success", "cleaned_jobs": len(jobs_to_delete), "cleaned_files": cleaned}
+        return {
+            "status": "success",
+            "cleaned_jobs": report.get("expired_jobs", 0),
+            "cleaned_files": report.get("removed_job_files", 0) + report["expired"] + report["evicted"],
+            "storage": report["usage"]
+        }
     except Exception as e:
         print(f"[Cleanup] Error: {e}")
         return {"status": "error", "error": str(e)}
-    
\ No newline at end of file
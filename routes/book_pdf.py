@@ -1,10 +1,13 @@
 import os
+import re
 import time
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from helper.authentication import APIKeyChecker
 from functions.book_pdf import download_book
+from helper.file_serving import serve_file
+from helper.storage import storage_manager
 
 router = APIRouter(
     prefix='/book_pdf',
@@ -21,30 +24,44 @@ os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 class BookRequest(BaseModel):
     book_name: str
 
-@router.get("/download/{book_name}")
+def book_pdf_path(book_name: str) -> str:
+    """Where a book's PDF is kept once downloaded: pdf/<book name>.pdf."""
+    safe_name = re.sub(r'\W+', '_', book_name).strip('_') or "book"
+    return os.path.join(DOWNLOAD_DIR, f"{safe_name}.pdf")
+
+async def get_book_pdf(book_name: str) -> str:
+    """Path of the book's PDF, downloaded only if it is not on disk already.
+
+    Repeated requests (HEAD, Range resumes, conditional GETs) are served from
+    the same file, so its ETag and Last-Modified stay valid.
+    """
+    file_path = book_pdf_path(book_name)
+    if os.path.exists(file_path):
+        await asyncio.to_thread(storage_manager.register, file_path, "pdf")
+        return file_path
+    
+    print(f"Starting download for: {book_name}")
+    downloaded = await asyncio.to_thread(download_book, book_name)
+    if not downloaded or not os.path.exists(downloaded):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Book '{book_name}' not found or download failed"
+        )
+    
+    os.replace(downloaded, file_path)
+    await asyncio.to_thread(storage_manager.register, file_path, "pdf")
+    return file_path
+
+@router.api_route("/download/{book_name}", methods=["GET", "HEAD"])
 async def download_book_get(
     book_name: str,
+    http_request: Request,
     api_key: str = Depends(book_auth)
 ):
     """Download a book PDF by name (GET method)"""
     try:
-        print(f"Starting download for: {book_name}")
-        file_path = download_book(book_name)
-        
-        if not file_path or not os.path.exists(file_path):
-            raise HTTPException(
-                status_code=404,
-                detail=f"Book '{book_name}' not found or download failed"
-            )
-        
-        return FileResponse(
-            path=file_path,
-            media_type="application/pdf",
-            filename=os.path.basename(file_path),
-            headers={
-                "Content-Disposition": f'attachment; filename="{os.path.basename(file_path)}"'
-            }
-        )
+        file_path = await get_book_pdf(book_name)
+        return serve_file(http_request, file_path, media_type="application/pdf", filename=os.path.basename(file_path))
     
     except HTTPException:
         raise
@@ -58,27 +75,13 @@ async def download_book_get(
 @router.post("/download")
 async def download_book_endpoint(
     request: BookRequest,
+    http_request: Request,
     api_key: str = Depends(book_auth)
 ):
     """Download a book PDF by name (POST method)"""
     try:
-        print(f"Starting download for: {request.book_name}")
-        file_path = download_book(request.book_name)
-        
-        if not file_path or not os.path.exists(file_path):
-            raise HTTPException(
-                status_code=404,
-                detail=f"Book '{request.book_name}' not found or download failed"
-            )
-        
-        return FileResponse(
-            path=file_path,
-            media_type="application/pdf",
-            filename=os.path.basename(file_path),
-            headers={
-                "Content-Disposition": f'attachment; filename="{os.path.basename(file_path)}"'
-            }
-        )
+        file_path = await get_book_pdf(request.book_name)
+        return serve_file(http_request, file_path, media_type="application/pdf", filename=os.path.basename(file_path))
     
     except HTTPException:
         raise
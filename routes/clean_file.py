@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 from helper.authentication import APIKeyChecker
-import os
+from helper.storage import storage_manager
 
 router = APIRouter(
     prefix='/clean_files',
@@ -12,22 +12,9 @@ admin_auth = APIKeyChecker("admin")
 
 @router.get('/clean_files')
 def clean_files(api_key: str = Depends(admin_auth)):
-    clean_folder(folder_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), "mp3"))
-    clean_folder(folder_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), "pdf"))
-    return {"status": "success", "message": "Files cleaned successfully"}
+    """Run a storage janitor pass now instead of waiting for the background one.
 
-def clean_folder(folder_path):
-    """Deletes all files in the folder if there are more than 2."""
-    if not os.path.exists(folder_path):
-        print(f"Folder '{folder_path}' does not exist.")
-        return
-    
-    files = [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))]
-    
-    if len(files) > 2:
-        for file in files:
-            file_path = os.path.join(folder_path, file)
-            os.remove(file_path)
-            print(f"Deleted: {file_path}")
-    else:
-        print("Less than or equal to 2 files, no deletion performed.")
+    Only idle or over-quota artifacts are deleted; files used by running jobs are pinned and kept.
+    """
+    report = storage_manager.collect()
+    return {"status": "success", "message": "Files cleaned successfully", **report}
@@ -0,0 +1,157 @@
+import os
+from email.utils import formatdate
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from helper.file_serving import serve_file
+
+# Every byte value, repeated, so any misplaced offset shows up in the body
+CONTENT = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def file_path(tmp_path):
+    path = tmp_path / "book.mp3"
+    path.write_bytes(CONTENT)
+    return str(path)
+
+
+@pytest.fixture
+def client(file_path):
+    app = FastAPI()
+
+    @app.api_route("/file", methods=["GET", "HEAD"])
+    async def get_file(request: Request):
+        return serve_file(request, file_path, media_type="audio/mpeg", filename="book.mp3")
+
+    return TestClient(app)
+
+
+def parse_multipart(response) -> list:
+    """(Content-Range, body) of each part of a multipart/byteranges response."""
+    boundary = response.headers["content-type"].split("boundary=")[1]
+    body = response.content
+    assert body.endswith(f"\r\n--{boundary}--\r\n".encode())
+    parts = []
+    for raw in body.split(f"--{boundary}".encode())[1:-1]:
+        head, _, data = raw.partition(b"\r\n\r\n")
+        headers = dict(line.split(": ", 1) for line in head.decode().strip().split("\r\n"))
+        parts.append((headers["Content-Range"], data[:-2] if data.endswith(b"\r\n") else data))
+    return parts
+
+
+def test_full_file(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-length"] == str(len(CONTENT))
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-disposition"] == 'attachment; filename="book.mp3"'
+    assert response.headers["etag"].startswith('"')
+
+
+def test_single_range(client):
+    response = client.get("/file", headers={"Range": "bytes=100-299"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:300]
+    assert response.headers["content-range"] == f"bytes 100-299/{len(CONTENT)}"
+    assert response.headers["content-length"] == "200"
+
+
+def test_open_ended_range(client):
+    response = client.get("/file", headers={"Range": "bytes=10000-"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10000:]
+    assert response.headers["content-range"] == f"bytes 10000-{len(CONTENT) - 1}/{len(CONTENT)}"
+
+
+def test_suffix_range(client):
+    response = client.get("/file", headers={"Range": "bytes=-500"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-500:]
+    assert response.headers["content-range"] == f"bytes {len(CONTENT) - 500}-{len(CONTENT) - 1}/{len(CONTENT)}"
+
+
+def test_range_past_end_is_clamped(client):
+    response = client.get("/file", headers={"Range": f"bytes={len(CONTENT) - 10}-{len(CONTENT) + 1000}"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-10:]
+
+
+def test_multiple_ranges(client):
+    response = client.get("/file", headers={"Range": "bytes=0-9, 5000-5099, -20"})
+    assert response.status_code == 206
+    assert response.headers["content-type"].startswith("multipart/byteranges; boundary=")
+    assert response.headers["content-length"] == str(len(response.content))
+    assert parse_multipart(response) == [
+        (f"bytes 0-9/{len(CONTENT)}", CONTENT[0:10]),
+        (f"bytes 5000-5099/{len(CONTENT)}", CONTENT[5000:5100]),
+        (f"bytes {len(CONTENT) - 20}-{len(CONTENT) - 1}/{len(CONTENT)}", CONTENT[-20:]),
+    ]
+
+
+def test_overlapping_ranges_are_merged(client):
+    response = client.get("/file", headers={"Range": "bytes=0-99, 50-149"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 0-149/{len(CONTENT)}"
+    assert response.content == CONTENT[0:150]
+
+
+def test_unsatisfiable_range(client):
+    response = client.get("/file", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_malformed_range_is_ignored(client):
+    response = client.get("/file", headers={"Range": "bytes=abc"})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_if_none_match(client):
+    etag = client.get("/file").headers["etag"]
+    response = client.get("/file", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    assert client.get("/file", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_modified_since(client, file_path):
+    last_modified = client.get("/file").headers["last-modified"]
+    assert client.get("/file", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    earlier = formatdate(os.stat(file_path).st_mtime - 3600, usegmt=True)
+    assert client.get("/file", headers={"If-Modified-Since": earlier}).status_code == 200
+
+
+def test_if_range_matching(client):
+    validators = client.get("/file").headers
+    for if_range in (validators["etag"], validators["last-modified"]):
+        response = client.get("/file", headers={"Range": "bytes=0-99", "If-Range": if_range})
+        assert response.status_code == 206
+        assert response.content == CONTENT[:100]
+
+
+def test_if_range_mismatch_sends_full_file(client):
+    for if_range in ('"stale"', "Thu, 01 Jan 1970 00:00:00 GMT"):
+        response = client.get("/file", headers={"Range": "bytes=0-99", "If-Range": if_range})
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+
+def test_head(client):
+    response = client.head("/file")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-length"] == str(len(CONTENT))
+
+    response = client.head("/file", headers={"Range": "bytes=0-99"})
+    assert response.status_code == 206
+    assert response.content == b""
+    assert response.headers["content-length"] == "100"
+    assert response.headers["content-range"] == f"bytes 0-99/{len(CONTENT)}"